@@ -0,0 +1,30 @@
+"""Batched generations (num_images, per-image seeds and outputs)
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '002'
+down_revision = '001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('generations', sa.Column('num_images', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('generations', sa.Column('seeds_json', postgresql.JSON(astext_type=sa.Text()), nullable=True))
+    op.add_column('generations', sa.Column('output_s3_keys_json', postgresql.JSON(astext_type=sa.Text()), nullable=True))
+    op.add_column('generations', sa.Column('thumbnail_s3_keys_json', postgresql.JSON(astext_type=sa.Text()), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('generations', 'thumbnail_s3_keys_json')
+    op.drop_column('generations', 'output_s3_keys_json')
+    op.drop_column('generations', 'seeds_json')
+    op.drop_column('generations', 'num_images')
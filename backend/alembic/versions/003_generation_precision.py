@@ -0,0 +1,25 @@
+"""Per-generation precision mode (fp32 / bf16-autocast) and channels_last
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('generations', sa.Column('precision', sa.String(length=20), server_default='fp32', nullable=False))
+    op.add_column('generations', sa.Column('channels_last', sa.Boolean(), server_default=sa.false(), nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('generations', 'channels_last')
+    op.drop_column('generations', 'precision')
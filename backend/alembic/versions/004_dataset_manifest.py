@@ -0,0 +1,31 @@
+"""Per-photo processed artifact info and per-run dataset manifest
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('photo_assets', sa.Column('processed_s3_key', sa.String(length=512), nullable=True))
+    op.add_column('photo_assets', sa.Column('processed_width', sa.Integer(), nullable=True))
+    op.add_column('photo_assets', sa.Column('processed_height', sa.Integer(), nullable=True))
+    op.add_column('photo_assets', sa.Column('processed_sha256', sa.String(length=64), nullable=True))
+    op.add_column('preprocess_runs', sa.Column('manifest_s3_key', sa.String(length=512), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('preprocess_runs', 'manifest_s3_key')
+    op.drop_column('photo_assets', 'processed_sha256')
+    op.drop_column('photo_assets', 'processed_height')
+    op.drop_column('photo_assets', 'processed_width')
+    op.drop_column('photo_assets', 'processed_s3_key')
@@ -0,0 +1,30 @@
+"""Face detection and sharpness scores on photo assets
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('photo_assets', sa.Column('sharpness', sa.Float(), nullable=True))
+    op.add_column('photo_assets', sa.Column('face_count', sa.Integer(), nullable=True))
+    op.add_column('photo_assets', sa.Column('face_box_json', postgresql.JSON(astext_type=sa.Text()), nullable=True))
+    op.add_column('photo_assets', sa.Column('rejection_reason', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('photo_assets', 'rejection_reason')
+    op.drop_column('photo_assets', 'face_box_json')
+    op.drop_column('photo_assets', 'face_count')
+    op.drop_column('photo_assets', 'sharpness')
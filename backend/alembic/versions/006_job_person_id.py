@@ -0,0 +1,27 @@
+"""Person reference on jobs (background purge)
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('jobs', sa.Column('person_id', sa.Integer(), nullable=True))
+    op.create_foreign_key('fk_jobs_person_id', 'jobs', 'person_profiles', ['person_id'], ['id'])
+    op.create_index(op.f('ix_jobs_person_id'), 'jobs', ['person_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_jobs_person_id'), table_name='jobs')
+    op.drop_constraint('fk_jobs_person_id', 'jobs', type_='foreignkey')
+    op.drop_column('jobs', 'person_id')
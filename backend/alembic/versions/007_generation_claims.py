@@ -0,0 +1,25 @@
+"""Claiming task and time on generations (stale batch claims)
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('generations', sa.Column('claimed_by', sa.String(length=255), nullable=True))
+    op.add_column('generations', sa.Column('claimed_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('generations', 'claimed_at')
+    op.drop_column('generations', 'claimed_by')
@@ -1,17 +1,17 @@
 """
 Generation endpoints.
 """
-from typing import Optional, List
+from typing import Literal, Optional, List
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from datetime import datetime
 from app.api.dependencies import get_db
 from app.db import models
 from app.services.s3 import get_s3_service
 from app.core.guardrails import check_prompt_safety
 from app.core.logging import get_logger
-from app.workers.gpu.tasks import generate_image_task
+from app.workers.dispatch import GENERATE_IMAGE, enqueue
 
 logger = get_logger(__name__)
 router = APIRouter()
@@ -25,6 +25,21 @@ class GenerationCreate(BaseModel):
     width: int = Field(default=512, ge=256, le=1024)
     height: int = Field(default=512, ge=256, le=1024)
     seed: Optional[int] = Field(None, ge=0)
+    # Batched generation: N images from one denoising pass (optionally with explicit seeds).
+    num_images: int = Field(default=1, ge=1, le=8)
+    seeds: Optional[List[int]] = Field(None, min_length=1, max_length=8)
+    # CPU execution mode; defaults to the model version's train_config_json (precision/channels_last).
+    precision: Optional[Literal["fp32", "bf16-autocast"]] = None
+    channels_last: Optional[bool] = None
+
+    @model_validator(mode="after")
+    def _check_seeds(self) -> "GenerationCreate":
+        if self.seeds is not None:
+            if len(self.seeds) != self.num_images:
+                raise ValueError("seeds must have exactly num_images entries")
+            if any(s < 0 for s in self.seeds):
+                raise ValueError("seeds must be non-negative")
+        return self
 
 
 class GenerationResponse(BaseModel):
@@ -36,9 +51,15 @@ class GenerationResponse(BaseModel):
     width: int
     height: int
     seed: Optional[int]
+    num_images: int = 1
+    seeds: Optional[List[int]] = None
+    precision: str = "fp32"
+    channels_last: bool = False
     status: str
     output_url: Optional[str] = None
     thumbnail_url: Optional[str] = None
+    output_urls: List[str] = []
+    thumbnail_urls: List[str] = []
     error_message: Optional[str] = None
     created_at: datetime
     
@@ -58,6 +79,11 @@ def _to_generation_response(generation: models.Generation) -> GenerationResponse
     if generation.thumbnail_s3_key:
         thumbnail_url = s3.generate_presigned_get_url(generation.thumbnail_s3_key)
 
+    output_keys = generation.output_s3_keys_json or ([generation.output_s3_key] if generation.output_s3_key else [])
+    thumbnail_keys = generation.thumbnail_s3_keys_json or (
+        [generation.thumbnail_s3_key] if generation.thumbnail_s3_key else []
+    )
+
     return GenerationResponse(
         id=generation.id,
         model_version_id=generation.model_version_id,
@@ -67,9 +93,15 @@ def _to_generation_response(generation: models.Generation) -> GenerationResponse
         width=generation.width,
         height=generation.height,
         seed=generation.seed,
+        num_images=generation.num_images or 1,
+        seeds=generation.seeds_json,
+        precision=generation.precision or "fp32",
+        channels_last=bool(generation.channels_last),
         status=generation.status,
         output_url=output_url,
         thumbnail_url=thumbnail_url,
+        output_urls=[s3.generate_presigned_get_url(k) for k in output_keys],
+        thumbnail_urls=[s3.generate_presigned_get_url(k) for k in thumbnail_keys],
         error_message=generation.error_message,
         created_at=generation.created_at,
     )
@@ -103,6 +135,14 @@ def create_generation(gen_data: GenerationCreate, db: Session = Depends(get_db))
             }
         )
     
+    train_config = model_version.train_config_json or {}
+    precision = gen_data.precision or train_config.get("precision") or "fp32"
+    if precision not in ("fp32", "bf16-autocast"):
+        precision = "fp32"
+    channels_last = (
+        gen_data.channels_last if gen_data.channels_last is not None else bool(train_config.get("channels_last", False))
+    )
+
     # Create generation
     generation = models.Generation(
         model_version_id=gen_data.model_version_id,
@@ -112,6 +152,10 @@ def create_generation(gen_data: GenerationCreate, db: Session = Depends(get_db))
         width=gen_data.width,
         height=gen_data.height,
         seed=gen_data.seed,
+        num_images=gen_data.num_images,
+        seeds_json=gen_data.seeds,
+        precision=precision,
+        channels_last=channels_last,
         status="pending"
     )
     db.add(generation)
@@ -129,7 +173,7 @@ def create_generation(gen_data: GenerationCreate, db: Session = Depends(get_db))
     db.refresh(job)
     
     # Queue generation task
-    task = generate_image_task.delay(generation.id)
+    task = enqueue(GENERATE_IMAGE, generation.id)
     job.celery_task_id = task.id
     db.commit()
     
@@ -171,7 +215,6 @@ def list_generations(
 @router.get("/{generation_id}", response_model=GenerationResponse)
 def get_generation(generation_id: int, db: Session = Depends(get_db)):
     """Get generation status and result."""
-    s3 = get_s3_service()
     generation = db.query(models.Generation).filter(
         models.Generation.id == generation_id
     ).first()
@@ -179,28 +222,5 @@ def get_generation(generation_id: int, db: Session = Depends(get_db)):
     if not generation:
         raise HTTPException(status_code=404, detail="Generation not found")
     
-    # Generate presigned URLs if available
-    output_url = None
-    thumbnail_url = None
-    
-    if generation.output_s3_key:
-        output_url = s3.generate_presigned_get_url(generation.output_s3_key)
-    
-    if generation.thumbnail_s3_key:
-        thumbnail_url = s3.generate_presigned_get_url(generation.thumbnail_s3_key)
-    
-    return GenerationResponse(
-        id=generation.id,
-        model_version_id=generation.model_version_id,
-        prompt=generation.prompt,
-        negative_prompt=generation.negative_prompt,
-        steps=generation.steps,
-        width=generation.width,
-        height=generation.height,
-        seed=generation.seed,
-        status=generation.status,
-        output_url=output_url,
-        thumbnail_url=thumbnail_url,
-        error_message=generation.error_message,
-        created_at=generation.created_at
-    )
+    # Presigned URLs are generated if outputs are available
+    return _to_generation_response(generation)
@@ -1,19 +1,33 @@
 """
 Job endpoints (progress/log output).
+
+`GET /{job_id}` returns the job with its latest progress tick (hot snapshot in Redis, stored
+events as fallback); `.../events` return stored events; `.../stream` are Server-Sent Events:
+recent stored events first, then live events from Redis pub/sub (every progress tick) until the
+job's task ends.
 """
 
-from typing import List, Optional
-from datetime import datetime
+import json
+from typing import AsyncIterator, List, Optional, Tuple
+from datetime import datetime, timezone
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
 from app.api.dependencies import get_db
+from app.core.logging import get_logger
 from app.db import models
+from app.services import progress_stream
 
+logger = get_logger(__name__)
 router = APIRouter()
 
+TERMINAL_JOB_STATUSES = ("finished", "failed")
+KEEPALIVE_SECONDS = 15
+
 
 class JobEventResponse(BaseModel):
     id: int
@@ -27,6 +41,51 @@ class JobEventResponse(BaseModel):
         from_attributes = True
 
 
+class JobResponse(BaseModel):
+    id: int
+    job_type: str
+    status: str
+    error_message: Optional[str] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+    progress: Optional[dict] = None  # latest progress event (JobEvent fields)
+
+    class Config:
+        from_attributes = True
+
+
+def _as_utc(value) -> datetime:
+    ts = datetime.fromisoformat(value) if isinstance(value, str) else value
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+
+def _live_progress_after(job_id: int, after: Optional[datetime]) -> Optional[dict]:
+    """The Redis progress snapshot if it is newer than `after` (stored events are coalesced)."""
+    live = progress_stream.latest_progress(job_id)
+    if live and (after is None or _as_utc(live["created_at"]) > _as_utc(after)):
+        return live
+    return None
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+def get_job(job_id: int, db: Session = Depends(get_db)):
+    job = db.query(models.Job).filter(models.Job.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    stored = (
+        db.query(models.JobEvent)
+        .filter(models.JobEvent.job_id == job.id, models.JobEvent.event_type == "progress")
+        .order_by(models.JobEvent.created_at.desc())
+        .first()
+    )
+    progress = _live_progress_after(job.id, stored.created_at if stored else None)
+    if progress is None and stored is not None:
+        progress = JobEventResponse.model_validate(stored).model_dump()
+    return JobResponse.model_validate(job).model_copy(update={"progress": progress})
+
+
 @router.get("/model-versions/{version_id}/events", response_model=List[JobEventResponse])
 def list_events_for_model_version(
     version_id: int,
@@ -74,3 +133,147 @@ def list_events_for_generation(
     )
     return events
 
+
+
+@router.get("/{job_id}/events", response_model=List[JobEventResponse])
+def list_events_for_job(
+    job_id: int,
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+):
+    """Events of any job by id (e.g. the purge job returned by DELETE /v1/persons/{id})."""
+    job = db.query(models.Job).filter(models.Job.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    events = (
+        db.query(models.JobEvent)
+        .filter(models.JobEvent.job_id == job.id)
+        .order_by(models.JobEvent.created_at.desc())
+        .limit(limit)
+        .all()
+    )
+    return events
+
+
+def _sse(event: dict) -> str:
+    data = json.dumps(event, default=str)
+    return f"event: {event.get('event_type', 'message')}\ndata: {data}\n\n"
+
+
+def _stored_events(db: Session, job_id: int, limit: int) -> List[dict]:
+    events = (
+        db.query(models.JobEvent)
+        .filter(models.JobEvent.job_id == job_id)
+        .order_by(models.JobEvent.created_at.desc())
+        .limit(limit)
+        .all()
+    )
+    return [JobEventResponse.model_validate(e).model_dump() for e in reversed(events)]
+
+
+def _job_snapshot(db: Session, job_id: int, limit: int) -> Tuple[Optional[str], List[dict]]:
+    """
+    Fresh job status and recent stored events (plus a newer progress snapshot). The session is
+    closed right after, so an open stream does not keep a pooled DB connection for the lifetime
+    of the job.
+    """
+    try:
+        status = db.query(models.Job.status).filter(models.Job.id == job_id).scalar()
+        events = _stored_events(db, job_id, limit)
+    finally:
+        db.close()
+    # Progress since the last flush exists only as the hot snapshot.
+    live = _live_progress_after(job_id, events[-1]["created_at"] if events else None)
+    return status, events + ([live] if live else [])
+
+
+def _end_event(job_id: int, status: Optional[str]) -> dict:
+    return {"job_id": job_id, "event_type": progress_stream.END_EVENT, "status": status}
+
+
+def _stream_response(request: Request, db: Session, job: models.Job, backlog: int) -> StreamingResponse:
+    job_id = job.id
+    terminal = job.status in TERMINAL_JOB_STATUSES
+    db.close()  # the stream reads through short-lived checkouts only
+
+    async def stream() -> AsyncIterator[str]:
+        try:
+            if terminal:
+                status, events = await run_in_threadpool(_job_snapshot, db, job_id, backlog)
+                for event in events:
+                    yield _sse(event)
+                yield _sse(_end_event(job_id, status))
+                return
+
+            # Subscribe before reading stored events and status so nothing falls in between:
+            # a task finishing meanwhile is seen either as a terminal status or as its end event.
+            async with progress_stream.subscribe(job_id) as messages:
+                status, events = await run_in_threadpool(_job_snapshot, db, job_id, backlog)
+                for event in events:
+                    yield _sse(event)
+                if status in TERMINAL_JOB_STATUSES:
+                    yield _sse(_end_event(job_id, status))
+                    return
+                idle = 0
+                async for event in messages:
+                    if await request.is_disconnected():
+                        break
+                    if event is None:
+                        idle += 1
+                        if idle >= KEEPALIVE_SECONDS:
+                            idle = 0
+                            yield ": keep-alive\n\n"
+                        continue
+                    idle = 0
+                    yield _sse(event)
+                    if event.get("event_type") == progress_stream.END_EVENT:
+                        break
+        except Exception as e:
+            logger.error("job_event_stream_failed", job_id=job_id, error=str(e))
+            yield _sse({"job_id": job_id, "event_type": "error", "message": "live_updates_unavailable"})
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/{job_id}/stream")
+def stream_events_for_job(
+    job_id: int,
+    request: Request,
+    backlog: int = Query(50, ge=0, le=500),
+    db: Session = Depends(get_db),
+):
+    job = db.query(models.Job).filter(models.Job.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _stream_response(request, db, job, backlog)
+
+
+@router.get("/model-versions/{version_id}/stream")
+def stream_events_for_model_version(
+    version_id: int,
+    request: Request,
+    backlog: int = Query(50, ge=0, le=500),
+    db: Session = Depends(get_db),
+):
+    job = db.query(models.Job).filter(models.Job.model_version_id == version_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="No job for this model version")
+    return _stream_response(request, db, job, backlog)
+
+
+@router.get("/generations/{generation_id}/stream")
+def stream_events_for_generation(
+    generation_id: int,
+    request: Request,
+    backlog: int = Query(50, ge=0, le=500),
+    db: Session = Depends(get_db),
+):
+    job = db.query(models.Job).filter(models.Job.generation_id == generation_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="No job for this generation")
+    return _stream_response(request, db, job, backlog)
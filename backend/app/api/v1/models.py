@@ -10,7 +10,7 @@ from app.api.dependencies import get_db
 from app.db import models
 from app.core.guardrails import validate_consent
 from app.core.logging import get_logger
-from app.workers.gpu.tasks import train_model_task
+from app.workers.dispatch import TRAIN_MODEL, enqueue
 
 logger = get_logger(__name__)
 router = APIRouter()
@@ -120,7 +120,7 @@ def create_model(model_data: ModelCreate, db: Session = Depends(get_db)):
     db.refresh(job)
     
     # Queue training task
-    task = train_model_task.delay(model_version.id)
+    task = enqueue(TRAIN_MODEL, model_version.id)
     job.celery_task_id = task.id
     db.commit()
     
@@ -1,6 +1,9 @@
 """
 Person profile endpoints.
 """
+import os
+import re
+import uuid
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
@@ -13,7 +16,7 @@ from app.services.s3 import get_s3_service
 from app.core.config import settings
 from app.core.guardrails import validate_consent
 from app.core.logging import get_logger
-from app.workers.cpu.tasks import preprocess_person_task
+from app.workers.dispatch import PREPROCESS_PERSON, PURGE_PERSON, enqueue
 
 logger = get_logger(__name__)
 router = APIRouter()
@@ -61,6 +64,9 @@ class PhotoResponse(BaseModel):
     content_type: str
     size_bytes: int
     status: str
+    sharpness: float | None = None
+    face_count: int | None = None
+    rejection_reason: str | None = None
     created_at: datetime
     
     class Config:
@@ -73,6 +79,12 @@ class PreprocessResponse(BaseModel):
     status: str
 
 
+class PurgeResponse(BaseModel):
+    person_id: int
+    job_id: int
+    status: str
+
+
 class PreprocessRunResponse(BaseModel):
     id: int
     person_id: int
@@ -81,6 +93,7 @@ class PreprocessRunResponse(BaseModel):
     images_rejected: int
     images_duplicates: int
     output_s3_prefix: str | None = None
+    manifest_s3_key: str | None = None
     error_message: str | None = None
     started_at: datetime | None = None
     finished_at: datetime | None = None
@@ -137,10 +150,9 @@ def get_person(person_id: int, db: Session = Depends(get_db)):
     return person
 
 
-@router.delete("/{person_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete("/{person_id}", response_model=PurgeResponse, status_code=status.HTTP_202_ACCEPTED)
 def delete_person(person_id: int, db: Session = Depends(get_db)):
-    """Delete person data (soft delete + S3 cleanup)."""
-    s3 = get_s3_service()
+    """Delete person data: soft delete now, S3 cleanup in the background (`cpu.purge_person`)."""
     person = db.query(models.PersonProfile).filter(
         models.PersonProfile.id == person_id,
         models.PersonProfile.deleted_at.is_(None)
@@ -151,35 +163,27 @@ def delete_person(person_id: int, db: Session = Depends(get_db)):
     
     # Soft delete
     person.deleted_at = func.now()
+    job = models.Job(
+        job_type="purge",
+        status="pending",
+        person_id=person_id
+    )
+    db.add(job)
     db.commit()
+    db.refresh(job)
     
-    # Delete photos from S3
-    photos = db.query(models.PhotoAsset).filter(
-        models.PhotoAsset.person_id == person_id
-    ).all()
-    for photo in photos:
-        try:
-            s3.delete_file(photo.s3_key)
-        except Exception as e:
-            logger.error("photo_delete_failed", photo_id=photo.id, error=str(e))
-    
-    # Delete models from S3
-    for model in person.models:
-        for version in model.versions:
-            if version.artifact_s3_prefix:
-                s3.delete_prefix(version.artifact_s3_prefix)
-    
-    # Delete generations
-    for model in person.models:
-        for version in model.versions:
-            for generation in version.generations:
-                if generation.output_s3_key:
-                    s3.delete_file(generation.output_s3_key)
-                if generation.thumbnail_s3_key:
-                    s3.delete_file(generation.thumbnail_s3_key)
-    
-    logger.info("person_deleted", person_id=person_id)
-    return None
+    # Queue S3 cleanup (photos, datasets, models, generations)
+    task = enqueue(PURGE_PERSON, person_id, job.id)
+    job.celery_task_id = task.id
+    db.commit()
+    
+    logger.info("person_deleted", person_id=person_id, job_id=job.id)
+    
+    return {
+        "person_id": person_id,
+        "job_id": job.id,
+        "status": "pending"
+    }
 
 
 @router.post("/{person_id}/uploads/presign", response_model=PresignUploadResponse)
@@ -309,7 +313,7 @@ def delete_photo(person_id: int, photo_id: int, db: Session = Depends(get_db)):
 
     # Also delete processed artifact if it exists (best-effort)
     try:
-        processed_key = f"datasets/processed/{person_id}/processed_{photo.id}.jpg"
+        processed_key = photo.processed_s3_key or f"datasets/processed/{person_id}/processed_{photo.id}.jpg"
         s3_service.delete_file(processed_key)
     except Exception:
         pass
@@ -370,7 +374,12 @@ def start_preprocess(person_id: int, db: Session = Depends(get_db)):
             detail=f"No uploaded photos to preprocess. Upload at least {settings.MIN_PHOTOS} photos first."
         )
 
-    if uploaded_count < settings.MIN_PHOTOS:
+    # Runs are incremental: photos processed earlier stay in the dataset and count too.
+    processed_count = db.query(models.PhotoAsset).filter(
+        models.PhotoAsset.person_id == person_id,
+        models.PhotoAsset.status == "processed"
+    ).count()
+    if uploaded_count + processed_count < settings.MIN_PHOTOS:
         raise HTTPException(
             status_code=400,
             detail=f"Minimum {settings.MIN_PHOTOS} uploaded photos required"
@@ -396,7 +405,7 @@ def start_preprocess(person_id: int, db: Session = Depends(get_db)):
     db.refresh(job)
     
     # Queue Celery task
-    task = preprocess_person_task.delay(person_id, preprocess_run.id)
+    task = enqueue(PREPROCESS_PERSON, person_id, preprocess_run.id)
     job.celery_task_id = task.id
     db.commit()
     
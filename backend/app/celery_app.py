@@ -11,9 +11,12 @@ celery_app = Celery(
     include=[
         "app.workers.cpu.tasks",
         "app.workers.gpu.tasks",
+        "app.workers.gpu.warmup",  # boot-time preloading + readiness signal
     ]
 )
 
+TASK_TIME_LIMIT_SECONDS = 3600 * 2  # 2 hours max
+
 celery_app.conf.update(
     task_serializer="json",
     accept_content=["json"],
@@ -21,7 +24,12 @@ celery_app.conf.update(
     timezone="UTC",
     enable_utc=True,
     task_track_started=True,
-    task_time_limit=3600 * 2,  # 2 hours max
+    task_time_limit=TASK_TIME_LIMIT_SECONDS,
+    # Redis redelivers unacked messages after visibility_timeout (default 1h). Late-acked tasks
+    # (training, generation) may run up to the time limit, so the timeout must outlast one
+    # attempt; each retry is a new message with its own window. Lost work of a crashed worker
+    # is redelivered after this timeout.
+    broker_transport_options={"visibility_timeout": TASK_TIME_LIMIT_SECONDS + 600},
     worker_prefetch_multiplier=1,
     task_always_eager=settings.CELERY_ALWAYS_EAGER,
     task_eager_propagates=True,
@@ -37,6 +37,14 @@ class PhotoAsset(Base):
     status = Column(String(50), default="uploaded")  # uploaded, processed, rejected, duplicate
     phash = Column(String(64), nullable=True, index=True)  # Perceptual hash for deduplication
     is_duplicate = Column(Boolean, default=False)
+    processed_s3_key = Column(String(512), nullable=True)  # Normalized JPEG used for training
+    processed_width = Column(Integer, nullable=True)
+    processed_height = Column(Integer, nullable=True)
+    processed_sha256 = Column(String(64), nullable=True)
+    sharpness = Column(Float, nullable=True)  # Laplacian variance of the (face) crop
+    face_count = Column(Integer, nullable=True)  # Null if face detection did not run
+    face_box_json = Column(JSON, nullable=True)  # [x, y, w, h] of the largest face
+    rejection_reason = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationships
@@ -54,6 +62,7 @@ class PreprocessRun(Base):
     images_rejected = Column(Integer, default=0)
     images_duplicates = Column(Integer, default=0)
     output_s3_prefix = Column(String(512), nullable=True)
+    manifest_s3_key = Column(String(512), nullable=True)  # Dataset manifest (JSON) written by this run
     error_message = Column(Text, nullable=True)
     started_at = Column(DateTime(timezone=True), nullable=True)
     finished_at = Column(DateTime(timezone=True), nullable=True)
@@ -107,11 +116,12 @@ class Job(Base):
     __tablename__ = "jobs"
     
     id = Column(Integer, primary_key=True, index=True)
-    job_type = Column(String(50), nullable=False, index=True)  # preprocess, train, generate
+    job_type = Column(String(50), nullable=False, index=True)  # preprocess, train, generate, purge
     status = Column(String(50), default="pending")  # pending, started, finished, failed
     celery_task_id = Column(String(255), nullable=True, unique=True, index=True)
     
     # Foreign keys (optional, depending on job type)
+    person_id = Column(Integer, ForeignKey("person_profiles.id"), nullable=True, index=True)  # purge
     preprocess_run_id = Column(Integer, ForeignKey("preprocess_runs.id"), nullable=True)
     model_version_id = Column(Integer, ForeignKey("model_versions.id"), nullable=True)
     generation_id = Column(Integer, ForeignKey("generations.id"), nullable=True)
@@ -155,9 +165,17 @@ class Generation(Base):
     width = Column(Integer, default=512)
     height = Column(Integer, default=512)
     seed = Column(Integer, nullable=True)
+    num_images = Column(Integer, default=1, nullable=False)
+    seeds_json = Column(JSON, nullable=True)  # Explicit per-image seeds (len == num_images)
+    precision = Column(String(20), default="fp32", nullable=False)  # fp32, bf16-autocast
+    channels_last = Column(Boolean, default=False, nullable=False)
     status = Column(String(50), default="pending")  # pending, generating, completed, failed
-    output_s3_key = Column(String(512), nullable=True)
+    claimed_by = Column(String(255), nullable=True)  # Celery task id running the generation
+    claimed_at = Column(DateTime(timezone=True), nullable=True)
+    output_s3_key = Column(String(512), nullable=True)  # First image (kept for single-image clients)
     thumbnail_s3_key = Column(String(512), nullable=True)
+    output_s3_keys_json = Column(JSON, nullable=True)  # All images of the batch
+    thumbnail_s3_keys_json = Column(JSON, nullable=True)
     error_message = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -0,0 +1,111 @@
+"""
+Local content-addressed cache for S3 artifact directories (e.g. LoRA adapters).
+
+An entry is identified by the S3 prefix plus the (relative key, ETag, size) of every object
+under it, so re-uploaded artifacts get a new entry while repeat generations against the same
+model version are served from disk. Entries are populated in a staging directory and renamed
+into place atomically; least recently used entries are removed once the size budget is exceeded.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from app.core.config import get_models_dir, settings
+from app.core.logging import get_logger
+from app.services.s3 import get_s3_service
+
+logger = get_logger(__name__)
+
+
+def _dir_size(path: Path) -> int:
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+
+
+class ArtifactCache:
+    """Size-bounded on-disk cache of S3 prefixes."""
+
+    def __init__(self, root: Path, max_bytes: int, s3: Optional[Any] = None):
+        self.root = Path(root)
+        self.max_bytes = int(max_bytes)
+        self._s3 = s3
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def s3(self) -> Any:
+        return self._s3 if self._s3 is not None else get_s3_service()
+
+    @staticmethod
+    def digest_for(prefix: str, objects: list[dict]) -> str:
+        h = hashlib.sha256(prefix.encode("utf-8"))
+        for obj in sorted(objects, key=lambda o: o["key"]):
+            h.update(f"\0{obj['key'][len(prefix):]}\0{obj['etag']}\0{obj['size']}".encode("utf-8"))
+        return h.hexdigest()[:32]
+
+    def fetch(self, prefix: str) -> Path:
+        """Return a local directory mirroring `prefix`, downloading it on a cache miss."""
+        objects = [o for o in self.s3.list_objects(prefix) if not o["key"].endswith("/")]
+        if not objects:
+            raise RuntimeError(f"No artifacts found in S3 under prefix: {prefix}")
+
+        entry_dir = self.root / self.digest_for(prefix, objects)
+        with self._lock:
+            if entry_dir.is_dir():
+                os.utime(entry_dir)  # mtime doubles as LRU timestamp
+                self.hits += 1
+                logger.info("artifact_cache_hit", prefix=prefix, path=str(entry_dir))
+                return entry_dir
+
+            self.misses += 1
+            self.root.mkdir(parents=True, exist_ok=True)
+            staging = Path(tempfile.mkdtemp(prefix=".staging-", dir=str(self.root)))
+            try:
+                self.s3.download_many((obj["key"], staging / obj["key"][len(prefix):]) for obj in objects)
+                try:
+                    os.replace(staging, entry_dir)
+                except OSError:
+                    # Another process populated the same entry first; its copy is identical.
+                    if not entry_dir.is_dir():
+                        raise
+            finally:
+                shutil.rmtree(staging, ignore_errors=True)
+
+            logger.info("artifact_cache_populated", prefix=prefix, path=str(entry_dir), files=len(objects))
+            self._evict(keep=entry_dir)
+            return entry_dir
+
+    def _evict(self, keep: Path) -> None:
+        entries = [p for p in self.root.iterdir() if p.is_dir() and not p.name.startswith(".")]
+        sizes = {p: _dir_size(p) for p in entries}
+        total = sum(sizes.values())
+        for p in sorted(entries, key=lambda e: e.stat().st_mtime):
+            if total <= self.max_bytes:
+                break
+            if p == keep:
+                continue
+            shutil.rmtree(p, ignore_errors=True)
+            total -= sizes[p]
+            self.evictions += 1
+            logger.info("artifact_cache_evicted", path=str(p), size_bytes=sizes[p])
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+@lru_cache(maxsize=1)
+def get_lora_artifact_cache() -> ArtifactCache:
+    """Per-process cache of LoRA adapter directories under models/cache/lora."""
+    return ArtifactCache(
+        root=get_models_dir() / "cache" / "lora",
+        max_bytes=settings.LORA_ARTIFACT_CACHE_MB * 1024 * 1024,
+    )
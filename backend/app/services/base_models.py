@@ -1,9 +1,31 @@
+"""
+Offline base model provisioning.
+
+Base models live in MinIO under `models/base/<slug>/` together with `.manifest.json` (written
+last by scripts/upload_base_model.py) listing every file's relative path, size and sha256.
+A local sync writes `.sync_stamp.json` into the model directory once every file is in place,
+so the warm path is a single stat. Cold or interrupted syncs compare the local files against
+the manifest and only download missing or changed files (concurrently).
+
+Syncs are serialized per model across processes by a file lock next to the model directory.
+Files are assembled in `.staging-<slug>` (current files are hard-linked from the installed copy,
+an interrupted staging dir is resumed) and the finished directory is renamed into place, so a
+model directory is either the complete previous version or the complete new one.
+"""
+
 from __future__ import annotations
 
+import hashlib
+import json
 import os
 import re
+import shutil
+import tempfile
+import uuid
 from pathlib import Path
-from typing import Optional
+from typing import Any, Dict, Iterable, Optional
+
+from filelock import FileLock, Timeout
 
 from app.core.config import get_models_dir, settings
 from app.core.logging import get_logger
@@ -43,6 +65,148 @@ def resolve_base_model_dir(base_model_name: str) -> Path:
     return (get_models_dir() / "base" / slug).resolve()
 
 
+MANIFEST_NAME = ".manifest.json"
+STAMP_NAME = ".sync_stamp.json"
+MANIFEST_VERSION = 1
+
+
+def base_model_prefix(base_model_name: str) -> str:
+    return f"models/base/{_slugify_base_model_id(base_model_name)}/"
+
+
+def file_sha256(path: Path, chunk_size: int = 8 * 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def build_base_model_manifest(src_dir: Path, files: Iterable[Path]) -> Dict[str, Any]:
+    """Manifest (relative path, size, sha256 per file) of a local model directory."""
+    entries = []
+    for p in sorted(files):
+        entries.append({"path": p.relative_to(src_dir).as_posix(), "size": p.stat().st_size, "sha256": file_sha256(p)})
+    return {"version": MANIFEST_VERSION, "files": entries}
+
+
+def _remote_manifest(prefix: str) -> Optional[Dict[str, Any]]:
+    """
+    The base model's manifest from MinIO, or None when the prefix is empty.
+
+    Models uploaded before manifests existed get one built from the listing (size + ETag).
+    `etag` identifies the remote state and is recorded in the local stamp.
+    """
+    objects = [o for o in s3_service.list_objects(prefix) if not o["key"].endswith("/")]
+    if not objects:
+        return None
+    by_key = {o["key"]: o for o in objects}
+    manifest_obj = by_key.get(prefix + MANIFEST_NAME)
+    if manifest_obj is None:
+        return {
+            "version": MANIFEST_VERSION,
+            "etag": "listing:" + hashlib.sha256(
+                "".join(f"{o['key']}:{o['etag']};" for o in sorted(objects, key=lambda o: o["key"])).encode()
+            ).hexdigest(),
+            "files": [
+                {"path": o["key"][len(prefix):], "size": o["size"], "etag": o["etag"]}
+                for o in sorted(objects, key=lambda o: o["key"])
+            ],
+        }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        local = Path(tmp) / MANIFEST_NAME
+        s3_service.download_file(manifest_obj["key"], str(local))
+        manifest = json.loads(local.read_text(encoding="utf-8"))
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise RuntimeError(f"Unsupported base model manifest version in {prefix}: {manifest.get('version')!r}")
+    manifest["etag"] = manifest_obj["etag"]
+    return manifest
+
+
+def _read_stamp(base_dir: Path) -> Optional[Dict[str, Any]]:
+    try:
+        return json.loads((base_dir / STAMP_NAME).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def _write_stamp(base_dir: Path, manifest: Dict[str, Any]) -> None:
+    tmp = base_dir / (STAMP_NAME + ".tmp")
+    tmp.write_text(json.dumps({"etag": manifest["etag"], "files": manifest["files"]}, indent=2), encoding="utf-8")
+    os.replace(tmp, base_dir / STAMP_NAME)
+
+
+def _is_current(path: Path, entry: Dict[str, Any], previous: Optional[Dict[str, Any]]) -> bool:
+    """Whether the local file matches a manifest entry (size, then sha256 unless already recorded)."""
+    try:
+        if path.stat().st_size != entry["size"]:
+            return False
+    except OSError:
+        return False
+    if previous == entry:
+        return True  # synced from this exact entry before
+    if entry.get("sha256"):
+        return file_sha256(path) == entry["sha256"]
+    return previous is None or previous.get("etag") == entry.get("etag")
+
+
+def _link_or_copy(src: Path, dst: Path) -> None:
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        os.link(src, dst)
+    except OSError:  # other filesystem / no hard link support
+        shutil.copy2(src, dst)
+
+
+def _swap_into_place(staging: Path, base_dir: Path) -> None:
+    """Rename `staging` to `base_dir`, replacing (and then removing) an existing directory."""
+    old = None
+    if base_dir.exists():
+        old = base_dir.with_name(f".old-{base_dir.name}-{uuid.uuid4().hex[:8]}")
+        os.replace(base_dir, old)
+    os.replace(staging, base_dir)
+    if old is not None:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+def _sync_from_manifest(base_dir: Path, prefix: str, manifest: Dict[str, Any]) -> int:
+    """
+    Build `manifest` in the staging directory and rename it to `base_dir`; returns the number of
+    files downloaded. The caller holds the model's install lock.
+    """
+    staging = base_dir.with_name(f".staging-{base_dir.name}")
+    staging.mkdir(parents=True, exist_ok=True)
+    old_stamp = _read_stamp(base_dir) or {}
+    previous = {e["path"]: e for e in old_stamp.get("files", [])}
+
+    stale = []
+    for e in manifest["files"]:
+        if _is_current(staging / e["path"], e, None):
+            continue  # left by an interrupted sync
+        (staging / e["path"]).unlink(missing_ok=True)
+        if _is_current(base_dir / e["path"], e, previous.get(e["path"])):
+            _link_or_copy(base_dir / e["path"], staging / e["path"])
+        else:
+            stale.append(e)
+    if stale:
+        s3_service.download_many((prefix + e["path"], staging / e["path"]) for e in stale)
+    for e in stale:
+        size = (staging / e["path"]).stat().st_size
+        if size != e["size"]:
+            raise RuntimeError(f"Size mismatch after download of {prefix + e['path']}: {size} != {e['size']}")
+
+    if not _looks_like_diffusers_model(staging):
+        raise RuntimeError(f"Downloaded base model from MinIO but it doesn't look complete: {staging}")
+    _write_stamp(staging, manifest)
+    _swap_into_place(staging, base_dir)
+    return len(stale)
+
+
+def _install_lock(base_dir: Path) -> FileLock:
+    return FileLock(str(base_dir.with_name(f".{base_dir.name}.lock")))
+
+
 def _looks_like_diffusers_model(dir_path: Path) -> bool:
     """
     Check if a local folder looks like a *complete* diffusers pipeline.
@@ -78,24 +242,42 @@ def _looks_like_diffusers_model(dir_path: Path) -> bool:
     return True
 
 
-def ensure_base_model_present(base_model_name: str) -> Path:
+def ensure_base_model_present(base_model_name: str, refresh: bool = False) -> Path:
     """
     Ensure base model exists locally. Runtime never downloads from Hugging Face.
     If missing locally, it will be fetched from MinIO prefix:
       s3://<bucket>/models/base/<slug>/**
+
+    A synced directory (stamp present) is returned without touching MinIO; `refresh=True`
+    re-checks the remote manifest and fetches whatever changed. A complete directory without a
+    stamp (e.g. installed by scripts/download_base_model.py) is synced against MinIO when the
+    model was uploaded there, and used as-is when it was not (or MinIO is unreachable).
     """
     base_dir = resolve_base_model_dir(base_model_name)
-    base_dir.mkdir(parents=True, exist_ok=True)
 
-    # Fast-path: already present
-    has_any_file = any(base_dir.rglob("*"))
-    if has_any_file and _looks_like_diffusers_model(base_dir):
+    # Fast-path: synced before
+    if not refresh and (base_dir / STAMP_NAME).is_file():
         return base_dir
 
-    slug = _slugify_base_model_id(base_model_name)
-    prefix = f"models/base/{slug}/"
-    keys = s3_service.list_files(prefix)
-    if not keys:
+    # A local directory passed explicitly is used as-is when complete.
+    managed_dir = (get_models_dir() / "base" / _slugify_base_model_id(base_model_name)).resolve()
+    local_complete = _looks_like_diffusers_model(base_dir)
+    if base_dir != managed_dir and local_complete:
+        return base_dir
+
+    prefix = base_model_prefix(base_model_name)
+    try:
+        manifest = _remote_manifest(prefix)
+    except Exception as e:
+        if not local_complete:
+            raise
+        logger.warning("base_model_remote_check_failed", requested=base_model_name, prefix=prefix, error=str(e))
+        return base_dir
+    if manifest is None and local_complete:
+        # Installed locally and never uploaded to MinIO: nothing to sync against.
+        logger.info("base_model_local_only", requested=base_model_name, path=str(base_dir))
+        return base_dir
+    if manifest is None:
         msg = (
             f"Base model not available offline.\n"
             f"- requested: {base_model_name!r}\n"
@@ -105,19 +287,38 @@ def ensure_base_model_present(base_model_name: str) -> Path:
         )
         raise RuntimeError(msg)
 
-    logger.info("base_model_downloading_from_s3", requested=base_model_name, prefix=prefix, dest=str(base_dir))
-    for key in keys:
-        if key.endswith("/"):
-            continue
-        rel = key[len(prefix) :]
-        out_path = base_dir / rel
-        out_path.parent.mkdir(parents=True, exist_ok=True)
-        s3_service.download_file(key, str(out_path))
-
-    if not _looks_like_diffusers_model(base_dir):
-        raise RuntimeError(f"Downloaded base model from MinIO but it doesn't look complete: {base_dir}")
+    base_dir.parent.mkdir(parents=True, exist_ok=True)
+    lock = _install_lock(base_dir)
+    try:
+        lock.acquire(timeout=0)
+    except Timeout:
+        # Another worker on this host is installing the same model: wait for it instead of
+        # downloading it a second time.
+        logger.info("base_model_waiting_for_install", requested=base_model_name, lock=lock.lock_file)
+        try:
+            lock.acquire(timeout=settings.BASE_MODEL_LOCK_TIMEOUT_SECONDS)
+        except Timeout as e:
+            raise RuntimeError(
+                f"Timed out after {settings.BASE_MODEL_LOCK_TIMEOUT_SECONDS}s waiting for the base model "
+                f"install lock {lock.lock_file}"
+            ) from e
+    try:
+        stamp = _read_stamp(base_dir)
+        if stamp and stamp.get("etag") == manifest["etag"]:
+            return base_dir  # installed meanwhile (or already current)
 
-    return base_dir
+        logger.info("base_model_syncing_from_s3", requested=base_model_name, prefix=prefix, dest=str(base_dir))
+        fetched = _sync_from_manifest(base_dir, prefix, manifest)
+        logger.info(
+            "base_model_synced",
+            requested=base_model_name,
+            files=len(manifest["files"]),
+            fetched=fetched,
+            etag=manifest["etag"],
+        )
+        return base_dir
+    finally:
+        lock.release()
 
 
 def apply_runtime_offline_env() -> None:
@@ -0,0 +1,92 @@
+"""
+Training dataset manifests.
+
+Every finished `PreprocessRun` writes a JSON manifest listing the person's processed photos at
+that point (photo id, phash, object key, dimensions, sha256, quality scores). Training downloads
+exactly those objects instead of listing the shared `datasets/processed/<person_id>/` prefix,
+and drops entries whose photo has been deleted since, so stale objects never leak into a dataset.
+Downloaded files are checked against the recorded sha256 (see verify_downloads).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, Collection, Dict, Iterable, List
+
+from app.db import models
+
+MANIFEST_VERSION = 1
+
+
+def dataset_prefix(person_id: int) -> str:
+    return f"datasets/processed/{person_id}/"
+
+
+def manifest_key(person_id: int, preprocess_run_id: int) -> str:
+    return f"{dataset_prefix(person_id)}manifests/run_{preprocess_run_id}.json"
+
+
+def legacy_processed_key(photo: models.PhotoAsset) -> str:
+    """Object key used for photos processed before keys were stored on the row."""
+    return f"{dataset_prefix(photo.person_id)}processed_{photo.id}.jpg"
+
+
+def manifest_entry(photo: models.PhotoAsset) -> Dict[str, Any]:
+    return {
+        "photo_id": photo.id,
+        "phash": photo.phash,
+        "key": photo.processed_s3_key or legacy_processed_key(photo),
+        "width": photo.processed_width,
+        "height": photo.processed_height,
+        "sha256": photo.processed_sha256,
+        "sharpness": photo.sharpness,
+        "face_count": photo.face_count,
+    }
+
+
+def build_manifest(person_id: int, preprocess_run_id: int, photos: Iterable[models.PhotoAsset]) -> Dict[str, Any]:
+    """Manifest of the given processed photos (ordered by photo id)."""
+    return {
+        "version": MANIFEST_VERSION,
+        "person_id": person_id,
+        "preprocess_run_id": preprocess_run_id,
+        "images": [manifest_entry(p) for p in sorted(photos, key=lambda p: p.id)],
+    }
+
+
+def write_manifest(manifest: Dict[str, Any], path: Path) -> Path:
+    path = Path(path)
+    path.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    return path
+
+
+def read_manifest(path: Path) -> Dict[str, Any]:
+    manifest = json.loads(Path(path).read_text(encoding="utf-8"))
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise ValueError(f"Unsupported dataset manifest version: {manifest.get('version')!r}")
+    return manifest
+
+
+def live_entries(manifest: Dict[str, Any], live_photo_ids: Collection[int]) -> List[Dict[str, Any]]:
+    """Manifest entries whose photo still exists (and is still processed)."""
+    return [e for e in manifest["images"] if e["photo_id"] in live_photo_ids]
+
+
+def verify_downloads(entries: Iterable[Dict[str, Any]], dataset_dir: Path) -> None:
+    """
+    Check files downloaded to `dataset_dir/<key name>` against their manifest sha256 (entries of
+    photos processed before digests were recorded have none and are skipped).
+    Raises ValueError naming the corrupt or overwritten objects.
+    """
+    mismatched = []
+    for entry in entries:
+        expected = entry.get("sha256")
+        if not expected:
+            continue
+        path = Path(dataset_dir) / Path(entry["key"]).name
+        if hashlib.sha256(path.read_bytes()).hexdigest() != expected:
+            mismatched.append(entry["key"])
+    if mismatched:
+        raise ValueError(f"Dataset objects do not match the manifest sha256: {', '.join(mismatched)}")
@@ -0,0 +1,85 @@
+"""
+Face-aware cropping and sharpness scoring for preprocessing (CPU only).
+
+- Faces are found with OpenCV's bundled frontal-face Haar cascade (`opencv-python-headless`).
+  If OpenCV is not installed, detection is skipped and photos are kept uncropped.
+- Sharpness is the variance of the 3x3 Laplacian over the (face) region, measured at a fixed
+  scale so one threshold works for every input size. Blurry frames score low.
+"""
+
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+Box = Tuple[int, int, int, int]  # x, y, w, h
+
+SHARPNESS_SIZE = 512
+
+
+@lru_cache(maxsize=1)
+def _face_cascade() -> Optional[Any]:
+    try:
+        import cv2
+    except ImportError:
+        logger.warning("face_detection_unavailable", reason="opencv-python-headless not installed")
+        return None
+    cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+    if cascade.empty():
+        logger.warning("face_detection_unavailable", reason="haar cascade not found")
+        return None
+    return cascade
+
+
+def detect_faces(img: Image.Image) -> Optional[List[Box]]:
+    """Face boxes, largest first; None when detection is unavailable."""
+    cascade = _face_cascade()
+    if cascade is None:
+        return None
+    gray = np.asarray(img.convert("L"))
+    min_side = max(24, int(min(gray.shape) * 0.08))
+    faces = cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(min_side, min_side))
+    boxes = [tuple(int(v) for v in f) for f in faces]
+    return sorted(boxes, key=lambda b: b[2] * b[3], reverse=True)
+
+
+def face_crop_box(
+    size: Tuple[int, int],
+    face: Box,
+    scale: float = 2.5,
+    min_side: int = 512,
+) -> Tuple[int, int, int, int]:
+    """
+    Square crop (left, top, right, bottom) around `face`: `scale` times the face size but at
+    least `min_side` px (so training does not upsample), centred slightly below the face centre
+    (head and shoulders framing) and shifted to stay inside the image.
+    """
+    width, height = size
+    x, y, w, h = face
+    side = int(min(max(max(w, h) * scale, min_side), width, height))
+    cx = x + w / 2.0
+    cy = y + h / 2.0 + 0.1 * h  # include some neck/shoulders below the face
+    left = int(round(min(max(cx - side / 2.0, 0), width - side)))
+    top = int(round(min(max(cy - side / 2.0, 0), height - side)))
+    return left, top, left + side, top + side
+
+
+def laplacian_variance(img: Image.Image) -> float:
+    """Variance of the Laplacian of the grayscale image, resized to SHARPNESS_SIZE on the long side."""
+    gray = img.convert("L")
+    scale = SHARPNESS_SIZE / float(max(gray.size))
+    if scale < 1.0:
+        gray = gray.resize(
+            (max(3, int(gray.width * scale)), max(3, int(gray.height * scale))),
+            Image.Resampling.BILINEAR,
+        )
+    g = np.asarray(gray, dtype=np.float32)
+    lap = g[1:-1, :-2] + g[1:-1, 2:] + g[:-2, 1:-1] + g[2:, 1:-1] - 4.0 * g[1:-1, 1:-1]
+    return float(lap.var())
@@ -0,0 +1,111 @@
+"""
+Named LoRA adapters hot-swapped on a shared (cached) base UNet.
+
+Instead of wrapping the UNet with a fresh PeftModel per request, every cached pipeline keeps
+one PeftModel wrapper and loads each model version's adapter under its own name. A request
+activates its adapter (or disables all adapters for base-only generation); the least recently
+used adapters are deleted once more than `max_adapters` are resident. An adapter requested with
+a different `lora_path` than the one it was loaded from (re-uploaded artifacts) is reloaded.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from peft import PeftModel
+
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+def adapter_name_for(model_version_id: Optional[int], lora_path: str) -> str:
+    """Stable adapter name (must be a valid module key, so no dots)."""
+    if model_version_id:
+        return f"mv_{int(model_version_id)}"
+    return "path_" + hashlib.sha1(str(lora_path).encode("utf-8")).hexdigest()[:12]
+
+
+class LoraAdapterSet:
+    """LRU set of PEFT adapters loaded onto `pipe.unet`."""
+
+    def __init__(self, pipe: Any, max_adapters: int):
+        self.pipe = pipe
+        self.max_adapters = max(1, int(max_adapters))
+        self._loaded: "OrderedDict[str, str]" = OrderedDict()  # adapter name -> lora dir
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+
+    @contextmanager
+    def activate(self, adapter_name: Optional[str], lora_path: Optional[str] = None) -> Iterator[None]:
+        """
+        Run the enclosed block with only `adapter_name` active.
+
+        `adapter_name=None` runs the plain base model (adapters disabled, not unloaded).
+        """
+        with self._lock:
+            if adapter_name is None:
+                unet = self.pipe.unet
+                if isinstance(unet, PeftModel):
+                    with unet.disable_adapter():
+                        yield
+                else:
+                    yield
+                return
+
+            if not lora_path and adapter_name not in self._loaded:
+                raise ValueError(f"LoRA adapter {adapter_name!r} is not loaded and no lora_path was given")
+            self._ensure_loaded(adapter_name, lora_path)
+            self.pipe.unet.set_adapter(adapter_name)
+            yield
+
+    def preload(self, adapter_name: str, lora_path: str) -> None:
+        """Load an adapter without activating it (worker warm-up)."""
+        with self._lock:
+            self._ensure_loaded(adapter_name, lora_path)
+
+    def _ensure_loaded(self, adapter_name: str, lora_path: Optional[str]) -> None:
+        if adapter_name in self._loaded:
+            if not lora_path or self._loaded[adapter_name] == str(lora_path):
+                self._loaded.move_to_end(adapter_name)
+                self.hits += 1
+                return
+            # Same model version, new artifact content (the artifact cache gave a new dir):
+            # drop the stale weights and load the current ones under the same name.
+            stale = self._loaded.pop(adapter_name)
+            self.pipe.unet.delete_adapter(adapter_name)
+            logger.info("lora_adapter_stale", adapter=adapter_name, lora_path=stale)
+
+        unet = self.pipe.unet
+        if isinstance(unet, PeftModel):
+            unet.load_adapter(lora_path, adapter_name=adapter_name)
+        else:
+            self.pipe.unet = PeftModel.from_pretrained(unet, lora_path, adapter_name=adapter_name)
+        self._loaded[adapter_name] = str(lora_path)
+        self.loads += 1
+        logger.info("lora_adapter_loaded", adapter=adapter_name, lora_path=str(lora_path), **self.stats())
+
+        while len(self._loaded) > self.max_adapters:
+            evicted, _ = self._loaded.popitem(last=False)
+            self.pipe.unet.delete_adapter(evicted)
+            self.evictions += 1
+            logger.info("lora_adapter_evicted", adapter=evicted)
+
+    def loaded(self) -> list[str]:
+        with self._lock:
+            return list(self._loaded.keys())
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "adapters": len(self._loaded),
+            "max_adapters": self.max_adapters,
+            "hits": self.hits,
+            "loads": self.loads,
+            "evictions": self.evictions,
+        }
@@ -8,60 +8,186 @@ CPU-only inference is supported but can be very slow.
 from __future__ import annotations
 
 import os
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional, Callable
+from typing import List, Optional, Callable, Sequence, Tuple
 
 import torch
 from PIL import Image
 
 from diffusers import StableDiffusionPipeline
-from peft import PeftModel
 
+from app.core.config import settings
 from app.core.logging import get_logger
 from app.services.base_models import apply_runtime_offline_env, ensure_base_model_present
+from app.services.inference.adapters import LoraAdapterSet, adapter_name_for
+from app.services.inference.pipeline_cache import get_pipeline_cache
+from app.services.precision import (
+    PRECISION_FP32,
+    autocast,
+    normalize_precision,
+    to_channels_last,
+    warn_if_emulated,
+)
 
 logger = get_logger(__name__)
 
 
-def generate_image(
-    prompt: str,
-    negative_prompt: Optional[str] = None,
+@dataclass
+class WarmPipeline:
+    """A cached pipeline together with the LoRA adapters loaded onto its UNet."""
+
+    pipe: StableDiffusionPipeline
+    adapters: LoraAdapterSet
+
+
+def _load_pipeline(base_model_dir: Path, device: torch.device, channels_last: bool = False) -> WarmPipeline:
+    pipe = StableDiffusionPipeline.from_pretrained(
+        str(base_model_dir),
+        safety_checker=None,
+        requires_safety_checker=False,
+        torch_dtype=torch.float32,
+        local_files_only=True,
+    )
+    pipe.to(device)
+    pipe.enable_attention_slicing()
+    pipe.enable_vae_slicing()
+    if channels_last:
+        to_channels_last(pipe.unet, pipe.vae)
+    return WarmPipeline(pipe=pipe, adapters=LoraAdapterSet(pipe, settings.INFERENCE_MAX_LORA_ADAPTERS))
+
+
+def _pipeline_nbytes(warm: WarmPipeline) -> int:
+    """Approximate resident size of a pipeline (parameters + buffers of its torch modules)."""
+    total = 0
+    for component in warm.pipe.components.values():
+        if not isinstance(component, torch.nn.Module):
+            continue
+        for t in (*component.parameters(), *component.buffers()):
+            total += t.numel() * t.element_size()
+    return total
+
+
+def get_pipeline(base_model_dir: Path, device: torch.device, channels_last: bool = False) -> WarmPipeline:
+    """
+    Return a warm pipeline for `base_model_dir` from the per-process cache.
+
+    channels_last changes the weights' memory format, so it is part of the cache key; the
+    precision mode is only an autocast context and shares the same pipeline.
+    """
+    key = str(base_model_dir) + ("|channels_last" if channels_last else "")
+    return get_pipeline_cache().get_or_load(
+        key,
+        loader=lambda: _load_pipeline(base_model_dir, device, channels_last),
+        sizeof=_pipeline_nbytes,
+    )
+
+
+def preload_pipeline(
+    base_model_name: str,
+    channels_last: bool = False,
+    adapters: Sequence[Tuple[Optional[int], str]] = (),
+) -> WarmPipeline:
+    """
+    Sync `base_model_name` from MinIO and load it into the pipeline cache, together with
+    (model_version_id, lora_path) adapters, so the first request finds everything warm.
+    """
+    apply_runtime_offline_env()
+    base_model_dir = ensure_base_model_present(base_model_name)
+    warm = get_pipeline(base_model_dir, torch.device("cpu"), channels_last=channels_last)
+    for model_version_id, lora_path in adapters:
+        warm.adapters.preload(adapter_name_for(model_version_id, lora_path), lora_path)
+    return warm
+
+
+def resolve_seeds(seed: Optional[int], seeds: Optional[List[int]], num_images: int) -> Optional[List[int]]:
+    """
+    Per-image seeds for a batch.
+
+    Explicit `seeds` win; otherwise a single `seed` expands to seed, seed+1, ... so image i
+    of a batch is reproducible on its own. Without either, generation stays unseeded.
+    """
+    if seeds:
+        if len(seeds) != num_images:
+            raise ValueError(f"Expected {num_images} seeds, got {len(seeds)}")
+        return [int(s) for s in seeds]
+    if seed is not None:
+        return [int(seed) + i for i in range(num_images)]
+    return None
+
+
+@dataclass
+class GenerationRequest:
+    """One request inside a batch: its prompt(s), image count, seeds and output files."""
+
+    prompt: str
+    negative_prompt: Optional[str] = None
+    num_images: int = 1
+    seed: Optional[int] = None
+    seeds: Optional[List[int]] = None
+    output_paths: Optional[List[str]] = None
+
+
+def generate_batch(
+    requests: List[GenerationRequest],
     model_version_id: int = None,
     lora_path: Optional[str] = None,
     steps: int = 30,
     width: int = 512,
     height: int = 512,
-    seed: Optional[int] = None,
-    output_path: str = None,
     base_model_name: str = "sd15",
     hf_token: Optional[str] = None,
     progress_callback: Optional[Callable[[int, int], None]] = None,
-) -> str:
-    logger.info("generation_started", prompt=prompt[:80], steps=steps, width=width, height=height)
+    precision: str = PRECISION_FP32,
+    channels_last: bool = False,
+) -> List[List[str]]:
+    """
+    Run several generation requests that share base model, adapter, resolution and step count
+    as one batched denoising pass.
+
+    Each distinct prompt is encoded once and repeated per image, and every UNet step runs on
+    the whole batch. Returns the saved output paths per request, in request order.
+    `precision`/`channels_last` select the CPU execution mode (see app.services.precision).
+    """
+    if not requests:
+        return []
+    precision = normalize_precision(precision)
+    warn_if_emulated(precision)
+    logger.info(
+        "generation_started",
+        prompts=[r.prompt[:80] for r in requests],
+        steps=steps,
+        width=width,
+        height=height,
+        num_images=sum(max(1, int(r.num_images)) for r in requests),
+        precision=precision,
+        channels_last=channels_last,
+    )
 
     device = torch.device("cpu")
 
     apply_runtime_offline_env()
     base_model_dir = ensure_base_model_present(base_model_name)
 
-    pipe = StableDiffusionPipeline.from_pretrained(
-        str(base_model_dir),
-        safety_checker=None,
-        requires_safety_checker=False,
-        torch_dtype=torch.float32,
-        local_files_only=True,
-    )
-    pipe.to(device)
-    pipe.enable_attention_slicing()
-    pipe.enable_vae_slicing()
+    warm = get_pipeline(base_model_dir, device, channels_last=channels_last)
+    pipe = warm.pipe
 
-    if lora_path:
-        # Load PEFT adapter into UNet
-        pipe.unet = PeftModel.from_pretrained(pipe.unet, lora_path)
+    # Adapters are keyed by model version and stay loaded on the shared UNet between requests.
+    adapter_name = adapter_name_for(model_version_id, lora_path) if lora_path else None
 
+    # One generator per image; unseeded images in a seeded batch get a random seed.
+    batch_seeds = [resolve_seeds(r.seed, r.seeds, max(1, int(r.num_images))) for r in requests]
     generator = None
-    if seed is not None:
-        generator = torch.Generator(device=device).manual_seed(int(seed))
+    if any(seeds is not None for seeds in batch_seeds):
+        generator = []
+        for r, seeds in zip(requests, batch_seeds):
+            for i in range(max(1, int(r.num_images))):
+                g = torch.Generator(device=device)
+                if seeds is not None:
+                    g.manual_seed(seeds[i])
+                else:
+                    g.seed()
+                generator.append(g)
 
     total_steps = int(steps)
 
@@ -69,24 +195,140 @@ def generate_image(
         if progress_callback:
             progress_callback(int(step), total_steps)
 
-    image: Image.Image = pipe(
+    with warm.adapters.activate(adapter_name, lora_path), autocast(precision):
+        with torch.no_grad():
+            embeds = [
+                pipe.encode_prompt(
+                    r.prompt,
+                    device,
+                    max(1, int(r.num_images)),
+                    True,  # classifier-free guidance (guidance_scale > 1)
+                    r.negative_prompt if r.negative_prompt else None,
+                )
+                for r in requests
+            ]
+        images: List[Image.Image] = pipe(
+            prompt_embeds=torch.cat([e[0] for e in embeds]),
+            negative_prompt_embeds=torch.cat([e[1] for e in embeds]),
+            num_inference_steps=int(steps),
+            height=int(height),
+            width=int(width),
+            generator=generator,
+            guidance_scale=7.5,
+            callback=_cb if progress_callback else None,
+            callback_steps=1 if progress_callback else None,
+        ).images
+
+    results: List[List[str]] = []
+    offset = 0
+    for idx, r in enumerate(requests):
+        n = max(1, int(r.num_images))
+        output_paths = r.output_paths or [f"output_{model_version_id or 'x'}_{idx}_{i}.png" for i in range(n)]
+        if len(output_paths) != n:
+            raise ValueError(f"Expected {n} output paths, got {len(output_paths)}")
+
+        saved: List[str] = []
+        for image, path in zip(images[offset : offset + n], output_paths):
+            output_file = Path(path)
+            output_file.parent.mkdir(parents=True, exist_ok=True)
+            image.save(output_file)
+            saved.append(str(output_file))
+        results.append(saved)
+        offset += n
+
+    logger.info(
+        "generation_completed",
+        output_paths=[p for saved in results for p in saved],
+        pipeline_cache=get_pipeline_cache().stats(),
+        lora_adapters=warm.adapters.stats(),
+    )
+    return results
+
+
+def generate_images(
+    prompt: str,
+    negative_prompt: Optional[str] = None,
+    model_version_id: int = None,
+    lora_path: Optional[str] = None,
+    steps: int = 30,
+    width: int = 512,
+    height: int = 512,
+    seed: Optional[int] = None,
+    seeds: Optional[List[int]] = None,
+    num_images: int = 1,
+    output_paths: Optional[List[str]] = None,
+    base_model_name: str = "sd15",
+    hf_token: Optional[str] = None,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+    precision: str = PRECISION_FP32,
+    channels_last: bool = False,
+) -> List[str]:
+    """
+    Generate `num_images` images for one prompt in a single batched denoising pass.
+
+    The prompt is encoded once and every UNet step runs on the whole batch, so N images
+    cost far less than N separate generations.
+    """
+    if not output_paths:
+        output_paths = [f"output_{model_version_id or 'x'}_{i}.png" for i in range(max(1, int(num_images)))]
+    request = GenerationRequest(
+        prompt=prompt,
+        negative_prompt=negative_prompt,
+        num_images=num_images,
+        seed=seed,
+        seeds=seeds,
+        output_paths=output_paths,
+    )
+    return generate_batch(
+        [request],
+        model_version_id=model_version_id,
+        lora_path=lora_path,
+        steps=steps,
+        width=width,
+        height=height,
+        base_model_name=base_model_name,
+        hf_token=hf_token,
+        progress_callback=progress_callback,
+        precision=precision,
+        channels_last=channels_last,
+    )[0]
+
+
+def generate_image(
+    prompt: str,
+    negative_prompt: Optional[str] = None,
+    model_version_id: int = None,
+    lora_path: Optional[str] = None,
+    steps: int = 30,
+    width: int = 512,
+    height: int = 512,
+    seed: Optional[int] = None,
+    output_path: str = None,
+    base_model_name: str = "sd15",
+    hf_token: Optional[str] = None,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+    precision: str = PRECISION_FP32,
+    channels_last: bool = False,
+) -> str:
+    """Generate a single image (see `generate_images`)."""
+    output_file = output_path or f"output_{model_version_id or 'x'}.png"
+    return generate_images(
         prompt=prompt,
-        negative_prompt=negative_prompt if negative_prompt else None,
-        num_inference_steps=int(steps),
-        height=int(height),
-        width=int(width),
-        generator=generator,
-        guidance_scale=7.5,
-        callback=_cb if progress_callback else None,
-        callback_steps=1 if progress_callback else None,
-    ).images[0]
-
-    output_file = Path(output_path) if output_path else Path(f"output_{model_version_id or 'x'}.png")
-    output_file.parent.mkdir(parents=True, exist_ok=True)
-    image.save(output_file)
-
-    logger.info("generation_completed", output_path=str(output_file))
-    return str(output_file)
+        negative_prompt=negative_prompt,
+        model_version_id=model_version_id,
+        lora_path=lora_path,
+        steps=steps,
+        width=width,
+        height=height,
+        seed=seed,
+        num_images=1,
+        output_paths=[output_file],
+        base_model_name=base_model_name,
+        hf_token=hf_token,
+        progress_callback=progress_callback,
+        precision=precision,
+        channels_last=channels_last,
+    )[0]
 
 
 def generate_thumbnail(image_path: str, thumbnail_path: str, size: tuple = (256, 256)) -> str:
@@ -0,0 +1,110 @@
+"""
+Process-resident cache of loaded diffusers pipelines.
+
+Loading a Stable Diffusion pipeline costs seconds and several GB of RAM, so GPU workers
+keep recently used pipelines warm between tasks. Entries are keyed by the resolved base
+model directory and evicted least-recently-used first once the memory budget is exceeded.
+
+This module intentionally does not import torch/diffusers: the loader and size estimator
+are passed in by the caller, which keeps it cheap to import and easy to test.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, Dict, Hashable
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class _Entry:
+    value: Any
+    size_bytes: int
+
+
+class PipelineCache:
+    """LRU cache bounded by an approximate memory budget (bytes)."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = int(max_bytes)
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(e.size_bytes for e in self._entries.values())
+
+    def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Any],
+        sizeof: Callable[[Any], int] = lambda _: 0,
+    ) -> Any:
+        """
+        Return the cached value for `key`, loading (and caching) it on a miss.
+
+        A single entry larger than the whole budget is still cached; it just evicts
+        everything else. With a non-positive budget the cache is bypassed entirely.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                logger.info("pipeline_cache_hit", key=str(key), **self.stats())
+                return entry.value
+
+            self.misses += 1
+            value = loader()
+            if not self.enabled:
+                return value
+
+            size = int(sizeof(value) or 0)
+            self._evict_for(size)
+            self._entries[key] = _Entry(value=value, size_bytes=size)
+            logger.info("pipeline_cache_miss", key=str(key), size_bytes=size, **self.stats())
+            return value
+
+    def _evict_for(self, incoming_bytes: int) -> None:
+        while self._entries and self.total_bytes + incoming_bytes > self.max_bytes:
+            key, entry = self._entries.popitem(last=False)
+            self.evictions += 1
+            logger.info("pipeline_cache_evicted", key=str(key), size_bytes=entry.size_bytes)
+
+    def keys(self) -> list:
+        with self._lock:
+            return list(self._entries.keys())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "total_bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+@lru_cache(maxsize=1)
+def get_pipeline_cache() -> PipelineCache:
+    """Per-process pipeline cache sized from settings."""
+    return PipelineCache(max_bytes=settings.INFERENCE_PIPELINE_CACHE_MB * 1024 * 1024)
@@ -0,0 +1,67 @@
+"""
+S3 cleanup for deleted persons (run by the `cpu.purge_person` task).
+
+All objects belonging to a person (uploaded and processed photos, dataset manifests and latents,
+LoRA artifacts and checkpoints, generated images and thumbnails) are collected first and then
+removed with batched DeleteObjects calls instead of one request per key.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from sqlalchemy.orm import Session
+
+from app.core.logging import get_logger
+from app.db import models
+from app.services.dataset_manifest import dataset_prefix
+
+logger = get_logger(__name__)
+
+
+def uploads_prefix(person_id: int) -> str:
+    return f"uploads/{person_id}/"
+
+
+def lora_prefix(model_version: models.ModelVersion) -> str:
+    # Checkpoints are written under this prefix before the version completes.
+    return model_version.artifact_s3_prefix or f"models/lora/{model_version.id}/"
+
+
+def person_object_keys(db: Session, person: models.PersonProfile, s3: Any) -> List[str]:
+    """Every S3 key owned by `person`: rows' keys plus everything under its prefixes."""
+    keys: Set[str] = set()
+    prefixes = [uploads_prefix(person.id), dataset_prefix(person.id)]
+
+    photos = db.query(models.PhotoAsset).filter(models.PhotoAsset.person_id == person.id).all()
+    for photo in photos:
+        keys.add(photo.s3_key)
+        if photo.processed_s3_key:
+            keys.add(photo.processed_s3_key)
+
+    # Generated images live in the shared outputs/ prefix, so they are deleted by key.
+    for model in person.models:
+        for version in model.versions:
+            prefixes.append(lora_prefix(version))
+            for generation in version.generations:
+                keys.update(generation.output_s3_keys_json or [])
+                keys.update(generation.thumbnail_s3_keys_json or [])
+                keys.update(k for k in (generation.output_s3_key, generation.thumbnail_s3_key) if k)
+
+    # list_objects (unlike list_files) raises on errors, so a failed listing fails the purge.
+    for prefix in prefixes:
+        keys.update(obj["key"] for obj in s3.list_objects(prefix))
+    return sorted(keys)
+
+
+def purge_person_objects(
+    db: Session,
+    person: models.PersonProfile,
+    s3: Any,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+) -> Dict[str, Any]:
+    """Delete all of the person's objects; returns counts and the keys that failed."""
+    keys = person_object_keys(db, person, s3)
+    failures = s3.delete_many(keys, progress_callback=progress_callback) if keys else []
+    logger.info("person_objects_purged", person_id=person.id, deleted=len(keys) - len(failures), failed=len(failures))
+    return {"total": len(keys), "deleted": len(keys) - len(failures), "failed": failures}
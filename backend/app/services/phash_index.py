@@ -0,0 +1,80 @@
+"""
+Near-duplicate lookup over 64-bit perceptual hashes.
+
+A BK-tree keyed by Hamming distance: every child edge is labelled with its distance to the
+parent, so a radius-r query only descends into edges within [d - r, d + r] of the query's
+distance to the node (triangle inequality) instead of comparing against every stored hash.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+def phash_to_int(phash: str) -> int:
+    """Parse the hex string produced by `str(imagehash.phash(img))`."""
+    return int(phash, 16)
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class _Node:
+    __slots__ = ("value", "item", "children")
+
+    def __init__(self, value: int, item: Any):
+        self.value = value
+        self.item = item
+        self.children: Dict[int, "_Node"] = {}
+
+
+class PhashIndex:
+    """BK-tree of phashes; `find` returns the closest stored item within `radius`."""
+
+    def __init__(self, radius: int = 0):
+        self.radius = int(radius)
+        self._root: Optional[_Node] = None
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, phash: str, item: Any) -> None:
+        value = phash_to_int(phash)
+        self._size += 1
+        if self._root is None:
+            self._root = _Node(value, item)
+            return
+        node = self._root
+        while True:
+            d = hamming(value, node.value)
+            child = node.children.get(d)
+            if child is None:
+                node.children[d] = _Node(value, item)
+                return
+            node = child
+
+    def _within(self, value: int, radius: int) -> Iterator[Tuple[int, Any]]:
+        if self._root is None:
+            return
+        stack: List[_Node] = [self._root]
+        while stack:
+            node = stack.pop()
+            d = hamming(value, node.value)
+            if d <= radius:
+                yield d, node.item
+            for edge, child in node.children.items():
+                if d - radius <= edge <= d + radius:
+                    stack.append(child)
+
+    def find(self, phash: str, radius: Optional[int] = None) -> Optional[Tuple[Any, int]]:
+        """Closest (item, distance) within `radius` (default: the index radius), or None."""
+        r = self.radius if radius is None else int(radius)
+        best: Optional[Tuple[Any, int]] = None
+        for d, item in self._within(phash_to_int(phash), r):
+            if best is None or d < best[1]:
+                best = (item, d)
+                if d == 0:
+                    break
+        return best
@@ -0,0 +1,69 @@
+"""
+CPU execution precision and memory format options shared by training and inference.
+
+- `fp32` (default): everything runs in float32, as before.
+- `bf16-autocast`: weights stay float32 (and so do LoRA weights / optimizer state while
+  training), but matmuls and convolutions of the UNet, VAE and text encoder run in bfloat16
+  under `torch.autocast`. Fast on CPUs with native bf16 (AVX512-BF16 / AMX), slow elsewhere.
+- `channels_last`: NHWC memory format for the conv-heavy modules (UNet, VAE), preferred by oneDNN.
+
+Both are selected per model version (`train_config_json.precision` / `.channels_last`, also the
+inference default for that version) and can be overridden per generation.
+"""
+
+from __future__ import annotations
+
+from contextlib import nullcontext
+from typing import Any, ContextManager, Optional
+
+import torch
+
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+PRECISION_FP32 = "fp32"
+PRECISION_BF16_AUTOCAST = "bf16-autocast"
+PRECISIONS = (PRECISION_FP32, PRECISION_BF16_AUTOCAST)
+
+
+def normalize_precision(value: Optional[str]) -> str:
+    """Validate a precision mode; empty means fp32."""
+    if not value:
+        return PRECISION_FP32
+    precision = str(value).strip().lower()
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unsupported precision {value!r} (expected one of: {', '.join(PRECISIONS)})")
+    return precision
+
+
+def autocast(precision: str) -> ContextManager[Any]:
+    """Autocast context for CPU execution in `precision` (no-op for fp32)."""
+    if precision == PRECISION_BF16_AUTOCAST:
+        return torch.autocast(device_type="cpu", dtype=torch.bfloat16)
+    return nullcontext()
+
+
+def to_channels_last(*modules: Optional[torch.nn.Module]) -> None:
+    """Switch modules (in place) to channels_last; None entries are skipped."""
+    for module in modules:
+        if module is not None:
+            module.to(memory_format=torch.channels_last)
+
+
+def cpu_has_native_bf16() -> bool:
+    """Best-effort check for AVX512-BF16 / AMX; without them bf16 autocast is emulated and slow."""
+    checks = ("_is_avx512_bf16_supported", "_is_amx_tile_supported")
+    for name in checks:
+        fn = getattr(torch.cpu, name, None)
+        try:
+            if fn is not None and fn():
+                return True
+        except Exception:  # pragma: no cover - private torch API
+            continue
+    return False
+
+
+def warn_if_emulated(precision: str) -> None:
+    if precision == PRECISION_BF16_AUTOCAST and not cpu_has_native_bf16():
+        logger.warning("bf16_autocast_without_native_support", precision=precision)
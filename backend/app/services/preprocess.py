@@ -0,0 +1,298 @@
+"""
+Photo preprocessing pipeline used by `cpu.preprocess_person`.
+
+The stages overlap instead of running photo by photo:
+- downloads run concurrently on a thread pool,
+- each downloaded photo is verified, hashed (phash), resized, cropped around the face, scored
+  for sharpness and re-encoded in a process pool as soon as its download lands,
+- accepted images are uploaded concurrently while later photos are still being processed.
+
+Dedup decisions are still made strictly in the given photo order, so which copy of a
+duplicate survives never depends on download or processing timing. A photo is a duplicate
+when its phash is within a Hamming radius of an earlier photo of the batch or of one of the
+person's previously processed photos (see app.services.phash_index).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import multiprocessing
+import os
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import imagehash
+from PIL import Image
+
+from app.core.logging import get_logger
+from app.services.face_quality import detect_faces, face_crop_box, laplacian_variance
+from app.services.phash_index import PhashIndex
+
+logger = get_logger(__name__)
+
+MAX_SIZE = 1024
+
+
+@dataclass
+class PhotoResult:
+    """Output of the CPU stage for one photo."""
+
+    photo_id: int
+    phash: Optional[str] = None
+    processed_path: Optional[str] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    sha256: Optional[str] = None
+    sharpness: Optional[float] = None
+    face_count: Optional[int] = None  # None: face detection unavailable or disabled
+    face_box: Optional[List[int]] = None  # [x, y, w, h] of the largest face in the resized photo
+    error: Optional[str] = None
+
+
+@dataclass
+class PhotoOutcome:
+    """Final per-photo decision: processed, duplicate or rejected."""
+
+    status: str
+    phash: Optional[str] = None
+    output_key: Optional[str] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    sha256: Optional[str] = None
+    sharpness: Optional[float] = None
+    face_count: Optional[int] = None
+    face_box: Optional[List[int]] = None
+    duplicate_of: Optional[int] = None
+    distance: Optional[int] = None
+    error: Optional[str] = None
+
+
+def open_downscaled(path: str, max_size: int = MAX_SIZE) -> Image.Image:
+    """
+    Open and fully decode an image, at most `max_size` px on the longer side.
+
+    JPEGs use draft mode: libjpeg scales by 1/2, 1/4 or 1/8 during the DCT, so a 48 MP photo is
+    decoded at roughly the target size instead of in full; the remaining reduction is a LANCZOS
+    thumbnail. The full `load()` also validates the file, replacing the verify() + reopen pass.
+    """
+    img = Image.open(path)
+    if img.format == "JPEG":
+        img.draft("RGB", (max_size, max_size))  # never reduces below the requested size
+    img.load()  # single-frame files are closed once decoded
+    if img.width > max_size or img.height > max_size:
+        img.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    return img
+
+
+def process_photo(
+    photo_id: int,
+    local_path: str,
+    processed_path: str,
+    max_size: int = MAX_SIZE,
+    face_crop: bool = False,
+    face_crop_scale: float = 2.5,
+    min_sharpness: float = 0.0,
+) -> PhotoResult:
+    """
+    Decode (downscaled), phash, normalize (max `max_size` px, RGB), optionally crop around the
+    largest face, score sharpness and save as JPEG. Runs in a worker process.
+
+    Frames with a Laplacian variance below `min_sharpness` come back with an error (rejected).
+    """
+    try:
+        img = open_downscaled(local_path, max_size)
+        # phash works on a 32x32 reduction, so hashing the downscaled image is equivalent.
+        # It is taken before cropping so dedup compares whole frames.
+        phash_str = str(imagehash.phash(img))
+
+        faces = detect_faces(img) if face_crop else None
+        face_box = list(faces[0]) if faces else None
+        if face_box is not None:
+            img = img.crop(face_crop_box(img.size, tuple(face_box), scale=face_crop_scale))
+        # Scored on the crop, i.e. mostly the face, so a blurred background does not count against it.
+        sharpness = round(laplacian_variance(img), 2)
+        scores = dict(sharpness=sharpness, face_count=len(faces) if faces is not None else None, face_box=face_box)
+        if min_sharpness > 0 and sharpness < min_sharpness:
+            return PhotoResult(
+                photo_id=photo_id,
+                phash=phash_str,
+                error=f"Image too blurry (sharpness {sharpness:.1f} < {min_sharpness:.1f})",
+                **scores,
+            )
+
+        img.save(processed_path, "JPEG", quality=95)
+        with open(processed_path, "rb") as f:
+            sha256 = hashlib.sha256(f.read()).hexdigest()
+        return PhotoResult(
+            photo_id=photo_id,
+            phash=phash_str,
+            processed_path=processed_path,
+            width=img.width,
+            height=img.height,
+            sha256=sha256,
+            **scores,
+        )
+    except Exception as e:
+        return PhotoResult(photo_id=photo_id, error=str(e))
+
+
+def _chain(first: Future, submit_next: Callable[[Any], Future]) -> Future:
+    """Future of `submit_next(first.result())`, started as soon as `first` completes."""
+    out: Future = Future()
+
+    def _copy(nxt: Future) -> None:
+        if nxt.exception() is not None:
+            out.set_exception(nxt.exception())
+        else:
+            out.set_result(nxt.result())
+
+    def _on_first(f: Future) -> None:
+        try:
+            nxt = submit_next(f.result())
+        except BaseException as e:
+            out.set_exception(e)
+            return
+        nxt.add_done_callback(_copy)
+
+    first.add_done_callback(_on_first)
+    return out
+
+
+def _cpu_executor(workers: int) -> Executor:
+    if workers <= 1:
+        return ThreadPoolExecutor(max_workers=1)
+    if multiprocessing.current_process().daemon:
+        # Celery prefork children are daemonic and may not start processes (run the CPU worker
+        # with --pool=solo or threads). Pillow releases the GIL while decoding/resizing, so
+        # threads still spread part of the work.
+        logger.warning("preprocess_process_pool_unavailable", reason="daemonic process", cpu_workers=workers)
+        return ThreadPoolExecutor(max_workers=workers)
+    # spawn, not fork: the I/O threads are already running when the pool starts its workers.
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def run_preprocess_pipeline(
+    photos: List[Tuple[int, str]],
+    work_dir: Path,
+    output_prefix: str,
+    s3: Any,
+    io_concurrency: int = 8,
+    cpu_workers: int = 0,
+    max_size: int = MAX_SIZE,
+    dedup_radius: int = 0,
+    known_hashes: Optional[List[Tuple[int, str]]] = None,
+    face_crop: bool = False,
+    face_crop_scale: float = 2.5,
+    min_sharpness: float = 0.0,
+) -> Dict[int, PhotoOutcome]:
+    """
+    Download, process, dedup and upload `photos` ((photo_id, s3_key) pairs, in dedup order).
+
+    Accepted images are uploaded to `<output_prefix>processed_<photo_id>.jpg`.
+    `cpu_workers=0` uses one process per CPU (capped at the number of photos).
+    `known_hashes` ((photo_id, phash) of already processed photos) seed the dedup index, and
+    `dedup_radius` is the max Hamming distance (out of 64 bits) still counted as a duplicate.
+    `face_crop`/`face_crop_scale`/`min_sharpness` control the quality stage (see process_photo);
+    blurry frames are rejected before dedup, so a sharp near-copy later in the batch still wins.
+    Returns an outcome per photo id.
+    """
+    work_dir = Path(work_dir)
+    processed_dir = work_dir / "processed"
+    processed_dir.mkdir(parents=True, exist_ok=True)
+    if cpu_workers <= 0:
+        cpu_workers = os.cpu_count() or 1
+    cpu_workers = max(1, min(cpu_workers, len(photos)))
+
+    def download(photo_id: int, s3_key: str) -> str:
+        local_path = work_dir / f"photo_{photo_id}.tmp"
+        s3.download_file(s3_key, str(local_path))
+        return str(local_path)
+
+    outcomes: Dict[int, PhotoOutcome] = {}
+    with ThreadPoolExecutor(max_workers=max(1, io_concurrency)) as io_pool, _cpu_executor(cpu_workers) as cpu_pool:
+        results: Dict[int, Future] = {}
+        for photo_id, s3_key in photos:
+            downloaded = io_pool.submit(download, photo_id, s3_key)
+            results[photo_id] = _chain(
+                downloaded,
+                lambda local_path, pid=photo_id: cpu_pool.submit(
+                    process_photo,
+                    pid,
+                    local_path,
+                    str(processed_dir / f"processed_{pid}.jpg"),
+                    max_size,
+                    face_crop,
+                    face_crop_scale,
+                    min_sharpness,
+                ),
+            )
+
+        index = PhashIndex(radius=dedup_radius)
+        for known_id, known_phash in known_hashes or []:
+            index.add(known_phash, known_id)
+        uploads: Dict[int, Future] = {}
+        for photo_id, _ in photos:
+            try:
+                result = results[photo_id].result()
+            except Exception as e:  # download failed
+                result = PhotoResult(photo_id=photo_id, error=str(e))
+
+            scores = dict(sharpness=result.sharpness, face_count=result.face_count, face_box=result.face_box)
+            if result.error is not None:
+                outcomes[photo_id] = PhotoOutcome(status="rejected", phash=result.phash, error=result.error, **scores)
+                logger.error("photo_processing_failed", photo_id=photo_id, error=result.error)
+                continue
+
+            match = index.find(result.phash)
+            if match is not None:
+                duplicate_of, distance = match
+                outcomes[photo_id] = PhotoOutcome(
+                    status="duplicate",
+                    phash=result.phash,
+                    duplicate_of=duplicate_of,
+                    distance=distance,
+                    **scores,
+                )
+                logger.info(
+                    "photo_duplicate",
+                    photo_id=photo_id,
+                    phash=result.phash,
+                    duplicate_of=duplicate_of,
+                    distance=distance,
+                )
+                continue
+            index.add(result.phash, photo_id)
+
+            output_key = f"{output_prefix}processed_{photo_id}.jpg"
+            uploads[photo_id] = io_pool.submit(s3.upload_file, result.processed_path, output_key, "image/jpeg")
+            outcomes[photo_id] = PhotoOutcome(
+                status="processed",
+                phash=result.phash,
+                output_key=output_key,
+                width=result.width,
+                height=result.height,
+                sha256=result.sha256,
+                **scores,
+            )
+
+        for photo_id, upload in uploads.items():
+            try:
+                upload.result()
+                logger.info("photo_processed", photo_id=photo_id, output_key=outcomes[photo_id].output_key)
+            except Exception as e:
+                previous = outcomes[photo_id]
+                outcomes[photo_id] = PhotoOutcome(
+                    status="rejected",
+                    phash=previous.phash,
+                    sharpness=previous.sharpness,
+                    face_count=previous.face_count,
+                    face_box=previous.face_box,
+                    error=str(e),
+                )
+                logger.error("photo_processing_failed", photo_id=photo_id, error=str(e))
+
+    return outcomes
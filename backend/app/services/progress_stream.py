@@ -0,0 +1,116 @@
+"""
+Live job events over Redis pub/sub.
+
+Workers publish every job event (including each progress tick, which the database only sees
+coalesced, see app.workers.job_events) to `jobs:<job_id>:events`. The API streams a channel to
+clients as Server-Sent Events, so clients no longer poll the events/status endpoints.
+The latest progress tick is also kept in `jobs:<job_id>:progress` (same round-trip as the
+publish) for readers that want a snapshot (`latest_progress`).
+Redis access is best effort: when it is unreachable, events are still persisted and Redis is
+left alone for PUBLISH_BACKOFF_SECONDS.
+"""
+
+from __future__ import annotations
+
+import json
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, Optional
+
+import redis
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+PUBLISH_BACKOFF_SECONDS = 30.0
+# Progress snapshots outlive any job run; expired ones fall back to the stored events.
+PROGRESS_TTL_SECONDS = 24 * 3600
+# Published when the task that owns the job finishes (successfully or not).
+END_EVENT = "end"
+
+_publish_paused_until = 0.0
+
+
+def channel_for(job_id: int) -> str:
+    return f"jobs:{int(job_id)}:events"
+
+
+def progress_key(job_id: int) -> str:
+    return f"jobs:{int(job_id)}:progress"
+
+
+@lru_cache(maxsize=1)
+def _redis() -> redis.Redis:
+    return redis.Redis.from_url(settings.REDIS_URL, socket_connect_timeout=1, socket_timeout=2)
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Not JSON serializable: {type(value).__name__}")
+
+
+def _redis_paused() -> bool:
+    return not settings.JOB_EVENT_PUBSUB or time.monotonic() < _publish_paused_until
+
+
+def _redis_failed(event: str, job_id: int, error: Exception) -> None:
+    global _publish_paused_until
+    _publish_paused_until = time.monotonic() + PUBLISH_BACKOFF_SECONDS
+    logger.warning(event, job_id=job_id, error=str(error))
+
+
+def publish_event(job_id: int, event: Dict[str, Any]) -> None:
+    """Publish one event dict (JobEvent columns) to the job's channel; never raises."""
+    if _redis_paused():
+        return
+    payload = json.dumps(event, default=_json_default)
+    try:
+        pipe = _redis().pipeline(transaction=False)
+        pipe.publish(channel_for(job_id), payload)
+        if event.get("event_type") == "progress":
+            pipe.set(progress_key(job_id), payload, ex=PROGRESS_TTL_SECONDS)
+        pipe.execute()
+    except redis.RedisError as e:
+        _redis_failed("job_event_publish_failed", job_id, e)
+
+
+def latest_progress(job_id: int) -> Optional[Dict[str, Any]]:
+    """Latest published progress event of a job (None if unknown or Redis is unavailable)."""
+    if _redis_paused():
+        return None
+    try:
+        payload = _redis().get(progress_key(job_id))
+    except redis.RedisError as e:
+        _redis_failed("job_progress_read_failed", job_id, e)
+        return None
+    return json.loads(payload) if payload else None
+
+
+@asynccontextmanager
+async def subscribe(job_id: int, poll_timeout: float = 1.0) -> AsyncIterator[AsyncIterator[Optional[Dict[str, Any]]]]:
+    """
+    Subscribe to a job's channel; yields an async iterator of event dicts, with None emitted
+    every `poll_timeout` seconds without a message (lets the caller send keep-alives).
+    """
+    import redis.asyncio as aioredis
+
+    client = aioredis.Redis.from_url(settings.REDIS_URL)
+    pubsub = client.pubsub()
+    await pubsub.subscribe(channel_for(job_id))
+
+    async def messages() -> AsyncIterator[Optional[Dict[str, Any]]]:
+        while True:
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=poll_timeout)
+            yield json.loads(message["data"]) if message else None
+
+    try:
+        yield messages()
+    finally:
+        await pubsub.unsubscribe()
+        await pubsub.aclose()
+        await client.aclose()
@@ -7,8 +7,14 @@ Otherwise the API and tests would crash when MinIO isn't running yet.
 
 from __future__ import annotations
 
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
 import boto3
+from boto3.s3.transfer import TransferConfig
 from botocore.config import Config
 from botocore.exceptions import ClientError, EndpointConnectionError
 
@@ -17,6 +23,9 @@ from app.core.logging import get_logger
 
 logger = get_logger(__name__)
 
+# DeleteObjects accepts at most this many keys per request.
+DELETE_BATCH_SIZE = 1000
+
 
 class S3Service:
     """S3-compatible storage service (MinIO)."""
@@ -31,11 +40,22 @@ class S3Service:
             config=Config(
                 signature_version="s3v4",
                 connect_timeout=2,
-                read_timeout=5,
+                read_timeout=settings.S3_READ_TIMEOUT_SECONDS,
                 retries={"max_attempts": 2, "mode": "standard"},
+                # Shared by the batch pool and the per-file multipart threads.
+                max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS,
             ),
             region_name="us-east-1",  # MinIO doesn't care about region
         )
+        # Large objects (base model weights) are split into parts transferred in parallel.
+        self.transfer_config = TransferConfig(
+            multipart_threshold=settings.S3_MULTIPART_THRESHOLD_MB * 1024 * 1024,
+            multipart_chunksize=settings.S3_MULTIPART_CHUNKSIZE_MB * 1024 * 1024,
+            max_concurrency=settings.S3_TRANSFER_THREADS,
+            use_threads=settings.S3_TRANSFER_THREADS > 1,
+        )
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pool_lock = threading.Lock()
         self._ensure_bucket()
 
     def _ensure_bucket(self):
@@ -127,7 +147,8 @@ class S3Service:
                 local_path,
                 self.bucket_name,
                 s3_key,
-                ExtraArgs=extra_args
+                ExtraArgs=extra_args,
+                Config=self.transfer_config,
             )
             logger.info("file_uploaded", key=s3_key)
         except Exception as e:
@@ -137,12 +158,51 @@ class S3Service:
     def download_file(self, s3_key: str, local_path: str):
         """Download file to local path."""
         try:
-            self.client.download_file(self.bucket_name, s3_key, local_path)
+            self.client.download_file(self.bucket_name, s3_key, local_path, Config=self.transfer_config)
             logger.info("file_downloaded", key=s3_key)
         except Exception as e:
             logger.error("file_download_failed", error=str(e), key=s3_key)
             raise
     
+    def _batch_pool(self) -> ThreadPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=max(1, settings.S3_BATCH_CONCURRENCY),
+                    thread_name_prefix="s3-batch",
+                )
+            return self._pool
+
+    def _run_batch(self, op: str, fn, jobs: List[tuple]) -> None:
+        """Run `fn(*job)` for every job on the shared pool; raise the first error once all finished."""
+        if not jobs:
+            return
+        futures = [self._batch_pool().submit(fn, *job) for job in jobs]
+        errors = [f.exception() for f in futures if f.exception() is not None]
+        if errors:
+            logger.error(f"{op}_failed", failed=len(errors), total=len(jobs), error=str(errors[0]))
+            raise errors[0]
+        logger.info(f"{op}_completed", count=len(jobs))
+
+    def download_many(self, items: Iterable[Tuple[str, str]]) -> List[str]:
+        """
+        Download (s3_key, local_path) pairs concurrently; parent directories are created.
+
+        Files fan out over a pool shared by all callers in this process (S3_BATCH_CONCURRENCY),
+        each large file additionally uses multipart ranges (S3_TRANSFER_THREADS).
+        """
+        jobs = [(key, str(path)) for key, path in items]
+        for _, path in jobs:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._run_batch("batch_download", self.download_file, jobs)
+        return [path for _, path in jobs]
+
+    def upload_many(self, items: Iterable[Tuple[str, str, Optional[str]]]) -> List[str]:
+        """Upload (local_path, s3_key, content_type) triples concurrently; returns the keys."""
+        jobs = [(str(path), key, content_type) for path, key, content_type in items]
+        self._run_batch("batch_upload", self.upload_file, jobs)
+        return [key for _, key, _ in jobs]
+
     def delete_file(self, s3_key: str):
         """Delete file from S3."""
         try:
@@ -152,41 +212,105 @@ class S3Service:
             logger.error("file_delete_failed", error=str(e), key=s3_key)
             raise
     
+    def list_objects(self, prefix: str) -> list[dict]:
+        """List objects with prefix as dicts with `key`, `size` and `etag`."""
+        objects: list[dict] = []
+        continuation: Optional[str] = None
+
+        while True:
+            kwargs = {"Bucket": self.bucket_name, "Prefix": prefix}
+            if continuation:
+                kwargs["ContinuationToken"] = continuation
+
+            response = self.client.list_objects_v2(**kwargs)
+            for obj in response.get("Contents", []):
+                objects.append(
+                    {
+                        "key": obj["Key"],
+                        "size": int(obj.get("Size", 0)),
+                        "etag": str(obj.get("ETag", "")).strip('"'),
+                    }
+                )
+
+            if response.get("IsTruncated"):
+                continuation = response.get("NextContinuationToken")
+                if not continuation:
+                    break
+            else:
+                break
+
+        return objects
+
     def list_files(self, prefix: str) -> list:
         """List files with prefix."""
         try:
-            keys: list[str] = []
-            continuation: Optional[str] = None
-
-            while True:
-                kwargs = {"Bucket": self.bucket_name, "Prefix": prefix}
-                if continuation:
-                    kwargs["ContinuationToken"] = continuation
-
-                response = self.client.list_objects_v2(**kwargs)
-                keys.extend([obj["Key"] for obj in response.get("Contents", [])])
-
-                if response.get("IsTruncated"):
-                    continuation = response.get("NextContinuationToken")
-                    if not continuation:
-                        break
-                else:
-                    break
-
-            return keys
+            return [obj["key"] for obj in self.list_objects(prefix)]
         except Exception as e:
             logger.error("list_files_failed", error=str(e), prefix=prefix)
             return []
     
-    def delete_prefix(self, prefix: str):
-        """Delete all files with prefix."""
+    def delete_many(
+        self,
+        keys: Iterable[str],
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+    ) -> List[Dict[str, str]]:
+        """
+        Delete keys with DeleteObjects, DELETE_BATCH_SIZE keys per request.
+
+        Per-key failures do not stop the remaining batches; they are logged and returned as
+        dicts with `key`, `code` and `message` (empty list: everything deleted). Request-level
+        errors (endpoint unreachable, access denied for the call) are raised.
+        `progress_callback(processed, total)` is called after every request.
+        """
+        unique = list(dict.fromkeys(k for k in keys if k))
+        failures: List[Dict[str, str]] = []
+        for start in range(0, len(unique), DELETE_BATCH_SIZE):
+            batch = unique[start : start + DELETE_BATCH_SIZE]
+            try:
+                response = self.client.delete_objects(
+                    Bucket=self.bucket_name,
+                    Delete={"Objects": [{"Key": k} for k in batch], "Quiet": True},
+                )
+            except Exception as e:
+                logger.error("batch_delete_failed", error=str(e), count=len(batch))
+                raise
+            for err in response.get("Errors", []):
+                failures.append(
+                    {"key": err.get("Key", ""), "code": err.get("Code", ""), "message": err.get("Message", "")}
+                )
+            if progress_callback:
+                progress_callback(start + len(batch), len(unique))
+
+        if failures:
+            logger.error(
+                "batch_delete_partial_failure",
+                failed=len(failures),
+                total=len(unique),
+                first_key=failures[0]["key"],
+                first_code=failures[0]["code"],
+            )
+        logger.info("batch_deleted", count=len(unique) - len(failures), requests=-(-len(unique) // DELETE_BATCH_SIZE))
+        return failures
+
+    def delete_prefix(self, prefix: str) -> List[Dict[str, str]]:
+        """Delete all files with prefix; returns per-key failures (see delete_many)."""
         keys = self.list_files(prefix)
-        for key in keys:
-            self.delete_file(key)
-        logger.info("prefix_deleted", prefix=prefix, count=len(keys))
+        failures = self.delete_many(keys)
+        logger.info("prefix_deleted", prefix=prefix, count=len(keys) - len(failures))
+        return failures
 
 
 @lru_cache(maxsize=1)
 def get_s3_service() -> S3Service:
     """Lazily create the S3 client (MinIO may not be up at import time)."""
     return S3Service()
+
+
+class _LazyS3Service:
+    """Module-level handle that defers client creation to first use."""
+
+    def __getattr__(self, name: str):
+        return getattr(get_s3_service(), name)
+
+
+s3_service = _LazyS3Service()
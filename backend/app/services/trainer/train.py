@@ -9,27 +9,49 @@ Notes:
 
 from __future__ import annotations
 
+import gc
+import hashlib
 import json
 import math
+import multiprocessing
 import os
+import random
+import resource
+import socket
+from datetime import timedelta
+from collections import OrderedDict
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Dict, List
-from typing import Callable, Optional
+from typing import Callable, Optional, Tuple
 
 import torch
+import torch.distributed as dist
 from PIL import Image
-from torch.utils.data import Dataset, DataLoader
+from torch.utils.data import Dataset, DataLoader, DistributedSampler
 from torchvision import transforms
 
 from diffusers import DDPMScheduler, StableDiffusionPipeline
 from peft import LoraConfig, get_peft_model
 
+from app.core.config import get_models_dir
 from app.core.logging import get_logger
-from app.services.base_models import apply_runtime_offline_env, ensure_base_model_present
+from app.services.base_models import apply_runtime_offline_env, ensure_base_model_present, resolve_base_model_dir
+from app.services.precision import (
+    PRECISION_FP32,
+    autocast,
+    normalize_precision,
+    to_channels_last,
+    warn_if_emulated,
+)
 
 logger = get_logger(__name__)
 
+# Instance prompt embeddings per (base model dir, prompt, precision). The text encoder is frozen, so
+# the embedding never changes; repeat runs in the same worker skip loading the encoder at all.
+_PROMPT_EMBEDS_MAX = 16
+_prompt_embeds_cache: "OrderedDict[Tuple[str, str, str], torch.Tensor]" = OrderedDict()
+
 
 @dataclass
 class TrainConfig:
@@ -44,6 +66,13 @@ class TrainConfig:
     resolution: int = 512
     gradient_accumulation_steps: int = 1
     hf_token: str | None = None
+    cache_latents: bool = False
+    latent_variants: int = 4
+    checkpoint_steps: int = 50
+    precision: str = PRECISION_FP32
+    channels_last: bool = False
+    memory_lean: bool = False
+    gradient_checkpointing: bool = False
 
 
 class ImagePromptDataset(Dataset):
@@ -75,11 +104,200 @@ class ImagePromptDataset(Dataset):
         return {"pixel_values": self.transform(img), "prompt": self.prompt}
 
 
+class LatentDataset(Dataset):
+    """Precomputed VAE latent distributions (mean/logvar moments), one row per augmented view."""
+
+    def __init__(self, moments: torch.Tensor, prompt: str):
+        self.moments = moments
+        self.prompt = prompt
+
+    def __len__(self) -> int:
+        return int(self.moments.shape[0])
+
+    def __getitem__(self, idx: int) -> Dict[str, Any]:
+        return {"latent_moments": self.moments[idx], "prompt": self.prompt}
+
+
+def sample_latents(moments: torch.Tensor) -> torch.Tensor:
+    """Sample from cached VAE moments (same as `latent_dist.sample()`)."""
+    mean, logvar = torch.chunk(moments, 2, dim=1)
+    std = torch.exp(0.5 * torch.clamp(logvar, -30.0, 20.0))
+    return mean + std * torch.randn_like(mean)
+
+
+def latent_cache_key(
+    base_model_dir: Path,
+    image_files: List[Path],
+    resolution: int,
+    variants: int,
+    precision: str = PRECISION_FP32,
+) -> str:
+    """Cache key over base model, preprocessing parameters and the exact image bytes."""
+    params = f"{Path(base_model_dir).name}|{resolution}|{variants}"
+    if precision != PRECISION_FP32:
+        params += f"|{precision}"  # fp32 keys stay as they were
+    h = hashlib.sha256(params.encode("utf-8"))
+    for path in sorted(image_files, key=lambda p: p.name):
+        h.update(path.name.encode("utf-8"))
+        h.update(hashlib.sha256(path.read_bytes()).digest())
+    return h.hexdigest()[:32]
+
+
+def latents_file_name(config: Dict[str, Any], image_files: List[Path]) -> str:
+    """File name of the cached latents for a training config (same defaults as training)."""
+    key = latent_cache_key(
+        resolve_base_model_dir(config.get("base_model_name", "sd15")),
+        image_files,
+        int(config.get("resolution", 512)),
+        int(config.get("latent_variants", 4)),
+        normalize_precision(config.get("precision")),
+    )
+    return f"latents_{key}.pt"
+
+
+def prune_latent_cache(cache_dir: Path, max_bytes: int, keep: Tuple[Path, ...] = ()) -> List[Path]:
+    """Delete least recently used latents files until the cache fits `max_bytes`; returns them."""
+    files = sorted(Path(cache_dir).glob("latents_*.pt"), key=lambda p: p.stat().st_mtime)
+    total = sum(p.stat().st_size for p in files)
+    keep_set = {Path(p).resolve() for p in keep}
+    removed: List[Path] = []
+    for path in files:
+        if total <= max_bytes:
+            break
+        if path.resolve() in keep_set:
+            continue
+        total -= path.stat().st_size
+        path.unlink(missing_ok=True)
+        removed.append(path)
+    if removed:
+        logger.info("latent_cache_pruned", removed=[p.name for p in removed], bytes=total)
+    return removed
+
+
+def precompute_latents(
+    vae,
+    image_files: List[Path],
+    resolution: int,
+    variants: int,
+    seed: int = 0,
+    precision: str = PRECISION_FP32,
+) -> torch.Tensor:
+    """
+    Encode every image once per augmented view (random resized crop + flip, fixed seed).
+
+    Returns the VAE latent distribution moments, shape [len(image_files) * variants, 2*C, H/8, W/8].
+    """
+    dataset = ImagePromptDataset(image_files, prompt="", resolution=resolution)
+    moments: List[torch.Tensor] = []
+    with torch.random.fork_rng(), torch.no_grad():
+        torch.manual_seed(seed)
+        for idx in range(len(dataset)):
+            views = torch.stack([dataset[idx]["pixel_values"] for _ in range(max(1, variants))])
+            with autocast(precision):
+                moments.append(vae.encode(views).latent_dist.parameters.float().cpu())
+    return torch.cat(moments)
+
+
+def peak_rss_mb(reset: bool = False) -> float:
+    """
+    Peak resident set size (MB) of this process since the last reset.
+
+    Reads VmHWM from /proc on Linux; `reset=True` then restarts the high-water mark
+    (`echo 5 > /proc/self/clear_refs`) so the next call reports the peak of the next step
+    only. Elsewhere (or if /proc is not writable) this is the lifetime peak from getrusage.
+    """
+    peak_kb = None
+    try:
+        with open("/proc/self/status", "r", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    peak_kb = int(line.split()[1])
+                    break
+        if reset:
+            with open("/proc/self/clear_refs", "w", encoding="ascii") as f:
+                f.write("5")
+    except OSError:
+        pass
+    if peak_kb is None:
+        peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # KB on Linux
+    return round(peak_kb / 1024.0, 1)
+
+
+def encode_prompt_once(
+    tokenizer,
+    text_encoder,
+    prompt: str,
+    device: torch.device,
+    precision: str = PRECISION_FP32,
+) -> torch.Tensor:
+    """Encode `prompt` with the frozen text encoder; returns [1, seq_len, hidden] on CPU."""
+    tokens = tokenizer(
+        [prompt],
+        padding="max_length",
+        truncation=True,
+        max_length=tokenizer.model_max_length,
+        return_tensors="pt",
+    )
+    with torch.no_grad(), autocast(precision):
+        return text_encoder(tokens.input_ids.to(device))[0].detach().float().cpu()
+
+
+def _cached_prompt_embeds(key: Tuple[str, str, str]) -> Optional[torch.Tensor]:
+    embeds = _prompt_embeds_cache.get(key)
+    if embeds is not None:
+        _prompt_embeds_cache.move_to_end(key)
+    return embeds
+
+
+def _store_prompt_embeds(key: Tuple[str, str, str], embeds: torch.Tensor) -> None:
+    _prompt_embeds_cache[key] = embeds
+    _prompt_embeds_cache.move_to_end(key)
+    while len(_prompt_embeds_cache) > _PROMPT_EMBEDS_MAX:
+        _prompt_embeds_cache.popitem(last=False)
+
+
+def save_training_checkpoint(path: Path, unet, optimizer, global_step: int) -> Path:
+    """
+    Save everything needed to resume: LoRA weights, AdamW state, RNG state and step.
+
+    Written as a single file (temp file + rename) so a partial write never replaces a good one.
+    """
+    state = {
+        "global_step": int(global_step),
+        "lora_state": {k: v.detach().cpu() for k, v in unet.named_parameters() if v.requires_grad},
+        "optimizer": optimizer.state_dict(),
+        "torch_rng": torch.get_rng_state(),
+        "python_rng": random.getstate(),
+    }
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    torch.save(state, tmp_path)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_training_checkpoint(path: Path, unet, optimizer) -> int:
+    """Restore a checkpoint written by `save_training_checkpoint`; returns its global step."""
+    state = torch.load(path, map_location="cpu", weights_only=False)
+    missing = [k for k in state["lora_state"] if k not in dict(unet.named_parameters())]
+    if missing:
+        raise RuntimeError(f"Checkpoint does not match the LoRA config (e.g. {missing[0]})")
+    unet.load_state_dict(state["lora_state"], strict=False)
+    optimizer.load_state_dict(state["optimizer"])
+    torch.set_rng_state(state["torch_rng"])
+    random.setstate(state["python_rng"])
+    return int(state["global_step"])
+
+
 def run_training(
     config: Dict[str, Any],
     dataset_path: str,
     output_path: str,
-    progress_callback: Optional[Callable[[int, int, float], None]] = None,
+    progress_callback: Optional[Callable[[int, int, float, float], None]] = None,
+    latents_dir: Optional[str] = None,
+    resume_from: Optional[str] = None,
+    checkpoint_callback: Optional[Callable[[str, int], None]] = None,
 ) -> Dict[str, Any]:
     """
     Train LoRA for Stable Diffusion (CPU supported).
@@ -91,7 +309,146 @@ def run_training(
     Optional keys:
     - steps, learning_rate, rank, batch_size, resolution, gradient_accumulation_steps
     - hf_token / HUGGINGFACE_HUB_TOKEN via env
+    - cache_latents (bool): encode each image (x latent_variants augmented views) through the
+      VAE once, cache the latents in `latents_dir` and train from them without the VAE
+    - checkpoint_steps (int, default 50, 0 disables): every N steps a checkpoint file is written
+      to `<output_path>/checkpoint/state.pt` and passed to `checkpoint_callback(path, step)`;
+      `resume_from` points at such a file to continue an interrupted run
+    - precision ("fp32" | "bf16-autocast", default "fp32") and channels_last (bool): CPU execution
+      mode of UNet/VAE/text encoder (see app.services.precision); LoRA weights stay float32
+    - memory_lean (bool, default false): for higher resolutions / larger batches on the same RAM.
+      Enables UNet gradient checkpointing (recompute activations in backward instead of keeping
+      them) and always trains from precomputed latents, so the VAE is freed before the first step
+      (latents are persisted only when cache_latents is set). gradient_checkpointing (bool) can
+      also be enabled on its own. Peak RSS per step is logged in either case.
+
+    `progress_callback(step, total, loss, peak_rss_mb)` gets the highest per-step peak RSS (MB)
+    since its previous call.
+    - num_processes (int, default 1): data-parallel training across N local processes
+      (torch.distributed, gloo). Each process gets its own shard of every epoch and
+      batch_size samples per step; only LoRA gradients are all-reduced. Rank 0 runs in the
+      calling process, so callbacks and artifacts behave exactly as with one process; a failed
+      rank fails the run. threads_per_process defaults to cpu_count // num_processes.
+      Needs a non-daemonic process (Celery --pool=solo/threads, see can_spawn_processes);
+      otherwise training falls back to one process.
+    """
+    world_size = int(config.get("num_processes", 1))
+    kwargs = dict(
+        config=config,
+        dataset_path=dataset_path,
+        output_path=output_path,
+        latents_dir=latents_dir,
+        resume_from=resume_from,
+    )
+    if world_size <= 1:
+        return _train(progress_callback=progress_callback, checkpoint_callback=checkpoint_callback, **kwargs)
+    if not can_spawn_processes():
+        logger.warning("training_data_parallel_unavailable", reason="daemonic process", num_processes=world_size)
+        return _train(progress_callback=progress_callback, checkpoint_callback=checkpoint_callback, **kwargs)
+
+    threads = int(config.get("threads_per_process") or max(1, (os.cpu_count() or 1) // world_size))
+    init_method = f"tcp://127.0.0.1:{_free_port()}"
+    ctx = multiprocessing.get_context("spawn")
+    workers = [
+        ctx.Process(target=_train_worker, args=(r, world_size, init_method, threads, kwargs), daemon=True)
+        for r in range(1, world_size)
+    ]
+    for w in workers:
+        w.start()
+
+    prev_threads = torch.get_num_threads()
+    torch.set_num_threads(threads)
+    _init_process_group(0, world_size, init_method)
+    try:
+        artifacts = _train(
+            progress_callback=progress_callback,
+            checkpoint_callback=checkpoint_callback,
+            dist_rank=0,
+            world_size=world_size,
+            **kwargs,
+        )
+    finally:
+        dist.destroy_process_group()
+        torch.set_num_threads(prev_threads)
+        for w in workers:
+            w.join(timeout=60)
+            if w.is_alive():
+                w.terminate()
+                w.join()
+        failed = [w.exitcode for w in workers if w.exitcode != 0]
+        if failed:
+            logger.error("training_worker_failed", exitcodes=failed)
+    if failed:
+        # Rank 0 finished, but the other shards did not train to the end: don't ship the result.
+        raise RuntimeError(f"Data-parallel training worker(s) failed with exit codes {failed}")
+    return artifacts
+
+
+def can_spawn_processes() -> bool:
+    """
+    False in daemonic processes (Celery prefork pool children), which may not start child
+    processes: data-parallel training then runs in one process. Use --pool=solo or threads.
     """
+    return not multiprocessing.current_process().daemon
+
+
+def shard_sampler(dataset: Dataset, world_size: int, dist_rank: int) -> Optional[DistributedSampler]:
+    """Per-rank shard of every epoch (None with a single process; the DataLoader shuffles)."""
+    if world_size <= 1:
+        return None
+    return DistributedSampler(dataset, num_replicas=world_size, rank=dist_rank, shuffle=True)
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return int(sock.getsockname()[1])
+
+
+def _init_process_group(dist_rank: int, world_size: int, init_method: str) -> None:
+    dist.init_process_group(
+        "gloo",
+        init_method=init_method,
+        rank=dist_rank,
+        world_size=world_size,
+        timeout=timedelta(minutes=30),
+    )
+
+
+def _train_worker(dist_rank: int, world_size: int, init_method: str, threads: int, kwargs: Dict[str, Any]) -> None:
+    """Entry point of data-parallel ranks > 0 (spawned processes, no callbacks, no artifacts)."""
+    torch.set_num_threads(threads)
+    _init_process_group(dist_rank, world_size, init_method)
+    try:
+        _train(dist_rank=dist_rank, world_size=world_size, **kwargs)
+    finally:
+        dist.destroy_process_group()
+
+
+def _all_reduce_grads(params: List[torch.nn.Parameter], world_size: int) -> None:
+    """Average gradients of the (LoRA-only) trainable params across ranks in one collective."""
+    grads = [p.grad if p.grad is not None else torch.zeros_like(p) for p in params]
+    flat = torch.cat([g.reshape(-1) for g in grads])
+    dist.all_reduce(flat, op=dist.ReduceOp.SUM)
+    flat /= world_size
+    offset = 0
+    for p, g in zip(params, grads):
+        n = g.numel()
+        p.grad = flat[offset : offset + n].view_as(g).clone()
+        offset += n
+
+
+def _train(
+    config: Dict[str, Any],
+    dataset_path: str,
+    output_path: str,
+    progress_callback: Optional[Callable[[int, int, float, float], None]] = None,
+    latents_dir: Optional[str] = None,
+    resume_from: Optional[str] = None,
+    checkpoint_callback: Optional[Callable[[str, int], None]] = None,
+    dist_rank: int = 0,
+    world_size: int = 1,
+) -> Dict[str, Any]:
     base_model = config.get("base_model_name", "sd15")
     trigger_token = config.get("trigger_token", "sks person")
     instance_prompt = config.get("instance_prompt") or f"photo of {trigger_token}"
@@ -110,6 +467,13 @@ def run_training(
         resolution=int(config.get("resolution", 512)),
         gradient_accumulation_steps=int(config.get("gradient_accumulation_steps", 1)),
         hf_token=(config.get("hf_token") or os.getenv("HUGGINGFACE_HUB_TOKEN") or os.getenv("HF_TOKEN")),
+        cache_latents=bool(config.get("cache_latents", False)),
+        latent_variants=int(config.get("latent_variants", 4)),
+        checkpoint_steps=int(config.get("checkpoint_steps", 50)),
+        precision=normalize_precision(config.get("precision")),
+        channels_last=bool(config.get("channels_last", False)),
+        memory_lean=bool(config.get("memory_lean", False)),
+        gradient_checkpointing=bool(config.get("gradient_checkpointing", config.get("memory_lean", False))),
     )
 
     logger.info(
@@ -123,13 +487,43 @@ def run_training(
         lora_alpha=tc.lora_alpha,
         resolution=tc.resolution,
         dataset_path=dataset_path,
+        precision=tc.precision,
+        channels_last=tc.channels_last,
+        memory_lean=tc.memory_lean,
+        gradient_checkpointing=tc.gradient_checkpointing,
+        dist_rank=dist_rank,
+        world_size=world_size,
     )
+    warn_if_emulated(tc.precision)
 
     device = torch.device("cpu")
 
     apply_runtime_offline_env()
     base_model_dir = ensure_base_model_present(tc.base_model_name)
 
+    ds_dir = Path(dataset_path)
+    image_files = sorted([*ds_dir.glob("*.jpg"), *ds_dir.glob("*.jpeg"), *ds_dir.glob("*.png")])
+    if len(image_files) == 0:
+        raise RuntimeError("No training images found in dataset_path")
+
+    latents_file: Optional[Path] = None
+    if tc.cache_latents:
+        cache_dir = Path(latents_dir) if latents_dir else get_models_dir() / "cache" / "latents"
+        latents_file = cache_dir / latents_file_name(config, image_files)
+        if world_size > 1 and dist_rank > 0:
+            # Rank 0 precomputes the latents (if missing); wait for it.
+            dist.barrier()
+    # With warm cached latents the VAE is never needed, so don't even load it.
+    need_vae = latents_file is None or not latents_file.exists()
+    # Same for the text encoder once the instance prompt has been encoded in this process.
+    embeds_key = (str(base_model_dir), tc.instance_prompt, tc.precision)
+    prompt_embeds = _cached_prompt_embeds(embeds_key)
+    skip_components = {}
+    if not need_vae:
+        skip_components["vae"] = None
+    if prompt_embeds is not None:
+        skip_components["text_encoder"] = None
+
     # Load pipeline
     pipe = StableDiffusionPipeline.from_pretrained(
         str(base_model_dir),
@@ -137,14 +531,24 @@ def run_training(
         requires_safety_checker=False,
         torch_dtype=torch.float32,
         local_files_only=True,
+        **skip_components,
     )
     pipe.to(device)
     pipe.enable_attention_slicing()
-    pipe.enable_vae_slicing()
-
-    # Freeze base weights
-    pipe.vae.requires_grad_(False)
-    pipe.text_encoder.requires_grad_(False)
+    if pipe.vae is not None:
+        pipe.enable_vae_slicing()
+        pipe.vae.requires_grad_(False)
+    if tc.channels_last:
+        to_channels_last(pipe.unet, pipe.vae)
+
+    # Encode the (constant) instance prompt once, then release the frozen text encoder
+    if prompt_embeds is None:
+        pipe.text_encoder.requires_grad_(False)
+        prompt_embeds = encode_prompt_once(pipe.tokenizer, pipe.text_encoder, tc.instance_prompt, device, tc.precision)
+        _store_prompt_embeds(embeds_key, prompt_embeds)
+    pipe.text_encoder = None
+    gc.collect()
+    prompt_embeds = prompt_embeds.to(device)
 
     # Apply PEFT LoRA to UNet attention projections
     lora_config = LoraConfig(
@@ -154,6 +558,9 @@ def run_training(
         bias="none",
         target_modules=["to_q", "to_k", "to_v", "to_out.0"],
     )
+    if tc.gradient_checkpointing:
+        # Recompute UNet block activations during backward instead of keeping them all alive.
+        pipe.unet.enable_gradient_checkpointing()
     pipe.unet = get_peft_model(pipe.unet, lora_config)
     pipe.unet.train()
 
@@ -161,27 +568,75 @@ def run_training(
     noise_scheduler = DDPMScheduler.from_config(pipe.scheduler.config)
 
     # Dataset
-    ds_dir = Path(dataset_path)
-    image_files = sorted([*ds_dir.glob("*.jpg"), *ds_dir.glob("*.jpeg"), *ds_dir.glob("*.png")])
-    if len(image_files) == 0:
-        raise RuntimeError("No training images found in dataset_path")
-
-    dataset = ImagePromptDataset(image_files, prompt=tc.instance_prompt, resolution=tc.resolution)
-    dataloader = DataLoader(dataset, batch_size=tc.batch_size, shuffle=True, num_workers=0)
+    if latents_file is not None:
+        if not latents_file.exists():
+            moments = precompute_latents(
+                pipe.vae, image_files, tc.resolution, tc.latent_variants, precision=tc.precision
+            )
+            latents_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = latents_file.with_suffix(".tmp")
+            torch.save({"moments": moments, "scaling_factor": float(pipe.vae.config.scaling_factor)}, tmp_file)
+            os.replace(tmp_file, latents_file)
+            logger.info("latents_precomputed", path=str(latents_file), views=int(moments.shape[0]))
+        else:
+            os.utime(latents_file)  # mtime doubles as LRU timestamp (prune_latent_cache)
+        if world_size > 1 and dist_rank == 0:
+            dist.barrier()
+        cached = torch.load(latents_file, map_location="cpu")
+        latent_scaling = float(cached["scaling_factor"])
+        dataset = LatentDataset(cached["moments"], prompt=tc.instance_prompt)
+        # The training loop only needs latents: release the VAE.
+        pipe.vae = None
+        gc.collect()
+    elif tc.memory_lean:
+        # Encode every view up front (in memory only) so the VAE is gone before the first step.
+        moments = precompute_latents(
+            pipe.vae, image_files, tc.resolution, tc.latent_variants, precision=tc.precision
+        )
+        latent_scaling = float(pipe.vae.config.scaling_factor)
+        dataset = LatentDataset(moments, prompt=tc.instance_prompt)
+        pipe.vae = None
+        gc.collect()
+    else:
+        latent_scaling = float(pipe.vae.config.scaling_factor)
+        dataset = ImagePromptDataset(image_files, prompt=tc.instance_prompt, resolution=tc.resolution)
+    sampler = shard_sampler(dataset, world_size, dist_rank)
+    dataloader = DataLoader(dataset, batch_size=tc.batch_size, shuffle=sampler is None, sampler=sampler, num_workers=0)
+    trainable_params = [p for p in pipe.unet.parameters() if p.requires_grad]
 
     # Train loop (very small, CPU-friendly)
     global_step = 0
+    if resume_from:
+        global_step = load_training_checkpoint(Path(resume_from), pipe.unet, optimizer)
+        logger.info("training_resumed", step=global_step, total=tc.steps, checkpoint=str(resume_from))
+        if dist_rank > 0:
+            torch.seed()  # ranks restored the same RNG state; decorrelate their noise
+    if world_size > 1:
+        # LoRA init is random per process: start every rank from rank 0's weights.
+        for p in trainable_params:
+            dist.broadcast(p.data, src=0)
+    checkpoint_path = Path(output_path) / "checkpoint" / "state.pt"
+    peak_rss_mb(reset=True)
+    window_peak_mb = 0.0  # max per-step peak RSS since the last progress log
+    run_peak_mb = 0.0
+    epoch = 0
     while global_step < tc.steps:
+        if sampler is not None:
+            sampler.set_epoch(epoch)
+        epoch += 1
         for batch in dataloader:
             if global_step >= tc.steps:
                 break
 
-            pixel_values = batch["pixel_values"].to(device)
-
-            # Encode images to latents
+            # Encode images to latents (or sample the precomputed ones)
             with torch.no_grad():
-                latents = pipe.vae.encode(pixel_values).latent_dist.sample()
-                latents = latents * pipe.vae.config.scaling_factor
+                if "latent_moments" in batch:
+                    latents = sample_latents(batch["latent_moments"].to(device))
+                else:
+                    pixel_values = batch["pixel_values"].to(device)
+                    with autocast(tc.precision):
+                        latents = pipe.vae.encode(pixel_values).latent_dist.sample().float()
+                latents = latents * latent_scaling
 
                 # Sample noise + timesteps
                 noise = torch.randn_like(latents)
@@ -189,34 +644,59 @@ def run_training(
                 timesteps = torch.randint(0, noise_scheduler.config.num_train_timesteps, (bsz,), device=device).long()
                 noisy_latents = noise_scheduler.add_noise(latents, noise, timesteps)
 
-                # Encode prompt
-                tokens = pipe.tokenizer(
-                    [tc.instance_prompt] * bsz,
-                    padding="max_length",
-                    truncation=True,
-                    max_length=pipe.tokenizer.model_max_length,
-                    return_tensors="pt",
-                )
-                encoder_hidden_states = pipe.text_encoder(tokens.input_ids.to(device))[0]
+                # Broadcast the precomputed prompt embedding over the batch
+                encoder_hidden_states = prompt_embeds.expand(bsz, -1, -1)
+
+            if tc.channels_last:
+                noisy_latents = noisy_latents.contiguous(memory_format=torch.channels_last)
 
-            # Predict the noise residual
-            model_pred = pipe.unet(noisy_latents, timesteps, encoder_hidden_states).sample
+            # Predict the noise residual (autocast: bf16 compute, fp32 LoRA weights and grads)
+            with autocast(tc.precision):
+                model_pred = pipe.unet(noisy_latents, timesteps, encoder_hidden_states).sample
             loss = torch.nn.functional.mse_loss(model_pred.float(), noise.float(), reduction="mean")
             loss = loss / tc.gradient_accumulation_steps
             loss.backward()
 
             if (global_step + 1) % tc.gradient_accumulation_steps == 0:
+                if world_size > 1:
+                    _all_reduce_grads(trainable_params, world_size)
                 optimizer.step()
                 optimizer.zero_grad(set_to_none=True)
 
+            window_peak_mb = max(window_peak_mb, peak_rss_mb())
             if global_step % 10 == 0:
                 loss_value = float(loss.detach().cpu())
-                logger.info("training_progress", step=global_step, total=tc.steps, loss=loss_value)
+                logger.info(
+                    "training_progress",
+                    step=global_step,
+                    total=tc.steps,
+                    loss=loss_value,
+                    peak_rss_mb=window_peak_mb,
+                )
                 if progress_callback:
-                    progress_callback(global_step, tc.steps, loss_value)
+                    progress_callback(global_step, tc.steps, loss_value, window_peak_mb)
+                run_peak_mb = max(run_peak_mb, window_peak_mb)
+                window_peak_mb = 0.0
 
+            peak_rss_mb(reset=True)  # next read reports the next step only
             global_step += 1
 
+            # Checkpoint on optimizer-step boundaries so no partial accumulation is lost
+            if (
+                dist_rank == 0
+                and tc.checkpoint_steps > 0
+                and global_step < tc.steps
+                and global_step % tc.checkpoint_steps == 0
+                and global_step % tc.gradient_accumulation_steps == 0
+            ):
+                save_training_checkpoint(checkpoint_path, pipe.unet, optimizer, global_step)
+                logger.info("training_checkpoint_saved", step=global_step, path=str(checkpoint_path))
+                if checkpoint_callback:
+                    checkpoint_callback(str(checkpoint_path), global_step)
+
+    if dist_rank != 0:
+        return {}
+
     # Save artifacts
     out_dir = Path(output_path)
     out_dir.mkdir(parents=True, exist_ok=True)
@@ -239,17 +719,25 @@ def run_training(
                 "rank": tc.rank,
                         "lora_alpha": tc.lora_alpha,
                 "resolution": tc.resolution,
+                "precision": tc.precision,
+                "channels_last": tc.channels_last,
+                "memory_lean": tc.memory_lean,
+                "gradient_checkpointing": tc.gradient_checkpointing,
+                "peak_rss_mb": max(run_peak_mb, window_peak_mb),
                 "note": "Trained LoRA attention processors (UNet) using diffusers",
             },
             f,
             indent=2,
         )
 
-    logger.info("training_completed", output_path=str(out_dir))
+    logger.info("training_completed", output_path=str(out_dir), peak_rss_mb=max(run_peak_mb, window_peak_mb))
 
     # Provide a canonical "weights path" (directory)
-    return {
+    artifacts: Dict[str, Any] = {
         "lora_dir": str(lora_dir),
         "config": str(config_path),
         "samples": [],
     }
+    if latents_file is not None:
+        artifacts["latents"] = str(latents_file)
+    return artifacts
@@ -1,19 +1,21 @@
 """
-CPU worker tasks for preprocessing.
+CPU worker tasks for preprocessing and person data cleanup.
 """
-import os
 import tempfile
 from pathlib import Path
 from typing import List
-from PIL import Image
-import imagehash
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from app.celery_app import celery_app
 from app.db.session import SessionLocal
 from app.db import models
+from app.core.config import settings
+from app.services.dataset_manifest import build_manifest, dataset_prefix, manifest_key, write_manifest
+from app.services.person_purge import purge_person_objects
+from app.services.preprocess import run_preprocess_pipeline
 from app.services.s3 import get_s3_service
 from app.core.logging import get_logger
+from app.workers.job_events import JobEventBuffer
 
 logger = get_logger(__name__)
 
@@ -21,9 +23,17 @@ logger = get_logger(__name__)
 @celery_app.task(bind=True, name="cpu.preprocess_person", queue="cpu_tasks")
 def preprocess_person_task(self, person_id: int, preprocess_run_id: int):
     """
-    Preprocess person photos: deduplication, normalization, face detection (stub).
+    Preprocess person photos: deduplication, normalization, face crop and sharpness filtering.
     """
     db: Session = SessionLocal()
+    events = JobEventBuffer(db)
+    preprocess_run = None
+    job = None
+
+    def add_event(event_type: str, message: str, meta: dict | None = None) -> None:
+        if job:
+            events.add(job.id, event_type, message, meta)
+
     try:
         # Get preprocess run
         preprocess_run = db.query(models.PreprocessRun).filter(
@@ -49,14 +59,19 @@ def preprocess_person_task(self, person_id: int, preprocess_run_id: int):
         db.commit()
         
         logger.info("preprocessing_started", person_id=person_id, run_id=preprocess_run_id)
+        add_event("milestone", "preprocessing_started", {"preprocess_run_id": preprocess_run_id})
         
-        # Get all uploaded photos for person
+        # Incremental: only newly uploaded photos are processed; earlier ones stay in the dataset
         photos = db.query(models.PhotoAsset).filter(
             models.PhotoAsset.person_id == person_id,
             models.PhotoAsset.status == "uploaded"
-        ).all()
+        ).order_by(models.PhotoAsset.id.asc()).all()
+        already_processed = db.query(models.PhotoAsset).filter(
+            models.PhotoAsset.person_id == person_id,
+            models.PhotoAsset.status == "processed"
+        ).count()
         
-        if not photos:
+        if not photos and not already_processed:
             preprocess_run.status = "failed"
             preprocess_run.error_message = "No photos found"
             if job:
@@ -65,84 +80,88 @@ def preprocess_person_task(self, person_id: int, preprocess_run_id: int):
                 job.finished_at = func.now()
             preprocess_run.finished_at = func.now()
             db.commit()
+            add_event("error", "preprocessing_failed", {"error": "No photos found"})
             return
         
         # Create temp directory
         with tempfile.TemporaryDirectory() as temp_dir:
             s3 = get_s3_service()
             temp_path = Path(temp_dir)
-            processed_dir = temp_path / "processed"
-            processed_dir.mkdir()
             
-            # Download and process photos
+            # Download, process and upload photos (pipelined; dedup in photo id order)
             processed_photos: List[models.PhotoAsset] = []
             duplicates: List[models.PhotoAsset] = []
             rejected: List[models.PhotoAsset] = []
-            seen_hashes = set()
-            
+
+            # Also dedup against photos processed in earlier runs for this person.
+            known_hashes = [
+                (photo_id, phash)
+                for photo_id, phash in db.query(models.PhotoAsset.id, models.PhotoAsset.phash)
+                .filter(
+                    models.PhotoAsset.person_id == person_id,
+                    models.PhotoAsset.status == "processed",
+                    models.PhotoAsset.phash.isnot(None),
+                )
+                .order_by(models.PhotoAsset.id.asc())
+                .all()
+            ]
+
+            outcomes = run_preprocess_pipeline(
+                [(photo.id, photo.s3_key) for photo in photos],
+                work_dir=temp_path,
+                output_prefix=dataset_prefix(person_id),
+                s3=s3,
+                io_concurrency=settings.PREPROCESS_IO_CONCURRENCY,
+                cpu_workers=settings.PREPROCESS_CPU_WORKERS,
+                dedup_radius=settings.PREPROCESS_DEDUP_HAMMING_RADIUS,
+                known_hashes=known_hashes,
+                face_crop=settings.PREPROCESS_FACE_CROP,
+                face_crop_scale=settings.PREPROCESS_FACE_CROP_SCALE,
+                min_sharpness=settings.PREPROCESS_MIN_SHARPNESS,
+            )
             for photo in photos:
-                try:
-                    # Download photo
-                    local_path = temp_path / f"photo_{photo.id}.tmp"
-                    s3.download_file(photo.s3_key, str(local_path))
-                    
-                    # Open and validate
-                    img = Image.open(local_path)
-                    img.verify()
-                    img = Image.open(local_path)  # Reopen after verify
-                    
-                    # Calculate perceptual hash
-                    phash_str = str(imagehash.phash(img))
-                    photo.phash = phash_str
-                    
-                    # Check for duplicates
-                    if phash_str in seen_hashes:
-                        photo.status = "duplicate"
-                        photo.is_duplicate = True
-                        duplicates.append(photo)
-                        logger.info("photo_duplicate", photo_id=photo.id, phash=phash_str)
-                        continue
-                    
-                    seen_hashes.add(phash_str)
-                    
-                    # Normalize size (max 1024px)
-                    max_size = 1024
-                    if img.width > max_size or img.height > max_size:
-                        img.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
-                    
-                    # Convert to RGB if needed
-                    if img.mode != 'RGB':
-                        img = img.convert('RGB')
-                    
-                    # Save processed image
-                    processed_filename = f"processed_{photo.id}.jpg"
-                    processed_path = processed_dir / processed_filename
-                    img.save(processed_path, "JPEG", quality=95)
-                    
-                    # Upload to S3
-                    output_key = f"datasets/processed/{person_id}/{processed_filename}"
-                    s3.upload_file(str(processed_path), output_key, "image/jpeg")
-                    
-                    # Update photo
+                outcome = outcomes[photo.id]
+                if outcome.phash:
+                    photo.phash = outcome.phash
+                photo.sharpness = outcome.sharpness
+                photo.face_count = outcome.face_count
+                photo.face_box_json = outcome.face_box
+                if outcome.status == "processed":
                     photo.status = "processed"
+                    photo.processed_s3_key = outcome.output_key
+                    photo.processed_width = outcome.width
+                    photo.processed_height = outcome.height
+                    photo.processed_sha256 = outcome.sha256
                     processed_photos.append(photo)
-                    
-                    logger.info("photo_processed", photo_id=photo.id, output_key=output_key)
-                    
-                except Exception as e:
-                    logger.error("photo_processing_failed", photo_id=photo.id, error=str(e))
+                elif outcome.status == "duplicate":
+                    photo.status = "duplicate"
+                    photo.is_duplicate = True
+                    duplicates.append(photo)
+                else:
                     photo.status = "rejected"
+                    photo.rejection_reason = outcome.error
                     rejected.append(photo)
             
-            # TODO: Face detection (stub)
-            # if face_detection_available:
-            #     detect_faces(processed_dir)
-            
+            # Manifest of the whole dataset (earlier runs' photos + this run's), minus deleted photos
+            db.flush()
+            dataset_photos = db.query(models.PhotoAsset).filter(
+                models.PhotoAsset.person_id == person_id,
+                models.PhotoAsset.status == "processed"
+            ).all()
+            manifest = build_manifest(person_id, preprocess_run_id, dataset_photos)
+            manifest_s3_key = manifest_key(person_id, preprocess_run_id)
+            s3.upload_file(
+                str(write_manifest(manifest, temp_path / "manifest.json")),
+                manifest_s3_key,
+                "application/json",
+            )
+
             # Update preprocess run
             preprocess_run.images_accepted = len(processed_photos)
             preprocess_run.images_rejected = len(rejected)
             preprocess_run.images_duplicates = len(duplicates)
-            preprocess_run.output_s3_prefix = f"datasets/processed/{person_id}/"
+            preprocess_run.output_s3_prefix = dataset_prefix(person_id)
+            preprocess_run.manifest_s3_key = manifest_s3_key
             preprocess_run.status = "finished"
             preprocess_run.finished_at = func.now()
             
@@ -151,13 +170,20 @@ def preprocess_person_task(self, person_id: int, preprocess_run_id: int):
                 job.finished_at = func.now()
             
             db.commit()
+            add_event("milestone", "preprocessing_completed", {
+                "accepted": len(processed_photos),
+                "rejected": len(rejected),
+                "duplicates": len(duplicates),
+                "dataset_images": len(manifest["images"]),
+            })
             
             logger.info(
                 "preprocessing_completed",
                 person_id=person_id,
                 accepted=len(processed_photos),
                 rejected=len(rejected),
-                duplicates=len(duplicates)
+                duplicates=len(duplicates),
+                dataset_images=len(manifest["images"]),
             )
     
     except Exception as e:
@@ -169,7 +195,87 @@ def preprocess_person_task(self, person_id: int, preprocess_run_id: int):
             job.status = "failed"
             job.error_message = str(e)
         db.commit()
+        try:
+            add_event("error", "preprocessing_failed", {"error": str(e)})
+        except Exception:
+            pass
         raise
     
     finally:
+        events.close()
+        db.close()
+
+
+@celery_app.task(bind=True, name="cpu.purge_person", queue="cpu_tasks")
+def purge_person_task(self, person_id: int, job_id: int):
+    """
+    Delete all S3 objects of a (soft-deleted) person in bulk: uploads, dataset, LoRA artifacts, outputs.
+    """
+    db: Session = SessionLocal()
+    events = JobEventBuffer(db)
+    job = None
+
+    def add_event(event_type: str, message: str, meta: dict | None = None) -> None:
+        if job:
+            events.add(job.id, event_type, message, meta)
+
+    try:
+        job = db.query(models.Job).filter(models.Job.id == job_id).first()
+        person = db.query(models.PersonProfile).filter(models.PersonProfile.id == person_id).first()
+        if not person:
+            logger.error("person_not_found", person_id=person_id)
+            if job:
+                job.status = "failed"
+                job.error_message = "Person not found"
+                job.finished_at = func.now()
+                db.commit()
+            return
+
+        if job:
+            job.status = "started"
+            job.started_at = func.now()
+            db.commit()
+        add_event("milestone", "purge_started")
+        logger.info("person_purge_started", person_id=person_id, job_id=job_id)
+
+        def progress_cb(processed: int, total: int) -> None:
+            add_event("progress", "objects_deleted", {"processed": processed, "total": total})
+
+        result = purge_person_objects(db, person, get_s3_service(), progress_callback=progress_cb)
+        for failure in result["failed"]:
+            logger.error("object_delete_failed", person_id=person_id, **failure)
+        add_event(
+            "error" if result["failed"] else "milestone",
+            "purge_finished",
+            {
+                "total": result["total"],
+                "deleted": result["deleted"],
+                "failed": len(result["failed"]),
+                "failed_keys": [f["key"] for f in result["failed"][:50]],
+            },
+        )
+
+        if job:
+            if result["failed"]:
+                job.status = "failed"
+                job.error_message = f"{len(result['failed'])} of {result['total']} objects could not be deleted"
+            else:
+                job.status = "finished"
+            job.finished_at = func.now()
+            db.commit()
+
+        logger.info("person_purge_completed", person_id=person_id, **{k: result[k] for k in ("total", "deleted")})
+        return {"total": result["total"], "deleted": result["deleted"], "failed": len(result["failed"])}
+
+    except Exception as e:
+        logger.error("person_purge_failed", person_id=person_id, error=str(e))
+        if job:
+            job.status = "failed"
+            job.error_message = str(e)
+            job.finished_at = func.now()
+            db.commit()
+        raise
+
+    finally:
+        events.close()
         db.close()
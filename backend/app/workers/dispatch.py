@@ -0,0 +1,23 @@
+"""
+Task dispatch for the API process.
+
+Tasks are enqueued by name, so importing the API does not import the worker modules (and with
+them torch, diffusers, peft, OpenCV, ...). Queues come from `celery_app.conf.task_routes`.
+"""
+from celery.result import AsyncResult
+
+from app.celery_app import celery_app
+
+PREPROCESS_PERSON = "cpu.preprocess_person"
+PURGE_PERSON = "cpu.purge_person"
+TRAIN_MODEL = "gpu.train_model"
+GENERATE_IMAGE = "gpu.generate_image"
+
+
+def enqueue(task_name: str, *args) -> AsyncResult:
+    """Queue `task_name(*args)`; returns the result handle (its `id` is the Celery task id)."""
+    if celery_app.conf.task_always_eager:
+        # send_task ignores eager mode; run in-process like `.delay()` would (dev/testing only).
+        celery_app.loader.import_default_modules()
+        return celery_app.tasks[task_name].apply(args=args)
+    return celery_app.send_task(task_name, args=list(args))
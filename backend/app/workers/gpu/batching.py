@@ -0,0 +1,132 @@
+"""
+Cross-request micro-batching for generation tasks.
+
+Generation tasks on `gpu_tasks` run one at a time. When a task starts it claims its own
+`Generation` row and then drains other *pending* rows that can share the same denoising pass
+(same model version -> same base model and LoRA adapter, same resolution, step count and
+precision mode).
+Claiming is an atomic `pending -> generating` status update, so the Celery tasks of the rows
+drained this way find them already claimed and exit without doing any work.
+Each claim records the claiming task id and time. Recovery when the batching worker dies:
+- the batching task is acked late, so the broker redelivers it; the redelivered task (same id)
+  re-claims its own row and the rows it had drained;
+- the tasks of drained rows don't exit for good but re-check later (see generate_image_task);
+  once a claim is older than `claim_stale_seconds()` (task time limit + margin, so a live batch is
+  never robbed) the row can be claimed again, by its own task or by a compatible batch.
+"""
+
+from __future__ import annotations
+
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from app.celery_app import TASK_TIME_LIMIT_SECONDS
+from app.db import models
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+CLAIM_STALE_MARGIN_SECONDS = 600
+
+
+def claim_stale_seconds() -> float:
+    """Age after which a `generating` claim counts as orphaned (its task can no longer be running)."""
+    return settings.GENERATION_CLAIM_STALE_SECONDS or TASK_TIME_LIMIT_SECONDS + CLAIM_STALE_MARGIN_SECONDS
+
+
+def _claimable(task_id: Optional[str] = None, stale_after: Optional[float] = None):
+    """Rows that may be claimed: pending, generating under a stale claim, or claimed by `task_id`."""
+    stale_after = claim_stale_seconds() if stale_after is None else stale_after
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=float(stale_after))
+    reclaimable = [models.Generation.claimed_at.is_(None), models.Generation.claimed_at < cutoff]
+    if task_id:
+        # A redelivered task (same id) continues the batch its dead predecessor claimed.
+        reclaimable.append(models.Generation.claimed_by == task_id)
+    return or_(
+        models.Generation.status == "pending",
+        and_(models.Generation.status == "generating", or_(*reclaimable)),
+    )
+
+
+def claim_generation(
+    db: Session,
+    generation_id: int,
+    task_id: Optional[str] = None,
+    stale_after: Optional[float] = None,
+) -> bool:
+    """Atomically move a generation to `generating` for `task_id`. False if already claimed."""
+    updated = (
+        db.query(models.Generation)
+        .filter(models.Generation.id == generation_id, _claimable(task_id, stale_after))
+        .update(
+            {
+                models.Generation.status: "generating",
+                models.Generation.claimed_by: task_id,
+                models.Generation.claimed_at: datetime.now(timezone.utc),
+            },
+            synchronize_session=False,
+        )
+    )
+    db.commit()
+    return updated == 1
+
+
+def claim_compatible_generations(
+    db: Session,
+    leader: models.Generation,
+    max_images: int,
+    window_seconds: float = 0.0,
+    task_id: Optional[str] = None,
+    stale_after: Optional[float] = None,
+) -> List[models.Generation]:
+    """
+    Claim pending (or stale) generations that can be batched with `leader` (oldest first),
+    keeping the total number of images in the batch at or below `max_images`.
+    """
+    total = int(leader.num_images or 1)
+    if max_images <= total:
+        return []
+
+    if window_seconds > 0:
+        # Give bursts a moment to land in the DB before draining.
+        time.sleep(window_seconds)
+
+    candidates = (
+        db.query(models.Generation)
+        .filter(
+            models.Generation.id != leader.id,
+            _claimable(task_id, stale_after),
+            models.Generation.model_version_id == leader.model_version_id,
+            models.Generation.steps == leader.steps,
+            models.Generation.width == leader.width,
+            models.Generation.height == leader.height,
+            models.Generation.precision == leader.precision,
+            models.Generation.channels_last == leader.channels_last,
+        )
+        .order_by(models.Generation.created_at.asc(), models.Generation.id.asc())
+        .all()
+    )
+
+    claimed: List[models.Generation] = []
+    for candidate in candidates:
+        n = int(candidate.num_images or 1)
+        if total + n > max_images:
+            continue
+        if claim_generation(db, candidate.id, task_id=task_id, stale_after=stale_after):
+            claimed.append(candidate)
+            total += n
+
+    if claimed:
+        logger.info(
+            "generation_batch_claimed",
+            leader_id=leader.id,
+            generation_ids=[g.id for g in claimed],
+            num_images=total,
+        )
+    return claimed
@@ -7,24 +7,55 @@ import time
 from pathlib import Path
 from sqlalchemy.orm import Session
 from sqlalchemy import func
+from celery.exceptions import Retry, SoftTimeLimitExceeded
 from app.celery_app import celery_app
 from app.db.session import SessionLocal
 from app.db import models
 from app.services.s3 import get_s3_service
-from app.services.trainer.train import run_training
-from app.services.inference.generate import generate_image, generate_thumbnail
+from app.services.artifact_cache import get_lora_artifact_cache
+from app.services.dataset_manifest import live_entries, read_manifest, verify_downloads
+from app.workers.gpu.batching import claim_compatible_generations, claim_generation
+from app.workers.job_events import JobEventBuffer
+from app.services.trainer.train import (
+    can_spawn_processes,
+    latents_file_name,
+    prune_latent_cache,
+    run_training,
+)
+from app.services.inference.generate import GenerationRequest, generate_batch, generate_thumbnail
 from app.core.logging import get_logger
-from app.core.config import settings
+from app.core.config import get_models_dir, settings
 
 logger = get_logger(__name__)
 
 
-@celery_app.task(bind=True, name="gpu.train_model")
+@celery_app.task(
+    bind=True,
+    name="gpu.train_model",
+    # Redeliver if the worker dies mid-run; the retry resumes from the last checkpoint.
+    acks_late=True,
+    reject_on_worker_lost=True,
+    soft_time_limit=settings.TRAIN_SOFT_TIME_LIMIT_SECONDS,
+    max_retries=settings.TRAIN_MAX_RESUMES,
+)
 def train_model_task(self, model_version_id: int):
     """
-    Train LoRA model (STUB - placeholder).
+    Train LoRA model.
+
+    Checkpoints (LoRA weights, optimizer/RNG state, step) are uploaded periodically to
+    models/lora/<id>/checkpoints/state.pt; a retried task continues from there.
     """
     db: Session = SessionLocal()
+    events = JobEventBuffer(db)
+    model_version = None
+    job = None
+    retrying = False
+
+    def add_event(event_type: str, message: str, meta: dict | None = None) -> bool:
+        if not job:
+            return False
+        return events.add(job.id, event_type, message, meta)
+
     try:
         # Get model version
         model_version = db.query(models.ModelVersion).filter(
@@ -44,13 +75,6 @@ def train_model_task(self, model_version_id: int):
             job.status = "started"
             job.started_at = func.now()
             db.commit()
-
-        def add_event(event_type: str, message: str, meta: dict | None = None) -> None:
-            if not job:
-                return
-            ev = models.JobEvent(job_id=job.id, event_type=event_type, message=message, metadata_json=meta or None)
-            db.add(ev)
-            db.commit()
         
         model_version.status = "training"
         db.commit()
@@ -68,6 +92,10 @@ def train_model_task(self, model_version_id: int):
         if not preprocess_run or not preprocess_run.output_s3_prefix:
             model_version.status = "failed"
             model_version.error_message = "No processed dataset found"
+            if job:
+                job.status = "failed"
+                job.error_message = "No processed dataset found"
+                job.finished_at = func.now()
             db.commit()
             return
         
@@ -78,12 +106,29 @@ def train_model_task(self, model_version_id: int):
             dataset_dir = temp_path / "dataset"
             dataset_dir.mkdir()
             
-            # List and download processed images
-            dataset_keys = s3.list_files(preprocess_run.output_s3_prefix)
-            for key in dataset_keys:
-                if key.endswith(('.jpg', '.jpeg', '.png')):
-                    local_path = dataset_dir / Path(key).name
-                    s3.download_file(key, str(local_path))
+            # Download exactly the run's manifest (minus photos deleted since); older runs
+            # without a manifest fall back to listing the dataset prefix.
+            if preprocess_run.manifest_s3_key:
+                manifest_path = temp_path / "manifest.json"
+                s3.download_file(preprocess_run.manifest_s3_key, str(manifest_path))
+                live_ids = {
+                    photo_id
+                    for (photo_id,) in db.query(models.PhotoAsset.id).filter(
+                        models.PhotoAsset.person_id == person.id,
+                        models.PhotoAsset.status == "processed",
+                    )
+                }
+                dataset_entries = live_entries(read_manifest(manifest_path), live_ids)
+                dataset_keys = [e["key"] for e in dataset_entries]
+            else:
+                dataset_entries = []
+                dataset_keys = [
+                    key for key in s3.list_files(preprocess_run.output_s3_prefix)
+                    if key.endswith(('.jpg', '.jpeg', '.png'))
+                ]
+            s3.download_many((key, dataset_dir / Path(key).name) for key in dataset_keys)
+            verify_downloads(dataset_entries, dataset_dir)
+            add_event("milestone", "dataset_downloaded", {"images": len(dataset_keys)})
             
             # Prepare training config
             train_config = model_version.train_config_json or {}
@@ -92,10 +137,37 @@ def train_model_task(self, model_version_id: int):
                 "trigger_token": model_version.trigger_token,
             })
 
+            # Precomputed VAE latents: local cache, optionally mirrored next to the dataset in S3.
+            # Only this run's cache key is fetched; other keys under the prefix belong to other
+            # configs or datasets.
+            latents_dir = get_models_dir() / "cache" / "latents"
+            latents_prefix = f"{preprocess_run.output_s3_prefix}latents/"
+            sync_latents = bool(train_config.get("cache_latents")) and settings.TRAIN_LATENT_CACHE_S3
+            latents_remote = False
+            if sync_latents:
+                latents_name = latents_file_name(
+                    train_config, [p for p in dataset_dir.iterdir() if p.suffix in (".jpg", ".jpeg", ".png")]
+                )
+                local_latents = latents_dir / latents_name
+                latents_remote = bool(s3.list_files(f"{latents_prefix}{latents_name}"))
+                if latents_remote and not local_latents.exists():
+                    latents_dir.mkdir(parents=True, exist_ok=True)
+                    part_path = local_latents.with_suffix(".part")
+                    s3.download_file(f"{latents_prefix}{latents_name}", str(part_path))
+                    os.replace(part_path, local_latents)
+
+            num_processes = int(train_config.get("num_processes", 1))
+            if num_processes > 1 and not can_spawn_processes():
+                # Prefork pool children are daemonic: training runs in a single process.
+                add_event("log", "data_parallel_unavailable", {
+                    "num_processes": num_processes,
+                    "reason": "worker pool processes cannot start child processes; run the worker with --pool=solo or --pool=threads",
+                })
+
             total_steps = int(train_config.get("steps", 200))
             t0 = time.time()
 
-            def progress_cb(step: int, total: int, loss: float) -> None:
+            def progress_cb(step: int, total: int, loss: float, step_peak_rss_mb: float) -> None:
                 elapsed = max(0.0, time.time() - t0)
                 eta = None
                 if step > 0:
@@ -105,16 +177,32 @@ def train_model_task(self, model_version_id: int):
                     "current": int(step),
                     "total": int(total),
                     "loss": float(loss),
+                    "peak_rss_mb": float(step_peak_rss_mb),
                     "elapsed_seconds": float(elapsed),
                     "eta_seconds": float(eta) if eta is not None else None,
                 }
-                # Persist + expose via Celery task meta.
-                add_event("progress", f"step {step}/{total} loss={loss:.6f}", meta)
-                try:
-                    self.update_state(state="PROGRESS", meta=meta)
-                except Exception:
-                    pass
+                # Persist + expose via Celery task meta (both throttled by the event buffer).
+                if add_event("progress", f"step {step}/{total} loss={loss:.6f}", meta) or not job:
+                    try:
+                        self.update_state(state="PROGRESS", meta=meta)
+                    except Exception:
+                        pass
             
+            # Resume from the latest checkpoint of a previous (interrupted) attempt
+            artifact_prefix = f"models/lora/{model_version_id}/"
+            checkpoint_key = f"{artifact_prefix}checkpoints/state.pt"
+            resume_from = None
+            if s3.list_files(checkpoint_key):
+                resume_path = temp_path / "resume" / "state.pt"
+                resume_path.parent.mkdir(parents=True, exist_ok=True)
+                s3.download_file(checkpoint_key, str(resume_path))
+                resume_from = str(resume_path)
+                add_event("milestone", "training_resuming", {"model_version_id": model_version_id, "checkpoint": checkpoint_key})
+
+            def checkpoint_cb(path: str, step: int) -> None:
+                s3.upload_file(path, checkpoint_key)
+                add_event("milestone", "checkpoint_saved", {"step": int(step), "key": checkpoint_key})
+
             # Run training (diffusers)
             output_dir = temp_path / "model_output"
             artifacts = run_training(
@@ -122,18 +210,25 @@ def train_model_task(self, model_version_id: int):
                 dataset_path=str(dataset_dir),
                 output_path=str(output_dir),
                 progress_callback=progress_cb,
+                latents_dir=str(latents_dir),
+                resume_from=resume_from,
+                checkpoint_callback=checkpoint_cb,
             )
+
+            # Latents belong to the dataset, not the LoRA artifacts
+            latents_file = artifacts.pop("latents", None)
+            if latents_file and sync_latents and not latents_remote:
+                s3.upload_file(str(latents_file), f"{latents_prefix}{Path(latents_file).name}")
+            if latents_file:
+                prune_latent_cache(latents_dir, settings.TRAIN_LATENT_CACHE_MB * 1024 * 1024, keep=(Path(latents_file),))
             
-            # Upload artifacts to S3
-            artifact_prefix = f"models/lora/{model_version_id}/"
-            uploaded_keys = []
+            # Upload artifacts to S3 (all files concurrently)
+            uploads = []
             
             for artifact_type, artifact_path in artifacts.items():
                 if isinstance(artifact_path, list):
                     for sample_path in artifact_path:
-                        key = f"{artifact_prefix}{Path(sample_path).name}"
-                        s3.upload_file(sample_path, key)
-                        uploaded_keys.append(key)
+                        uploads.append((sample_path, f"{artifact_prefix}{Path(sample_path).name}", None))
                 else:
                     ap = Path(artifact_path)
                     if ap.exists() and ap.is_dir():
@@ -141,18 +236,19 @@ def train_model_task(self, model_version_id: int):
                             if not file_path.is_file():
                                 continue
                             rel = file_path.relative_to(ap).as_posix()
-                            key = f"{artifact_prefix}{artifact_type}/{rel}"
-                            s3.upload_file(str(file_path), key)
-                            uploaded_keys.append(key)
+                            uploads.append((str(file_path), f"{artifact_prefix}{artifact_type}/{rel}", None))
                     else:
-                        key = f"{artifact_prefix}{Path(artifact_path).name}"
-                        s3.upload_file(str(artifact_path), key)
-                        uploaded_keys.append(key)
+                        uploads.append((str(artifact_path), f"{artifact_prefix}{Path(artifact_path).name}", None))
+            uploaded_keys = s3.upload_many(uploads)
             
             # Update model version
             model_version.artifact_s3_prefix = artifact_prefix
             model_version.status = "completed"
             db.commit()
+
+            # Finished runs don't need their resume state any more
+            if resume_from or s3.list_files(checkpoint_key):
+                s3.delete_file(checkpoint_key)
             
             if job:
                 job.status = "finished"
@@ -162,6 +258,23 @@ def train_model_task(self, model_version_id: int):
             
             logger.info("training_completed", model_version_id=model_version_id)
     
+    except SoftTimeLimitExceeded as e:
+        if self.request.retries < self.max_retries:
+            # Out of time for this attempt: re-queue and continue from the last checkpoint.
+            logger.warning("training_time_limit_retrying", model_version_id=model_version_id, attempt=self.request.retries + 1)
+            add_event("milestone", "training_time_limit_retrying", {"attempt": self.request.retries + 1})
+            retrying = True  # the job goes on: keep live streams open
+            raise self.retry(exc=e, countdown=5)
+        logger.error("training_failed", model_version_id=model_version_id, error=str(e))
+        if model_version:
+            model_version.status = "failed"
+            model_version.error_message = "Training time limit exceeded"
+        if job:
+            job.status = "failed"
+            job.error_message = "Training time limit exceeded"
+        db.commit()
+        raise
+
     except Exception as e:
         logger.error("training_failed", model_version_id=model_version_id, error=str(e))
         if model_version:
@@ -174,15 +287,39 @@ def train_model_task(self, model_version_id: int):
         raise
     
     finally:
+        events.close(end_streams=not retrying)
         db.close()
 
 
-@celery_app.task(bind=True, name="gpu.generate_image")
+@celery_app.task(
+    bind=True,
+    name="gpu.generate_image",
+    # Redeliver if the worker dies mid-batch; the redelivered task re-claims its batch.
+    acks_late=True,
+    reject_on_worker_lost=True,
+    # Re-checks of a row batched elsewhere end when it completes or its claim goes stale.
+    max_retries=None,
+)
 def generate_image_task(self, generation_id: int):
     """
-    Generate image (STUB - placeholder).
+    Generate image(s) for a generation.
+
+    Compatible pending generations are claimed and run in the same batched denoising pass;
+    each of them still gets its own status, outputs and job events. The task of a row claimed
+    by another batch re-checks it later, so the row is not lost if that batch's worker dies.
     """
     db: Session = SessionLocal()
+    events = JobEventBuffer(db)
+    generation = None
+    batch: list[models.Generation] = []
+    jobs: dict[int, models.Job] = {}
+
+    def add_event(gen_id: int, event_type: str, message: str, meta: dict | None = None) -> bool:
+        job = jobs.get(gen_id)
+        if not job:
+            return False
+        return events.add(job.id, event_type, message, meta)
+
     try:
         # Get generation
         generation = db.query(models.Generation).filter(
@@ -192,63 +329,64 @@ def generate_image_task(self, generation_id: int):
         if not generation:
             logger.error("generation_not_found", generation_id=generation_id)
             return
-        
-        # Get job
-        job = db.query(models.Job).filter(
-            models.Job.generation_id == generation_id
-        ).first()
-        
-        if job:
+
+        if not claim_generation(db, generation_id, task_id=self.request.id):
+            db.refresh(generation)
+            logger.info("generation_already_claimed", generation_id=generation_id, status=generation.status)
+            if generation.status == "generating" and not self.request.is_eager:
+                # In another task's micro-batch: come back until it's done or the claim is stale.
+                raise self.retry(countdown=settings.GENERATION_CLAIM_RECHECK_SECONDS)
+            return
+
+        batch = [
+            generation,
+            *claim_compatible_generations(
+                db,
+                generation,
+                max_images=settings.GENERATION_BATCH_MAX_IMAGES,
+                window_seconds=settings.GENERATION_BATCH_WINDOW_SECONDS,
+                task_id=self.request.id,
+            ),
+        ]
+        batch_ids = [g.id for g in batch]
+
+        # Get jobs
+        for job in db.query(models.Job).filter(models.Job.generation_id.in_(batch_ids)).all():
+            jobs[job.generation_id] = job
             job.status = "started"
             job.started_at = func.now()
-            db.commit()
-
-        def add_event(event_type: str, message: str, meta: dict | None = None) -> None:
-            if not job:
-                return
-            ev = models.JobEvent(job_id=job.id, event_type=event_type, message=message, metadata_json=meta or None)
-            db.add(ev)
-            db.commit()
-        
-        generation.status = "generating"
         db.commit()
         
-        logger.info("generation_started", generation_id=generation_id)
-        add_event("milestone", "generation_started", {"generation_id": generation_id, "model_version_id": generation.model_version_id})
+        logger.info("generation_started", generation_id=generation_id, batch=batch_ids)
+        for g in batch:
+            add_event(g.id, "milestone", "generation_started", {
+                "generation_id": g.id,
+                "model_version_id": g.model_version_id,
+                "batch_generation_ids": batch_ids,
+            })
         
         # Get model version and LoRA path
         model_version = generation.model_version
 
-        # Generate image
+        # Generate images
         with tempfile.TemporaryDirectory() as temp_dir:
             s3 = get_s3_service()
             temp_path = Path(temp_dir)
-            output_file = temp_path / f"generation_{generation_id}.png"
+            # Single images keep the historical key layout; batches get an index suffix.
+            names: dict[int, list[str]] = {}
+            for g in batch:
+                n = int(g.num_images or 1)
+                names[g.id] = [f"{g.id}"] if n == 1 else [f"{g.id}_{i}" for i in range(n)]
 
-            # Download LoRA adapter into the same temp dir (so it exists during generation)
+            # Resolve LoRA adapter from the local artifact cache (downloads only on a miss)
             lora_path = None
             if model_version.artifact_s3_prefix:
-                lora_dir = temp_path / "lora"
-                lora_dir.mkdir(parents=True, exist_ok=True)
-
-                prefix = f"{model_version.artifact_s3_prefix}lora_dir/"
-                keys = s3_service.list_files(prefix)
-                for key in keys:
-                    if key.endswith("/"):
-                        continue
-                    rel = key[len(prefix):]
-                    out_path = lora_dir / rel
-                    out_path.parent.mkdir(parents=True, exist_ok=True)
-                    s3_service.download_file(key, str(out_path))
-
+                lora_dir = get_lora_artifact_cache().fetch(f"{model_version.artifact_s3_prefix}lora_dir/")
                 lora_path = str(lora_dir)
             
             t0 = time.time()
 
             def progress_cb(step: int, total: int) -> None:
-                # Avoid DB spam: log every 5 steps
-                if step % 5 != 0 and step != total - 1:
-                    return
                 elapsed = max(0.0, time.time() - t0)
                 eta = None
                 if step > 0:
@@ -259,66 +397,100 @@ def generate_image_task(self, generation_id: int):
                     "total": int(total),
                     "elapsed_seconds": float(elapsed),
                     "eta_seconds": float(eta) if eta is not None else None,
+                    "batch_size": len(batch),
                 }
-                add_event("progress", f"diffusion_step {step}/{total}", meta)
-                try:
-                    self.update_state(state="PROGRESS", meta=meta)
-                except Exception:
-                    pass
-
-            generate_image(
-                prompt=generation.prompt,
-                negative_prompt=generation.negative_prompt,
+                # The event buffer coalesces ticks; the Celery task meta follows its flushes.
+                flushed = [add_event(g.id, "progress", f"diffusion_step {step}/{total}", meta) for g in batch]
+                if any(flushed) or step == total - 1:
+                    try:
+                        self.update_state(state="PROGRESS", meta=meta)
+                    except Exception:
+                        pass
+
+            requests = [
+                GenerationRequest(
+                    prompt=g.prompt,
+                    negative_prompt=g.negative_prompt,
+                    num_images=int(g.num_images or 1),
+                    seed=g.seed,
+                    seeds=g.seeds_json,
+                    output_paths=[str(temp_path / f"generation_{name}.png") for name in names[g.id]],
+                )
+                for g in batch
+            ]
+            results = generate_batch(
+                requests,
                 model_version_id=model_version.id,
                 lora_path=lora_path,
                 steps=generation.steps,
                 width=generation.width,
                 height=generation.height,
-                seed=generation.seed,
-                output_path=str(output_file),
                 base_model_name=model_version.base_model_name,
                 hf_token=settings.HUGGINGFACE_HUB_TOKEN,
                 progress_callback=progress_cb,
+                precision=generation.precision or "fp32",
+                channels_last=bool(generation.channels_last),
             )
             
-            # Upload to S3
-            output_key = f"outputs/{generation_id}.png"
-            s3.upload_file(str(output_file), output_key, "image/png")
-            
-            # Generate thumbnail
-            thumbnail_file = temp_path / f"thumb_{generation_id}.png"
-            generate_thumbnail(str(output_file), str(thumbnail_file))
-            thumbnail_key = f"outputs/thumbnails/{generation_id}.png"
-            s3.upload_file(str(thumbnail_file), thumbnail_key, "image/png")
-            
-            # Update generation
-            generation.output_s3_key = output_key
-            generation.thumbnail_s3_key = thumbnail_key
-            generation.status = "completed"
-            db.commit()
-            
-            if job:
-                job.status = "finished"
-                job.finished_at = func.now()
+            for g, output_files in zip(batch, results):
+                # Upload images + thumbnails to S3
+                output_keys = []
+                thumbnail_keys = []
+                uploads = []
+                for name, output_file in zip(names[g.id], output_files):
+                    output_key = f"outputs/{name}.png"
+                    uploads.append((str(output_file), output_key, "image/png"))
+                    output_keys.append(output_key)
+
+                    thumbnail_file = temp_path / f"thumb_{name}.png"
+                    generate_thumbnail(str(output_file), str(thumbnail_file))
+                    thumbnail_key = f"outputs/thumbnails/{name}.png"
+                    uploads.append((str(thumbnail_file), thumbnail_key, "image/png"))
+                    thumbnail_keys.append(thumbnail_key)
+                s3.upload_many(uploads)
+
+                # Update generation
+                g.output_s3_key = output_keys[0]
+                g.thumbnail_s3_key = thumbnail_keys[0]
+                g.output_s3_keys_json = output_keys
+                g.thumbnail_s3_keys_json = thumbnail_keys
+                g.status = "completed"
                 db.commit()
-                add_event("milestone", "generation_completed", {"generation_id": generation_id})
+
+                job = jobs.get(g.id)
+                if job:
+                    job.status = "finished"
+                    job.finished_at = func.now()
+                    db.commit()
+                    add_event(g.id, "milestone", "generation_completed", {
+                        "generation_id": g.id,
+                        "num_images": len(output_keys),
+                        "batch_size": len(batch),
+                    })
             
-            logger.info("generation_completed", generation_id=generation_id)
-    
+            logger.info("generation_completed", generation_id=generation_id, batch=batch_ids)
+
+    except Retry:
+        raise
+
     except Exception as e:
         logger.error("generation_failed", generation_id=generation_id, error=str(e))
-        if generation:
-            generation.status = "failed"
-            generation.error_message = str(e)
-        if job:
-            job.status = "failed"
-            job.error_message = str(e)
+        db.rollback()
+        for g in batch or ([generation] if generation else []):
+            g.status = "failed"
+            g.error_message = str(e)
+            job = jobs.get(g.id)
+            if job:
+                job.status = "failed"
+                job.error_message = str(e)
         db.commit()
-        try:
-            add_event("error", "generation_failed", {"generation_id": generation_id, "error": str(e)})
-        except Exception:
-            pass
+        for g in batch:
+            try:
+                add_event(g.id, "error", "generation_failed", {"generation_id": g.id, "error": str(e)})
+            except Exception:
+                pass
         raise
     
     finally:
+        events.close()
         db.close()
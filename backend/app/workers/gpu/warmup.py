@@ -0,0 +1,232 @@
+"""
+Warm-up of GPU workers at boot.
+
+Workers consuming `gpu_tasks` sync and load the configured base models (and LoRA adapters of
+hot model versions) into the per-process pipeline cache before the consumer starts, so the
+first task does not pay for the MinIO sync and weight loading. Once warm and consuming, the
+worker writes `WORKER_READY_FILE` (removed on shutdown) for readiness probes.
+
+- solo/threads pools run tasks in the main process: warm-up runs on `worker_init`.
+- prefork children warm up on `worker_process_init` (the main process stays light). Each child
+  reports its result in a per-pid marker file next to the ready file; the main process writes
+  the ready file once all `concurrency` children have warmed up, and never if one failed.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import socket
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from celery import signals
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.db import models
+from app.db.session import SessionLocal
+
+logger = get_logger(__name__)
+
+GPU_QUEUE = "gpu_tasks"
+
+# Decided in the main process on worker_init; inherited by forked pool children.
+_warm_in_children = False
+_expected_children = 0
+_warm_ok = True
+_summary: Dict[str, Any] = {}
+
+CHILD_POLL_SECONDS = 0.5
+
+
+def _hot_versions(version_ids: List[int]) -> List[Tuple[str, bool, int, str]]:
+    """(base model, channels_last, version id, lora artifact prefix) of completed versions."""
+    if not version_ids:
+        return []
+    db = SessionLocal()
+    try:
+        versions = db.query(models.ModelVersion).filter(models.ModelVersion.id.in_(version_ids)).all()
+        hot = []
+        for v in versions:
+            if v.status != "completed" or not v.artifact_s3_prefix:
+                logger.warning("worker_preload_version_skipped", model_version_id=v.id, status=v.status)
+                continue
+            channels_last = bool((v.train_config_json or {}).get("channels_last"))
+            hot.append((v.base_model_name, channels_last, v.id, f"{v.artifact_s3_prefix}lora_dir/"))
+        return hot
+    finally:
+        db.close()
+
+
+def warm_up(base_models: List[str], version_ids: List[int]) -> Dict[str, Any]:
+    """Preload pipelines (and adapters) into this process; returns a summary."""
+    # Imported lazily: registering the signal handlers must stay cheap.
+    from app.services.artifact_cache import get_lora_artifact_cache
+    from app.services.inference.generate import preload_pipeline
+
+    t0 = time.time()
+    # One pipeline per (base model, channels_last) cache key, with all its adapters.
+    targets: Dict[Tuple[str, bool], List[Tuple[int, str]]] = defaultdict(list)
+    for name in base_models:
+        targets.setdefault((name, False), [])
+    for base_model_name, channels_last, version_id, lora_prefix in _hot_versions(version_ids):
+        lora_dir = get_lora_artifact_cache().fetch(lora_prefix)
+        targets[(base_model_name, channels_last)].append((version_id, str(lora_dir)))
+
+    for (base_model_name, channels_last), adapters in targets.items():
+        preload_pipeline(base_model_name, channels_last=channels_last, adapters=adapters)
+        logger.info(
+            "worker_preloaded",
+            base_model_name=base_model_name,
+            channels_last=channels_last,
+            model_versions=[v for v, _ in adapters],
+        )
+    return {
+        "base_models": sorted({name for name, _ in targets}),
+        "model_versions": sorted(v for adapters in targets.values() for v, _ in adapters),
+        "seconds": round(time.time() - t0, 2),
+    }
+
+
+def _run_warm_up() -> None:
+    global _warm_ok, _summary
+    base_models = settings.worker_preload_base_models()
+    version_ids = settings.worker_preload_model_versions()
+    if not base_models and not version_ids:
+        return
+    logger.info("worker_warmup_started", base_models=base_models, model_versions=version_ids, pid=os.getpid())
+    try:
+        _summary = warm_up(base_models, version_ids)
+        logger.info("worker_warmup_completed", pid=os.getpid(), **_summary)
+    except Exception as e:
+        # The worker still starts (Celery does not abort on signal errors) but never reports ready.
+        _warm_ok = False
+        _summary = {"error": str(e)}
+        logger.error("worker_warmup_failed", error=str(e), pid=os.getpid())
+
+
+def write_ready_file(path: Path, payload: Dict[str, Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _ready_file() -> Optional[Path]:
+    return Path(settings.WORKER_READY_FILE).expanduser() if settings.WORKER_READY_FILE else None
+
+
+def _children_dir(path: Path) -> Path:
+    """Per-pid warm-up markers of prefork children (only their main process reads them)."""
+    return path.with_name(path.name + ".children")
+
+
+def _ready_payload(hostname: Optional[str], preloaded: Any) -> Dict[str, Any]:
+    return {
+        "hostname": hostname or socket.gethostname(),
+        "pid": os.getpid(),
+        "ready_at": time.time(),
+        "preloaded": preloaded,
+    }
+
+
+def wait_for_children(path: Path, expected: int, timeout: float, hostname: Optional[str] = None) -> bool:
+    """
+    Write the ready file once `expected` children reported a successful warm-up.
+    Returns False (no ready file) when a child failed or the timeout expired.
+    """
+    deadline = time.monotonic() + timeout
+    children = _children_dir(path)
+    while True:
+        markers = []
+        for marker in children.glob("*.json"):
+            try:
+                markers.append(json.loads(marker.read_text(encoding="utf-8")))
+            except (OSError, ValueError):
+                continue  # being written
+        failed = [m for m in markers if not m.get("ok")]
+        if failed:
+            logger.error("worker_warmup_children_failed", pids=[m.get("pid") for m in failed])
+            return False
+        if len(markers) >= expected:
+            write_ready_file(path, _ready_payload(hostname, {str(m["pid"]): m["preloaded"] for m in markers}))
+            logger.info("worker_ready", ready_file=str(path), children=len(markers))
+            return True
+        if time.monotonic() >= deadline:
+            logger.error("worker_warmup_children_timeout", ready=len(markers), expected=expected)
+            return False
+        time.sleep(CHILD_POLL_SECONDS)
+
+
+@signals.worker_init.connect
+def _on_worker_init(sender=None, **kwargs) -> None:
+    global _warm_in_children, _expected_children
+    queues = set(sender.app.amqp.queues.consume_from or sender.app.amqp.queues)
+    if GPU_QUEUE not in queues:
+        return
+    if "prefork" in str(sender.pool_cls).lower():
+        _warm_in_children = True
+        _expected_children = int(sender.concurrency)
+        path = _ready_file()
+        if path is not None:
+            shutil.rmtree(_children_dir(path), ignore_errors=True)  # markers of a previous run
+        # Children must finish warm-up before the pool gives up on them.
+        sender.app.conf.worker_proc_alive_timeout = settings.WORKER_WARMUP_TIMEOUT_SECONDS
+        return
+    _run_warm_up()
+
+
+@signals.worker_process_init.connect
+def _on_worker_process_init(**kwargs) -> None:
+    if not _warm_in_children:
+        return
+    _run_warm_up()
+    path = _ready_file()
+    if path is not None:
+        write_ready_file(
+            _children_dir(path) / f"{os.getpid()}.json",
+            {"pid": os.getpid(), "ok": _warm_ok, "preloaded": _summary},
+        )
+
+
+@signals.worker_ready.connect
+def _on_worker_ready(sender=None, **kwargs) -> None:
+    path = _ready_file()
+    if path is None:
+        return
+    hostname = getattr(sender, "hostname", None)
+    if _warm_in_children:
+        # worker_ready fires in the main process, possibly before the children are warm.
+        threading.Thread(
+            target=wait_for_children,
+            args=(path, _expected_children, settings.WORKER_WARMUP_TIMEOUT_SECONDS, hostname),
+            name="warmup-readiness",
+            daemon=True,
+        ).start()
+        return
+    if not _warm_ok:
+        return
+    write_ready_file(
+        path,
+        _ready_payload(
+            hostname,
+            _summary or {
+                "base_models": settings.worker_preload_base_models(),
+                "model_versions": settings.worker_preload_model_versions(),
+            },
+        ),
+    )
+    logger.info("worker_ready", ready_file=str(path))
+
+
+@signals.worker_shutdown.connect
+def _on_worker_shutdown(**kwargs) -> None:
+    path = _ready_file()
+    if path is not None:
+        path.unlink(missing_ok=True)
+        shutil.rmtree(_children_dir(path), ignore_errors=True)
@@ -0,0 +1,102 @@
+"""
+Buffered JobEvent persistence for worker tasks.
+
+Progress callbacks fire on every training/diffusion step. Writing each tick as its own
+INSERT + COMMIT is a round-trip and an fsync on the shared database per step and job, so:
+- progress events are coalesced per job (a newer snapshot replaces an unwritten older one)
+  and written at most every `JOB_EVENT_FLUSH_SECONDS`; the latest snapshot is kept hot in
+  Redis instead (progress_stream.latest_progress, read by GET /v1/jobs/{id} and the streams);
+- milestones, logs and errors are written right away, together with any buffered progress;
+- every flush is one bulk INSERT and one commit.
+
+Every event, including each progress tick, is also published to Redis right away for live
+streaming (app.services.progress_stream); closing the buffer publishes an `end` event per job,
+unless the task is about to be retried (its jobs are still running).
+"""
+
+from __future__ import annotations
+
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.db import models
+from app.services.progress_stream import END_EVENT, publish_event
+
+logger = get_logger(__name__)
+
+
+class JobEventBuffer:
+    """Per-task buffer of JobEvent rows bound to the task's DB session."""
+
+    def __init__(
+        self,
+        db: Session,
+        flush_interval: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+        publish: Optional[Callable[[int, Dict[str, Any]], None]] = publish_event,
+    ):
+        self.db = db
+        self._publish = publish
+        self.flush_interval = settings.JOB_EVENT_FLUSH_SECONDS if flush_interval is None else float(flush_interval)
+        self._clock = clock
+        self._pending: List[Dict[str, Any]] = []
+        self._progress: Dict[int, Dict[str, Any]] = {}  # job id -> unwritten progress snapshot
+        self._last_flush = clock()
+        self._job_ids: List[int] = []
+        self.flushes = 0
+
+    def add(self, job_id: int, event_type: str, message: str, meta: Optional[dict] = None) -> bool:
+        """Record an event; returns True if this call flushed the buffer."""
+        row = {
+            "job_id": job_id,
+            "event_type": event_type,
+            "message": message,
+            "metadata_json": meta or None,
+            # Set here: one bulk INSERT would otherwise give every row the same server timestamp.
+            "created_at": datetime.now(timezone.utc),
+        }
+        if job_id not in self._job_ids:
+            self._job_ids.append(job_id)
+        if self._publish:
+            self._publish(job_id, row)
+        if event_type == "progress":
+            self._progress[job_id] = row
+            if self._clock() - self._last_flush < self.flush_interval:
+                return False
+        else:
+            self._pending.append(row)
+        self.flush()
+        return True
+
+    def flush(self) -> int:
+        """Write all buffered rows with one INSERT and commit; returns the number written."""
+        rows = sorted([*self._pending, *self._progress.values()], key=lambda r: r["created_at"])
+        self._pending.clear()
+        self._progress.clear()
+        self._last_flush = self._clock()
+        if not rows:
+            return 0
+        self.db.execute(insert(models.JobEvent), rows)
+        self.db.commit()
+        self.flushes += 1
+        return len(rows)
+
+    def close(self, end_streams: bool = True) -> None:
+        """
+        Best-effort final flush (task teardown). With `end_streams`, also ends the live streams
+        of the task's jobs; pass False when the jobs go on in a retried task.
+        """
+        try:
+            self.flush()
+        except Exception as e:
+            self.db.rollback()
+            logger.error("job_events_flush_failed", error=str(e))
+        if self._publish and end_streams:
+            for job_id in self._job_ids:
+                self._publish(job_id, {"job_id": job_id, "event_type": END_EVENT, "message": END_EVENT})
@@ -0,0 +1,83 @@
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import imagehash
+from PIL import Image
+
+
+def legacy_decode(path: Path, max_size: int) -> str:
+    """The previous preprocessing path: verify, reopen, full decode, phash, thumbnail."""
+    img = Image.open(path)
+    img.verify()
+    img = Image.open(path)
+    phash = str(imagehash.phash(img))
+    if img.width > max_size or img.height > max_size:
+        img.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    return phash
+
+
+def draft_decode(path: Path, max_size: int) -> str:
+    from app.services.preprocess import open_downscaled
+
+    return str(imagehash.phash(open_downscaled(str(path), max_size)))
+
+
+def make_inputs(src_dir: Path, out_dir: Path, megapixels: float) -> list[Path]:
+    """Upscale the source photos to phone-camera size so decode cost is realistic."""
+    inputs = []
+    for src in sorted(p for p in src_dir.iterdir() if p.suffix.lower() in (".jpg", ".jpeg", ".png")):
+        img = Image.open(src).convert("RGB")
+        scale = (megapixels * 1_000_000 / (img.width * img.height)) ** 0.5
+        big = img.resize((int(img.width * scale), int(img.height * scale)), Image.Resampling.BICUBIC)
+        out = out_dir / f"{src.stem}.jpg"
+        big.save(out, "JPEG", quality=92)
+        inputs.append(out)
+    return inputs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark: full decode vs JPEG draft-mode decode in preprocessing.")
+    parser.add_argument(
+        "--images",
+        default=str((Path(__file__).resolve().parents[2] / "_debug" / "train").resolve()),
+        help="Directory with source photos",
+    )
+    parser.add_argument("--megapixels", type=float, default=12.0, help="Upscale inputs to this size first")
+    parser.add_argument("--max-size", type=int, default=1024)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        inputs = make_inputs(Path(args.images), Path(tmp), args.megapixels)
+        if not inputs:
+            raise SystemExit(f"No images found in {args.images}")
+        print("images", len(inputs), "megapixels", args.megapixels)
+
+        results = {}
+        for name, fn in (("legacy", legacy_decode), ("draft", draft_decode)):
+            timings = []
+            for _ in range(max(1, args.repeats)):
+                t0 = time.perf_counter()
+                hashes = [fn(p, args.max_size) for p in inputs]
+                timings.append((time.perf_counter() - t0) / len(inputs))
+            results[name] = (statistics.median(timings), hashes)
+            print(name, "ms_per_image", round(results[name][0] * 1000, 1))
+
+        legacy_hashes = [imagehash.hex_to_hash(h) for h in results["legacy"][1]]
+        draft_hashes = [imagehash.hex_to_hash(h) for h in results["draft"][1]]
+        distances = [a - b for a, b in zip(legacy_hashes, draft_hashes)]
+        print("speedup", round(results["legacy"][0] / results["draft"][0], 2), "x")
+        print("phash_hamming_legacy_vs_draft max", max(distances), "mean", round(statistics.mean(distances), 2))
+
+
+if __name__ == "__main__":
+    # Allow running the script directly: `python -u backend/scripts/benchmark_preprocess_decode.py`
+    import sys
+
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+    main()
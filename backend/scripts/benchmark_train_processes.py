@@ -0,0 +1,81 @@
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+
+def run_one(*, num_processes: int, args: argparse.Namespace) -> dict:
+    # Delay heavy imports until after we print progress.
+    from app.services.trainer.train import run_training
+
+    marks: list[tuple[int, float]] = []
+    config = {
+        "base_model_name": args.base_model,
+        "trigger_token": "sks",
+        "steps": args.steps,
+        "resolution": args.resolution,
+        "batch_size": args.batch_size,
+        "cache_latents": args.cache_latents,
+        "checkpoint_steps": 0,
+        "num_processes": num_processes,
+    }
+    if args.threads_per_process:
+        config["threads_per_process"] = args.threads_per_process
+
+    started = time.time()
+    with tempfile.TemporaryDirectory() as out_dir:
+        run_training(
+            config,
+            args.dataset,
+            out_dir,
+            progress_callback=lambda step, total, loss, peak_mb: marks.append((step, time.time())),
+            latents_dir=args.latents_dir,
+        )
+    wall = time.time() - started
+
+    # Progress is reported every 10 steps; measure between the first and last report so
+    # pipeline loading and artifact saving are excluded.
+    (first_step, first_t), (last_step, last_t) = marks[0], marks[-1]
+    steps_per_sec = (last_step - first_step) / max(last_t - first_t, 1e-9)
+    return {
+        "num_processes": num_processes,
+        "steps_per_sec": round(steps_per_sec, 3),
+        "samples_per_sec": round(steps_per_sec * args.batch_size * num_processes, 3),
+        "wall_seconds": round(wall, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark: LoRA training step throughput vs. number of processes.")
+    parser.add_argument("--dataset", required=True, help="Directory with processed training images")
+    parser.add_argument("--processes", default="1,2,4", help="Comma-separated process counts to try")
+    parser.add_argument("--steps", type=int, default=41)
+    parser.add_argument("--resolution", type=int, default=256)
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--threads-per-process", type=int, default=0, help="0 = cpu_count // processes")
+    parser.add_argument("--cache-latents", action="store_true")
+    parser.add_argument("--latents-dir", default=None)
+    parser.add_argument("--base-model", default="sd15")
+    args = parser.parse_args()
+
+    results = []
+    for n in [int(p) for p in args.processes.split(",") if p.strip()]:
+        print("num_processes", n, "start")
+        result = run_one(num_processes=n, args=args)
+        print(json.dumps(result))
+        results.append(result)
+
+    baseline = results[0]["samples_per_sec"] if results else 0
+    print("\nprocesses  steps/s  samples/s  speedup")
+    for r in results:
+        speedup = r["samples_per_sec"] / baseline if baseline else 0
+        print(f"{r['num_processes']:>9}  {r['steps_per_sec']:>7}  {r['samples_per_sec']:>9}  {speedup:>6.2f}x")
+
+
+if __name__ == "__main__":
+    # Allow running the script directly: `python -u backend/scripts/benchmark_train_processes.py`
+    import sys
+
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+    main()
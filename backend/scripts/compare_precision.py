@@ -0,0 +1,91 @@
+import argparse
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from debug_compare_lora import run_one
+
+MODES = [
+    ("fp32", False),
+    ("fp32", True),
+    ("bf16-autocast", False),
+    ("bf16-autocast", True),
+]
+
+
+def image_diff(reference: Path, candidate: Path) -> dict:
+    a = np.asarray(Image.open(reference).convert("RGB"), dtype=np.float64)
+    b = np.asarray(Image.open(candidate).convert("RGB"), dtype=np.float64)
+    mse = float(np.mean((a - b) ** 2))
+    psnr = float("inf") if mse == 0 else 10.0 * np.log10(255.0**2 / mse)
+    return {"mean_abs_diff": round(float(np.mean(np.abs(a - b))), 3), "psnr_db": round(psnr, 2)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare fp32 vs bf16-autocast (and channels_last) generation: speed and image drift, same seed."
+    )
+    parser.add_argument("--prompt", default="portrait photo of sks person, studio lighting")
+    parser.add_argument("--negative-prompt", default="")
+    parser.add_argument("--steps", type=int, default=4)
+    parser.add_argument("--width", type=int, default=128)
+    parser.add_argument("--height", type=int, default=128)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--base-model", default="sd15")
+    parser.add_argument("--lora-dir", default=None, help="Optional LoRA dir (adapter_config.json + weights)")
+    parser.add_argument("--repeats", type=int, default=2, help="Timed runs per mode (first run also warms up)")
+    args = parser.parse_args()
+
+    repo_root = Path(__file__).resolve().parents[2]
+    out_dir = (repo_root / "_debug" / "compare_precision").resolve()
+    out_dir.mkdir(parents=True, exist_ok=True)
+    print("output_dir", out_dir)
+
+    results = []
+    reference = None
+    for precision, channels_last in MODES:
+        name = f"{precision}{'_cl' if channels_last else ''}"
+        output_path = out_dir / f"{name}.png"
+        timings = []
+        for _ in range(max(1, args.repeats) + 1):
+            t0 = time.time()
+            run_one(
+                prompt=args.prompt,
+                negative_prompt=args.negative_prompt,
+                steps=args.steps,
+                width=args.width,
+                height=args.height,
+                seed=args.seed,
+                base_model_name=args.base_model,
+                lora_path=args.lora_dir,
+                output_path=output_path,
+                precision=precision,
+                channels_last=channels_last,
+            )
+            timings.append(time.time() - t0)
+        result = {"mode": name, "best_seconds": round(min(timings[1:]), 3)}
+        if reference is None:
+            reference = output_path
+        else:
+            result.update(image_diff(reference, output_path))
+        print(json.dumps(result))
+        results.append(result)
+
+    baseline = results[0]["best_seconds"]
+    print("\nmode                 seconds  speedup  mean_abs_diff  psnr_db")
+    for r in results:
+        print(
+            f"{r['mode']:<20} {r['best_seconds']:>7}  {baseline / r['best_seconds']:>6.2f}x"
+            f"  {r.get('mean_abs_diff', 0.0):>13}  {r.get('psnr_db', '-'):>7}"
+        )
+
+
+if __name__ == "__main__":
+    # Allow running the script directly: `python -u backend/scripts/compare_precision.py`
+    import sys
+
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+    main()
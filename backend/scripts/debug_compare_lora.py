@@ -14,6 +14,8 @@ def run_one(
     base_model_name: str,
     lora_path: str | None,
     output_path: Path,
+    precision: str = "fp32",
+    channels_last: bool = False,
 ) -> None:
     # Delay heavy imports until after we print progress.
     from app.services.inference.generate import generate_image
@@ -30,6 +32,8 @@ def run_one(
         output_path=str(output_path),
         base_model_name=base_model_name,
         progress_callback=None,
+        precision=precision,
+        channels_last=channels_last,
     )
 
 
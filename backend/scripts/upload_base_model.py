@@ -1,7 +1,9 @@
 from __future__ import annotations
 
 import argparse
+import json
 import mimetypes
+import tempfile
 from pathlib import Path
 import sys
 
@@ -10,7 +12,13 @@ sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
 from app.core.logging import get_logger  # noqa: E402
 from app.services.s3 import s3_service  # noqa: E402
-from app.services.base_models import resolve_base_model_dir  # noqa: E402
+from app.services.base_models import (  # noqa: E402
+    MANIFEST_NAME,
+    STAMP_NAME,
+    base_model_prefix,
+    build_base_model_manifest,
+    resolve_base_model_dir,
+)
 
 logger = get_logger(__name__)
 
@@ -21,6 +29,9 @@ def iter_files(root: Path):
             # snapshot_download may create a local metadata cache under `.cache/` inside local_dir
             if ".cache" in p.parts:
                 continue
+            # Local sync bookkeeping, not part of the model
+            if p.name in (MANIFEST_NAME, STAMP_NAME) or p.name.endswith(".tmp"):
+                continue
             yield p
 
 
@@ -49,8 +60,7 @@ def main() -> None:
         raise SystemExit(f"Directory not found: {src_dir}")
 
     # Keep prefix compatible with runtime downloader
-    slug_dir = resolve_base_model_dir(base_model_name).name
-    prefix = f"models/base/{slug_dir}/"
+    prefix = base_model_prefix(base_model_name)
 
     files = list(iter_files(src_dir))
     if not files:
@@ -62,13 +72,21 @@ def main() -> None:
 
     logger.info("upload_base_model_started", base_model_name=base_model_name, src=str(src_dir), prefix=prefix, count=len(files))
 
+    uploads = []
     for p in files:
         rel = p.relative_to(src_dir).as_posix()
-        key = prefix + rel
         ctype, _ = mimetypes.guess_type(str(p))
-        s3_service.upload_file(str(p), key, content_type=ctype or "application/octet-stream")
+        uploads.append((str(p), prefix + rel, ctype or "application/octet-stream"))
+    s3_service.upload_many(uploads)
+
+    # Manifest last: workers only see a complete upload (size + sha256 per file, for partial syncs)
+    manifest = build_base_model_manifest(src_dir, files)
+    with tempfile.TemporaryDirectory() as tmp:
+        manifest_path = Path(tmp) / MANIFEST_NAME
+        manifest_path.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+        s3_service.upload_file(str(manifest_path), prefix + MANIFEST_NAME, content_type="application/json")
 
-    logger.info("upload_base_model_completed", prefix=prefix)
+    logger.info("upload_base_model_completed", prefix=prefix, files=len(manifest["files"]))
     print(prefix)
 
 
@@ -4,6 +4,7 @@ Pytest configuration and fixtures.
 import pytest
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 from fastapi.testclient import TestClient
 from app.db.base import Base
 from app.main import app
@@ -14,7 +15,12 @@ from app.api.dependencies import get_db
 def db():
     """Create test database session."""
     # Use SQLite for tests so local Postgres is not required.
-    engine = create_engine("sqlite+pysqlite:///:memory:", connect_args={"check_same_thread": False})
+    engine = create_engine(
+        "sqlite+pysqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        # Share the single in-memory DB with the TestClient thread.
+        poolclass=StaticPool,
+    )
     Base.metadata.create_all(bind=engine)
     TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
     session = TestingSessionLocal()
@@ -40,6 +46,16 @@ def client(db):
     app.dependency_overrides.clear()
 
 
+@pytest.fixture(autouse=True)
+def _no_event_pubsub(monkeypatch):
+    """
+    Keep workers' live event publishing away from Redis.
+    """
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "JOB_EVENT_PUBSUB", False)
+
+
 @pytest.fixture(autouse=True)
 def _stub_s3(monkeypatch):
     """
@@ -57,7 +73,13 @@ def _stub_s3(monkeypatch):
             return None
 
         def delete_prefix(self, prefix: str):
-            return None
+            return []
+
+        def delete_many(self, keys):
+            return []
+
+        def list_objects(self, prefix: str):
+            return []
 
     # Patch where it's imported/used
     import app.api.v1.persons as persons_mod
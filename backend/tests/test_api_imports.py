@@ -0,0 +1,35 @@
+"""
+Test that the API process stays free of the ML stack.
+"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from app.workers import dispatch
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+
+def test_importing_app_main_does_not_import_torch():
+    """Tasks are dispatched by name, so app.main never pulls in torch/diffusers/peft."""
+    code = (
+        "import sys, app.main\n"
+        "heavy = [m for m in ('torch', 'torchvision', 'diffusers', 'peft', 'cv2') if m in sys.modules]\n"
+        "print(','.join(heavy))\n"
+    )
+    env = {**os.environ, "DATABASE_URL": "sqlite:///:memory:"}
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == ""
+
+
+def test_dispatch_names_match_registered_tasks():
+    """Every name the API enqueues is a task registered by the worker modules."""
+    from app.celery_app import celery_app
+    import app.workers.cpu.tasks  # noqa: F401
+    import app.workers.gpu.tasks  # noqa: F401
+
+    names = [dispatch.PREPROCESS_PERSON, dispatch.PURGE_PERSON, dispatch.TRAIN_MODEL, dispatch.GENERATE_IMAGE]
+    assert all(name in celery_app.tasks for name in names)
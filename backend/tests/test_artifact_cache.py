@@ -0,0 +1,62 @@
+"""
+Test the local S3 artifact cache.
+"""
+from pathlib import Path
+
+from app.services.artifact_cache import ArtifactCache
+
+
+class _FakeS3:
+    def __init__(self, objects: dict):
+        self.objects = objects  # key -> (etag, bytes)
+        self.downloads = []
+
+    def list_objects(self, prefix: str):
+        return [
+            {"key": k, "etag": etag, "size": len(data)}
+            for k, (etag, data) in self.objects.items()
+            if k.startswith(prefix)
+        ]
+
+    def download_file(self, s3_key: str, local_path: str):
+        self.downloads.append(s3_key)
+        Path(local_path).write_bytes(self.objects[s3_key][1])
+
+    def download_many(self, items):
+        for s3_key, local_path in items:
+            Path(local_path).parent.mkdir(parents=True, exist_ok=True)
+            self.download_file(s3_key, str(local_path))
+
+
+def test_artifact_cache_hits_skip_download_and_etag_changes_refetch(tmp_path):
+    """Repeat fetches are served locally; a changed ETag produces a new entry."""
+    s3 = _FakeS3({"models/lora/1/lora_dir/adapter_model.safetensors": ("e1", b"abc")})
+    cache = ArtifactCache(root=tmp_path, max_bytes=1024, s3=s3)
+
+    first = cache.fetch("models/lora/1/lora_dir/")
+    second = cache.fetch("models/lora/1/lora_dir/")
+    assert first == second
+    assert (first / "adapter_model.safetensors").read_bytes() == b"abc"
+    assert len(s3.downloads) == 1
+
+    s3.objects["models/lora/1/lora_dir/adapter_model.safetensors"] = ("e2", b"xyz")
+    third = cache.fetch("models/lora/1/lora_dir/")
+    assert third != first
+    assert (third / "adapter_model.safetensors").read_bytes() == b"xyz"
+    assert cache.stats() == {"hits": 1, "misses": 2, "evictions": 0}
+    assert not [p for p in tmp_path.iterdir() if p.name.startswith(".staging-")]
+
+
+def test_artifact_cache_evicts_least_recently_used(tmp_path):
+    """Entries beyond the size budget are evicted oldest first."""
+    s3 = _FakeS3({
+        "models/lora/1/lora_dir/a": ("e1", b"x" * 60),
+        "models/lora/2/lora_dir/a": ("e2", b"y" * 60),
+    })
+    cache = ArtifactCache(root=tmp_path, max_bytes=100, s3=s3)
+
+    first = cache.fetch("models/lora/1/lora_dir/")
+    second = cache.fetch("models/lora/2/lora_dir/")
+    assert not first.exists()
+    assert second.exists()
+    assert cache.stats()["evictions"] == 1
@@ -0,0 +1,128 @@
+"""
+Test manifest-based base model sync.
+"""
+import json
+from pathlib import Path
+
+import pytest
+
+import app.services.base_models as base_models
+
+MODEL_FILES = {
+    "model_index.json": b"{}",
+    "unet/config.json": b"{}",
+    "unet/diffusion_pytorch_model.safetensors": b"u" * 64,
+    "vae/config.json": b"{}",
+    "vae/diffusion_pytorch_model.safetensors": b"v" * 32,
+    "text_encoder/config.json": b"{}",
+    "text_encoder/model.safetensors": b"t" * 16,
+    "tokenizer/tokenizer_config.json": b"{}",
+}
+
+
+class _FakeS3:
+    def __init__(self, src: Path, prefix: str):
+        self.objects = {prefix + p: data for p, data in MODEL_FILES.items()}
+        manifest = base_models.build_base_model_manifest(src, [src / p for p in MODEL_FILES])
+        self.objects[prefix + base_models.MANIFEST_NAME] = json.dumps(manifest).encode()
+        self.listings = 0
+        self.fetched = []
+
+    def list_objects(self, prefix: str):
+        self.listings += 1
+        return [
+            {"key": k, "size": len(v), "etag": str(hash(v))}
+            for k, v in self.objects.items()
+            if k.startswith(prefix)
+        ]
+
+    def download_file(self, s3_key: str, local_path: str):
+        Path(local_path).write_bytes(self.objects[s3_key])
+
+    def download_many(self, items):
+        for s3_key, local_path in items:
+            self.fetched.append(s3_key)
+            Path(local_path).parent.mkdir(parents=True, exist_ok=True)
+            self.download_file(s3_key, str(local_path))
+
+
+@pytest.fixture
+def fake_s3(tmp_path, monkeypatch):
+    src = tmp_path / "src"
+    for rel, data in MODEL_FILES.items():
+        (src / rel).parent.mkdir(parents=True, exist_ok=True)
+        (src / rel).write_bytes(data)
+    monkeypatch.setattr(base_models.settings, "MODELS_DIR", str(tmp_path / "models"))
+    s3 = _FakeS3(src, base_models.base_model_prefix("sd15"))
+    monkeypatch.setattr(base_models, "s3_service", s3)
+    return s3
+
+
+def test_cold_sync_then_warm_path_skips_minio(fake_s3):
+    """The first call downloads everything and stamps the dir; later calls never list MinIO."""
+    base_dir = base_models.ensure_base_model_present("sd15")
+    assert len(fake_s3.fetched) == len(MODEL_FILES)
+    assert (base_dir / base_models.STAMP_NAME).is_file()
+    assert (base_dir / "unet/diffusion_pytorch_model.safetensors").read_bytes() == b"u" * 64
+
+    listings = fake_s3.listings
+    assert base_models.ensure_base_model_present("sd15") == base_dir
+    assert fake_s3.listings == listings
+
+
+def test_partial_sync_fetches_only_missing_and_changed_files(fake_s3):
+    """Without a stamp, files matching the manifest are kept and only the rest is downloaded."""
+    base_dir = base_models.ensure_base_model_present("sd15")
+    (base_dir / base_models.STAMP_NAME).unlink()
+    (base_dir / "vae/diffusion_pytorch_model.safetensors").unlink()
+    (base_dir / "text_encoder/model.safetensors").write_bytes(b"x" * 16)  # same size, different content
+    fake_s3.fetched.clear()
+
+    base_models.ensure_base_model_present("sd15")
+    assert sorted(fake_s3.fetched) == [
+        "models/base/sd15/text_encoder/model.safetensors",
+        "models/base/sd15/vae/diffusion_pytorch_model.safetensors",
+    ]
+    assert (base_dir / "text_encoder/model.safetensors").read_bytes() == b"t" * 16
+    assert (base_dir / base_models.STAMP_NAME).is_file()
+
+
+def test_concurrent_installs_download_once(fake_s3):
+    """Parallel callers serialize on the install lock; the model is fetched a single time."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        dirs = list(pool.map(lambda _: base_models.ensure_base_model_present("sd15"), range(4)))
+
+    assert len(set(dirs)) == 1
+    assert len(fake_s3.fetched) == len(MODEL_FILES)
+    assert not list(dirs[0].parent.glob(".staging-*"))
+
+
+def test_interrupted_staging_is_resumed_and_installed_atomically(fake_s3):
+    """Files left in staging by a crashed sync are reused; the model dir appears only when complete."""
+    base_dir = base_models.resolve_base_model_dir("sd15")
+    staging = base_dir.with_name(f".staging-{base_dir.name}")
+    (staging / "unet").mkdir(parents=True)
+    (staging / "unet/diffusion_pytorch_model.safetensors").write_bytes(b"u" * 64)
+    (staging / "vae").mkdir()
+    (staging / "vae/diffusion_pytorch_model.safetensors").write_bytes(b"v" * 7)  # truncated
+
+    base_models.ensure_base_model_present("sd15")
+    assert "models/base/sd15/unet/diffusion_pytorch_model.safetensors" not in fake_s3.fetched
+    assert "models/base/sd15/vae/diffusion_pytorch_model.safetensors" in fake_s3.fetched
+    assert (base_dir / "vae/diffusion_pytorch_model.safetensors").read_bytes() == b"v" * 32
+    assert not staging.exists()
+
+
+def test_complete_local_model_without_upload_is_used_as_is(fake_s3):
+    """A model installed locally (no stamp) and never uploaded to MinIO is not rejected."""
+    base_dir = base_models.resolve_base_model_dir("sd15")
+    for rel, data in MODEL_FILES.items():
+        (base_dir / rel).parent.mkdir(parents=True, exist_ok=True)
+        (base_dir / rel).write_bytes(data)
+    fake_s3.objects.clear()
+
+    assert base_models.ensure_base_model_present("sd15") == base_dir
+    assert fake_s3.fetched == []
+    assert not (base_dir / base_models.STAMP_NAME).exists()
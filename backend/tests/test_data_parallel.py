@@ -0,0 +1,58 @@
+"""
+Test the data-parallel building blocks of LoRA training.
+"""
+import multiprocessing
+
+import torch
+import torch.distributed as dist
+
+from app.services.trainer.train import _all_reduce_grads, _free_port, _init_process_group, shard_sampler
+
+
+def _reduce_worker(dist_rank, world_size, init_method, results):
+    _init_process_group(dist_rank, world_size, init_method)
+    try:
+        a = torch.nn.Parameter(torch.zeros(2, 2))
+        b = torch.nn.Parameter(torch.zeros(3))
+        a.grad = torch.full((2, 2), float(dist_rank + 1))
+        if dist_rank == 0:
+            b.grad = torch.full((3,), 4.0)  # rank 1 has no grad for b (counts as zeros)
+        _all_reduce_grads([a, b], world_size)
+        results.put((dist_rank, a.grad.tolist(), b.grad.tolist()))
+    finally:
+        dist.destroy_process_group()
+
+
+def test_all_reduce_grads_averages_across_ranks():
+    """Every rank ends up with the mean gradient; missing grads count as zeros."""
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    init_method = f"tcp://127.0.0.1:{_free_port()}"
+    procs = [ctx.Process(target=_reduce_worker, args=(r, 2, init_method, results)) for r in range(2)]
+    for p in procs:
+        p.start()
+    out = sorted(results.get(timeout=60) for _ in procs)
+    for p in procs:
+        p.join(timeout=60)
+
+    assert [p.exitcode for p in procs] == [0, 0]
+    for _, a_grad, b_grad in out:
+        assert a_grad == [[1.5, 1.5], [1.5, 1.5]]
+        assert b_grad == [2.0, 2.0, 2.0]
+
+
+def test_shard_sampler_splits_each_epoch_between_ranks():
+    """Ranks get disjoint shards covering the dataset; the split changes between epochs."""
+    dataset = list(range(10))
+    assert shard_sampler(dataset, world_size=1, dist_rank=0) is None
+
+    samplers = [shard_sampler(dataset, world_size=2, dist_rank=r) for r in range(2)]
+    first = [list(s) for s in samplers]
+    assert sorted(first[0] + first[1]) == dataset
+    assert len(first[0]) == len(first[1]) == 5
+
+    for s in samplers:
+        s.set_epoch(1)
+    second = [list(s) for s in samplers]
+    assert sorted(second[0] + second[1]) == dataset
+    assert second != first
@@ -0,0 +1,103 @@
+"""
+Test incremental preprocessing and the per-run dataset manifest.
+"""
+import hashlib
+import io
+import json
+import random
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from app.db import models
+from app.services.dataset_manifest import live_entries, verify_downloads
+from app.workers.cpu import tasks as cpu_tasks
+
+
+def _jpeg(seed) -> bytes:
+    noise = random.Random(seed).randbytes(16 * 16 * 3)
+    buf = io.BytesIO()
+    Image.frombytes("RGB", (16, 16), noise).resize((64, 64)).save(buf, "JPEG")
+    return buf.getvalue()
+
+
+class _FakeS3:
+    def __init__(self):
+        self.objects = {}
+        self.downloads = []
+
+    def download_file(self, s3_key: str, local_path: str):
+        self.downloads.append(s3_key)
+        Path(local_path).write_bytes(self.objects[s3_key])
+
+    def upload_file(self, local_path: str, s3_key: str, content_type: str = None):
+        self.objects[s3_key] = Path(local_path).read_bytes()
+
+
+def _run(db, person_id):
+    run = models.PreprocessRun(person_id=person_id, status="pending")
+    db.add(run)
+    db.commit()
+    cpu_tasks.preprocess_person_task.run(person_id, run.id)
+    db.refresh(run)
+    return run
+
+
+def test_rerun_processes_only_new_photos_and_manifest_tracks_dataset(db, monkeypatch):
+    """A second run touches only new uploads; its manifest covers all live processed photos."""
+    s3 = _FakeS3()
+    monkeypatch.setattr(cpu_tasks, "SessionLocal", lambda: db)
+    monkeypatch.setattr(db, "close", lambda: None)  # the task closes its session
+    monkeypatch.setattr(cpu_tasks, "get_s3_service", lambda: s3)
+    monkeypatch.setattr(cpu_tasks.settings, "PREPROCESS_CPU_WORKERS", 1)
+
+    person = models.PersonProfile(name="Test Person", consent_confirmed=True, subject_is_adult=True)
+    db.add(person)
+    db.commit()
+
+    def upload(seed):
+        key = f"raw/{person.id}/{seed}.jpg"
+        s3.objects[key] = _jpeg(seed)
+        photo = models.PhotoAsset(person_id=person.id, s3_key=key, content_type="image/jpeg", size_bytes=1)
+        db.add(photo)
+        db.commit()
+        return photo
+
+    first = [upload(seed) for seed in (1, 2, 3)]
+    run1 = _run(db, person.id)
+    assert run1.status == "finished" and run1.images_accepted == 3
+
+    db.delete(first[0])
+    db.commit()
+    new = upload(4)
+    s3.downloads.clear()
+    run2 = _run(db, person.id)
+
+    assert run2.images_accepted == 1
+    assert s3.downloads == [new.s3_key]
+    manifest = json.loads(s3.objects[run2.manifest_s3_key])
+    assert [e["photo_id"] for e in manifest["images"]] == [first[1].id, first[2].id, new.id]
+    assert all(e["width"] == 64 and len(e["sha256"]) == 64 for e in manifest["images"])
+
+    # Training filters the older manifest by the photos that still exist.
+    old_manifest = json.loads(s3.objects[run1.manifest_s3_key])
+    live_ids = {first[1].id, first[2].id, new.id}
+    assert [e["photo_id"] for e in live_entries(old_manifest, live_ids)] == [first[1].id, first[2].id]
+
+
+def test_verify_downloads_rejects_objects_that_differ_from_the_manifest(tmp_path):
+    """Downloaded files must match the recorded sha256; entries without a digest are skipped."""
+    good, bad = _jpeg(1), _jpeg(2)
+    (tmp_path / "processed_1.jpg").write_bytes(good)
+    (tmp_path / "processed_2.jpg").write_bytes(bad)
+    (tmp_path / "processed_3.jpg").write_bytes(b"legacy")
+    entries = [
+        {"key": "datasets/processed/1/processed_1.jpg", "sha256": hashlib.sha256(good).hexdigest()},
+        {"key": "datasets/processed/1/processed_3.jpg", "sha256": None},
+    ]
+    verify_downloads(entries, tmp_path)
+
+    entries.append({"key": "datasets/processed/1/processed_2.jpg", "sha256": hashlib.sha256(good).hexdigest()})
+    with pytest.raises(ValueError, match="processed_2.jpg"):
+        verify_downloads(entries, tmp_path)
@@ -0,0 +1,124 @@
+"""
+Test micro-batching of pending generations.
+"""
+import pytest
+from celery.exceptions import Retry
+
+from app.celery_app import TASK_TIME_LIMIT_SECONDS
+from app.db import models
+from app.workers.gpu.batching import claim_compatible_generations, claim_generation, claim_stale_seconds
+
+
+def _model_version(db):
+    person = models.PersonProfile(name="Test Person", consent_confirmed=True, subject_is_adult=True)
+    db.add(person)
+    db.flush()
+    model = models.Model(person_id=person.id, name="m")
+    db.add(model)
+    db.flush()
+    version = models.ModelVersion(model_id=model.id, base_model_name="sd15", trigger_token="sks person", status="completed")
+    db.add(version)
+    db.commit()
+    return version
+
+
+def _generation(db, version, **kwargs):
+    values = {"prompt": "photo of sks person", "steps": 20, "width": 512, "height": 512, "status": "pending"}
+    values.update(kwargs)
+    gen = models.Generation(model_version_id=version.id, **values)
+    db.add(gen)
+    db.commit()
+    return gen
+
+
+def test_claim_generation_is_exclusive(db):
+    """A generation can only be claimed once."""
+    version = _model_version(db)
+    gen = _generation(db, version)
+    assert claim_generation(db, gen.id) is True
+    assert claim_generation(db, gen.id) is False
+
+
+def test_claim_compatible_generations_respects_shape_and_budget(db):
+    """Only same-shape pending generations are drained, within the image budget."""
+    version = _model_version(db)
+    leader = _generation(db, version)
+    same = _generation(db, version, prompt="another prompt", num_images=2)
+    other_steps = _generation(db, version, steps=30)
+    too_many = _generation(db, version, num_images=2)
+    claim_generation(db, leader.id)
+
+    claimed = claim_compatible_generations(db, leader, max_images=4)
+
+    assert [g.id for g in claimed] == [same.id]
+    db.expire_all()
+    assert same.status == "generating"
+    assert other_steps.status == "pending"
+    assert too_many.status == "pending"
+
+
+def test_claim_compatible_generations_keeps_precision_modes_apart(db):
+    """fp32 and bf16-autocast generations never share a denoising pass."""
+    version = _model_version(db)
+    leader = _generation(db, version, precision="bf16-autocast")
+    fp32 = _generation(db, version)
+    bf16 = _generation(db, version, precision="bf16-autocast")
+    claim_generation(db, leader.id)
+
+    claimed = claim_compatible_generations(db, leader, max_images=4)
+
+    assert [g.id for g in claimed] == [bf16.id]
+    assert fp32.status == "pending"
+
+
+def test_stale_claims_are_reclaimed(db):
+    """Rows left generating by a dead batch are picked up again once their claim is stale."""
+    version = _model_version(db)
+    leader = _generation(db, version)
+    orphan = _generation(db, version)
+    assert claim_generation(db, orphan.id, task_id="dead-task")
+    assert claim_generation(db, leader.id, task_id="live-task")
+
+    assert claim_compatible_generations(db, leader, max_images=4, task_id="live-task", stale_after=3600) == []
+    claimed = claim_compatible_generations(db, leader, max_images=4, task_id="live-task", stale_after=0)
+
+    assert [g.id for g in claimed] == [orphan.id]
+    db.expire_all()
+    assert orphan.status == "generating"
+    assert orphan.claimed_by == "live-task"
+
+
+def test_redelivered_task_reclaims_its_own_batch(db):
+    """After a worker crash the redelivered task (same id) picks its claimed rows up again."""
+    version = _model_version(db)
+    leader = _generation(db, version)
+    drained = _generation(db, version)
+    assert claim_generation(db, leader.id, task_id="task-1")
+    assert [g.id for g in claim_compatible_generations(db, leader, max_images=4, task_id="task-1")] == [drained.id]
+
+    assert claim_generation(db, leader.id, task_id="task-2") is False
+    assert claim_generation(db, leader.id, task_id="task-1") is True
+    assert [g.id for g in claim_compatible_generations(db, leader, max_images=4, task_id="task-1")] == [drained.id]
+
+
+def test_claims_go_stale_only_after_the_task_time_limit():
+    """A claim still within the hard time limit of its task is never treated as orphaned."""
+    assert claim_stale_seconds() > TASK_TIME_LIMIT_SECONDS
+
+
+def test_task_of_row_batched_elsewhere_rechecks_later(db, monkeypatch):
+    """The task of a row claimed by another batch is retried instead of dropping the row."""
+    from app.workers.gpu import tasks as gpu_tasks
+
+    monkeypatch.setattr(gpu_tasks, "SessionLocal", lambda: db)
+    monkeypatch.setattr(db, "close", lambda: None)
+    version = _model_version(db)
+    gen = _generation(db, version)
+    assert claim_generation(db, gen.id, task_id="other-batch")
+
+    with pytest.raises(Retry):
+        gpu_tasks.generate_image_task.run(gen.id)
+
+    db.query(models.Generation).filter(models.Generation.id == gen.id).update({"status": "completed"})
+    db.commit()
+    assert gpu_tasks.generate_image_task.run(gen.id) is None
@@ -0,0 +1,38 @@
+"""
+Test generation endpoints.
+"""
+from app.services.inference.generate import resolve_seeds
+
+
+def test_create_generation_rejects_mismatched_seeds(client, db):
+    """Explicit seeds must match num_images."""
+    response = client.post(
+        "/v1/generations",
+        json={
+            "model_version_id": 1,
+            "prompt": "portrait photo of sks person",
+            "num_images": 3,
+            "seeds": [1, 2],
+        }
+    )
+    assert response.status_code == 422
+
+
+def test_resolve_seeds_for_batches():
+    """A single seed expands per image; explicit seeds are used as-is."""
+    assert resolve_seeds(10, None, 3) == [10, 11, 12]
+    assert resolve_seeds(10, [5, 7], 2) == [5, 7]
+    assert resolve_seeds(None, None, 4) is None
+
+
+def test_create_generation_rejects_unknown_precision(client, db):
+    """Only fp32 and bf16-autocast are accepted."""
+    response = client.post(
+        "/v1/generations",
+        json={
+            "model_version_id": 1,
+            "prompt": "portrait photo of sks person",
+            "precision": "fp16",
+        }
+    )
+    assert response.status_code == 422
@@ -0,0 +1,121 @@
+"""
+Test buffered JobEvent persistence.
+"""
+from app.db import models
+from app.workers.job_events import JobEventBuffer
+
+
+def _job(db):
+    job = models.Job(job_type="generate", status="started")
+    db.add(job)
+    db.commit()
+    return job
+
+
+def test_progress_is_coalesced_and_flushed_on_interval(db):
+    """Ticks inside the interval only replace the unwritten snapshot; one row per flush."""
+    now = [0.0]
+    job = _job(db)
+    events = JobEventBuffer(db, flush_interval=2.0, clock=lambda: now[0])
+
+    for step in range(10):
+        now[0] = step * 0.5
+        events.add(job.id, "progress", f"step {step}", {"current": step})
+
+    rows = db.query(models.JobEvent).order_by(models.JobEvent.id).all()
+    assert [r.message for r in rows] == ["step 4", "step 8"]
+    assert events.flushes == 2
+
+
+def test_milestones_flush_immediately_with_buffered_progress_in_order(db):
+    """A milestone writes the pending snapshot first, then itself, in one flush."""
+    job = _job(db)
+    other = _job(db)
+    events = JobEventBuffer(db, flush_interval=60.0)
+
+    events.add(job.id, "progress", "step 1")
+    events.add(other.id, "progress", "step 1")
+    events.add(job.id, "progress", "step 2")
+    assert db.query(models.JobEvent).count() == 0
+
+    assert events.add(job.id, "milestone", "generation_completed") is True
+    rows = db.query(models.JobEvent).order_by(models.JobEvent.created_at, models.JobEvent.id).all()
+    assert [(r.job_id, r.message) for r in rows] == [
+        (other.id, "step 1"),
+        (job.id, "step 2"),
+        (job.id, "generation_completed"),
+    ]
+    assert events.flushes == 1
+
+    events.add(job.id, "progress", "step 3")
+    events.close()
+    assert db.query(models.JobEvent).count() == 4
+
+
+def test_every_event_is_published_and_close_ends_the_stream(db):
+    """Live subscribers see each progress tick, then an end event per job."""
+    job = _job(db)
+    published = []
+    events = JobEventBuffer(db, flush_interval=60.0, publish=lambda job_id, e: published.append((job_id, e["message"])))
+
+    for step in range(3):
+        events.add(job.id, "progress", f"step {step}")
+    events.close()
+
+    assert published == [(job.id, "step 0"), (job.id, "step 1"), (job.id, "step 2"), (job.id, "end")]
+    assert db.query(models.JobEvent).count() == 1
+
+
+def test_close_keeps_streams_open_for_a_retried_task(db):
+    """A task that re-queues itself must not end the live stream of its still-running job."""
+    job = _job(db)
+    published = []
+    events = JobEventBuffer(db, flush_interval=60.0, publish=lambda job_id, e: published.append(e["event_type"]))
+    events.add(job.id, "milestone", "training_time_limit_retrying")
+    events.close(end_streams=False)
+
+    assert published == ["milestone"]
+
+
+def test_progress_snapshot_is_published_and_served_by_get_job(client, db, monkeypatch):
+    """The latest tick goes to Redis with the publish; GET /v1/jobs/{id} prefers it to stored rows."""
+    from datetime import datetime, timezone
+
+    from app.services import progress_stream
+
+    store = {}
+
+    class _Pipe:
+        def publish(self, channel, payload):
+            pass
+
+        def set(self, key, payload, ex=None):
+            store[key] = payload
+
+        def execute(self):
+            pass
+
+    class _Redis:
+        def pipeline(self, transaction=True):
+            return _Pipe()
+
+        def get(self, key):
+            return store.get(key)
+
+    monkeypatch.setattr(progress_stream.settings, "JOB_EVENT_PUBSUB", True)
+    monkeypatch.setattr(progress_stream, "_redis", lambda: _Redis())
+    job = _job(db)
+    db.add(models.JobEvent(
+        job_id=job.id, event_type="progress", message="step 1",
+        created_at=datetime(2026, 1, 1, tzinfo=timezone.utc),
+    ))
+    db.commit()
+    assert client.get(f"/v1/jobs/{job.id}").json()["progress"]["message"] == "step 1"
+
+    events = JobEventBuffer(db, flush_interval=60.0)
+    events.add(job.id, "progress", "step 7", {"current": 7})  # coalesced: not written yet
+
+    body = client.get(f"/v1/jobs/{job.id}").json()
+    assert body["status"] == "started"
+    assert body["progress"]["message"] == "step 7"
+    assert body["progress"]["metadata_json"] == {"current": 7}
@@ -0,0 +1,140 @@
+"""
+Test the Server-Sent Events job streams.
+"""
+import json
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+from app.db import models
+
+
+def _events(body: str):
+    return [json.loads(line[len("data: "):]) for line in body.splitlines() if line.startswith("data: ")]
+
+
+def _generation_job(db, status):
+    job = models.Job(job_type="generate", status=status, generation_id=7)
+    db.add(job)
+    db.commit()
+    db.add(models.JobEvent(job_id=job.id, event_type="milestone", message="generation_started"))
+    db.commit()
+    return job
+
+
+def test_stream_sends_stored_then_live_events_until_end(client, db, monkeypatch):
+    """Stored events come first, then pub/sub messages; the stream closes on the end event."""
+    import app.api.v1.jobs as jobs_mod
+
+    job = _generation_job(db, "started")
+    subscribed = []
+
+    @asynccontextmanager
+    async def fake_subscribe(job_id):
+        subscribed.append(job_id)
+
+        async def messages():
+            # The live loop must not hold a DB connection.
+            assert not db.in_transaction()
+            yield {"job_id": job_id, "event_type": "progress", "message": "diffusion_step 3/30"}
+            yield None
+            yield {"job_id": job_id, "event_type": "end", "message": "end"}
+            yield {"job_id": job_id, "event_type": "progress", "message": "never sent"}
+
+        yield messages()
+
+    monkeypatch.setattr(jobs_mod.progress_stream, "subscribe", fake_subscribe)
+    response = client.get("/v1/jobs/generations/7/stream")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert subscribed == [job.id]
+    assert [e["message"] for e in _events(response.text)] == ["generation_started", "diffusion_step 3/30", "end"]
+
+
+def test_stream_of_finished_job_replays_and_ends_without_subscribing(client, db, monkeypatch):
+    """Terminal jobs need no Redis subscription."""
+    import app.api.v1.jobs as jobs_mod
+
+    job = _generation_job(db, "finished")
+    monkeypatch.setattr(jobs_mod.progress_stream, "subscribe", None)
+    response = client.get(f"/v1/jobs/{job.id}/stream")
+
+    events = _events(response.text)
+    assert [e["event_type"] for e in events] == ["milestone", "end"]
+    assert events[-1]["status"] == "finished"
+
+
+def test_stream_ends_when_job_finishes_before_subscription(client, db, monkeypatch):
+    """A job that finished while subscribing (its end event already gone) still gets an end."""
+    import app.api.v1.jobs as jobs_mod
+
+    job = _generation_job(db, "started")
+
+    @asynccontextmanager
+    async def late_subscribe(job_id):
+        db.query(models.Job).filter(models.Job.id == job_id).update({"status": "finished"})
+        db.commit()
+
+        async def messages():
+            while True:
+                yield None
+
+        yield messages()
+
+    monkeypatch.setattr(jobs_mod.progress_stream, "subscribe", late_subscribe)
+    events = _events(client.get(f"/v1/jobs/{job.id}/stream").text)
+
+    assert [e["event_type"] for e in events] == ["milestone", "end"]
+    assert events[-1]["status"] == "finished"
+
+
+def test_preprocess_job_stream_ends_when_the_task_finishes(client, db, monkeypatch):
+    """Preprocessing publishes its events and the end event, so its stream terminates."""
+    import app.api.v1.jobs as jobs_mod
+    from app.services import progress_stream
+    from app.workers.cpu import tasks as cpu_tasks
+
+    published = []
+
+    class _Pipe:
+        def publish(self, channel, payload):
+            published.append(json.loads(payload))
+
+        def set(self, key, payload, ex=None):
+            pass
+
+        def execute(self):
+            pass
+
+    monkeypatch.setattr(progress_stream.settings, "JOB_EVENT_PUBSUB", True)
+    fake_redis = SimpleNamespace(pipeline=lambda transaction=True: _Pipe(), get=lambda key: None)
+    monkeypatch.setattr(progress_stream, "_redis", lambda: fake_redis)
+    monkeypatch.setattr(cpu_tasks, "SessionLocal", lambda: db)
+    monkeypatch.setattr(db, "close", lambda: None)
+
+    person = models.PersonProfile(name="Test Person", consent_confirmed=True, subject_is_adult=True)
+    db.add(person)
+    db.commit()
+    run = models.PreprocessRun(person_id=person.id, status="pending")
+    db.add(run)
+    db.commit()
+    job = models.Job(job_type="preprocess", status="pending", preprocess_run_id=run.id)
+    db.add(job)
+    db.commit()
+    person_id, run_id, job_id = person.id, run.id, job.id
+
+    @asynccontextmanager
+    async def fake_subscribe(job_id):
+        async def messages():
+            # The task runs while the client is subscribed (no photos: it fails right away).
+            cpu_tasks.preprocess_person_task.run(person_id, run_id)
+            for event in published:
+                yield event
+            yield None  # without an end event the stream would idle here
+
+        yield messages()
+
+    monkeypatch.setattr(jobs_mod.progress_stream, "subscribe", fake_subscribe)
+    events = _events(client.get(f"/v1/jobs/{job_id}/stream").text)
+
+    assert [e["message"] for e in events] == ["preprocessing_started", "preprocessing_failed", "end"]
@@ -0,0 +1,31 @@
+"""
+Test the local cache of precomputed training latents.
+"""
+import os
+
+from app.services.trainer.train import latents_file_name, prune_latent_cache
+
+
+def test_latents_file_name_follows_config_and_images(tmp_path):
+    """The name changes with the images and the preprocessing parameters, not with step count."""
+    img = tmp_path / "a.jpg"
+    img.write_bytes(b"a")
+    name = latents_file_name({"base_model_name": "sd15", "steps": 10}, [img])
+    assert name.startswith("latents_") and name.endswith(".pt")
+    assert latents_file_name({"base_model_name": "sd15", "steps": 500}, [img]) == name
+    assert latents_file_name({"base_model_name": "sd15", "resolution": 256}, [img]) != name
+    img.write_bytes(b"b")
+    assert latents_file_name({"base_model_name": "sd15"}, [img]) != name
+
+
+def test_prune_latent_cache_evicts_least_recently_used(tmp_path):
+    """Oldest files go first until the budget fits; kept files survive regardless of age."""
+    for i, name in enumerate(("latents_a.pt", "latents_b.pt", "latents_c.pt", "latents_d.pt")):
+        path = tmp_path / name
+        path.write_bytes(b"x" * 100)
+        os.utime(path, (1000 + i, 1000 + i))
+
+    removed = prune_latent_cache(tmp_path, max_bytes=200, keep=(tmp_path / "latents_a.pt",))
+
+    assert sorted(p.name for p in removed) == ["latents_b.pt", "latents_c.pt"]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["latents_a.pt", "latents_d.pt"]
@@ -0,0 +1,74 @@
+"""
+Test LoRA adapter hot-swap on a shared base module.
+"""
+from types import SimpleNamespace
+
+import torch
+from peft import LoraConfig, get_peft_model
+
+from app.services.inference.adapters import LoraAdapterSet
+
+
+class _TinyUNet(torch.nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.to_q = torch.nn.Linear(4, 4)
+
+    def forward(self, x):
+        return self.to_q(x)
+
+
+def _save_adapter(path):
+    model = get_peft_model(_TinyUNet(), LoraConfig(r=2, target_modules=["to_q"], init_lora_weights=False))
+    model.save_pretrained(str(path))
+    return str(path)
+
+
+def test_adapters_swap_and_evict_lru(tmp_path):
+    """Adapters are activated by name, base output is restorable, LRU adapter is evicted."""
+    torch.manual_seed(0)
+    pipe = SimpleNamespace(unet=_TinyUNet())
+    x = torch.ones(1, 4)
+    base_out = pipe.unet(x).detach()
+    paths = {name: _save_adapter(tmp_path / name) for name in ("mv_1", "mv_2", "mv_3")}
+
+    adapters = LoraAdapterSet(pipe, max_adapters=2)
+    with adapters.activate("mv_1", paths["mv_1"]):
+        first = pipe.unet(x).detach()
+    with adapters.activate("mv_2", paths["mv_2"]):
+        pass
+    with adapters.activate("mv_1", paths["mv_1"]):
+        again = pipe.unet(x).detach()
+    with adapters.activate("mv_3", paths["mv_3"]):
+        pass
+    with adapters.activate(None):
+        assert torch.allclose(pipe.unet(x), base_out)
+
+    assert not torch.allclose(first, base_out)
+    assert torch.allclose(first, again)
+    assert adapters.loaded() == ["mv_1", "mv_3"]
+    assert adapters.stats()["evictions"] == 1
+    assert adapters.stats()["hits"] == 1
+
+
+def test_adapter_reloads_when_artifact_path_changes(tmp_path):
+    """A model version whose artifacts moved to a new cache dir serves the new weights."""
+    torch.manual_seed(0)
+    pipe = SimpleNamespace(unet=_TinyUNet())
+    x = torch.ones(1, 4)
+    old_path = _save_adapter(tmp_path / "old")
+    new_path = _save_adapter(tmp_path / "new")
+
+    adapters = LoraAdapterSet(pipe, max_adapters=2)
+    with adapters.activate("mv_1", old_path):
+        old_out = pipe.unet(x).detach()
+    with adapters.activate("mv_1", new_path):
+        new_out = pipe.unet(x).detach()
+    with adapters.activate("mv_1", new_path):
+        again = pipe.unet(x).detach()
+
+    assert not torch.allclose(old_out, new_out)
+    assert torch.allclose(new_out, again)
+    assert adapters.loaded() == ["mv_1"]
+    assert adapters.stats()["loads"] == 2
+    assert adapters.stats()["hits"] == 1
@@ -62,3 +62,79 @@ def test_presign_upload(client, db):
     assert "url" in data
     assert "key" in data
     assert data["method"] == "PUT"
+
+
+def test_delete_person_queues_purge_that_deletes_all_objects_in_bulk(client, db, monkeypatch):
+    """DELETE answers 202 with a purge job; the task removes every object with one batched delete."""
+    import app.api.v1.persons as persons_mod
+    import app.workers.cpu.tasks as cpu_tasks
+
+    person = models.PersonProfile(name="P", consent_confirmed=True, subject_is_adult=True)
+    db.add(person)
+    db.commit()
+    db.add(models.PhotoAsset(
+        person_id=person.id, s3_key=f"uploads/{person.id}/a.jpg", content_type="image/jpeg", size_bytes=1,
+        processed_s3_key=f"datasets/processed/{person.id}/processed_1.jpg",
+    ))
+    model = models.Model(person_id=person.id, name="m")
+    db.add(model)
+    db.commit()
+    version = models.ModelVersion(model_id=model.id, base_model_name="b", trigger_token="sks person")
+    db.add(version)
+    db.commit()
+    db.add(models.Generation(
+        model_version_id=version.id, prompt="p",
+        output_s3_key="outputs/g_0.png", thumbnail_s3_key="outputs/thumbnails/g_0.png",
+        output_s3_keys_json=["outputs/g_0.png", "outputs/g_1.png"],
+        thumbnail_s3_keys_json=["outputs/thumbnails/g_0.png", "outputs/thumbnails/g_1.png"],
+    ))
+    db.commit()
+
+    listed = {
+        f"uploads/{person.id}/": [f"uploads/{person.id}/orphan.jpg"],
+        f"datasets/processed/{person.id}/": [f"datasets/processed/{person.id}/manifests/run_1.json"],
+        f"models/lora/{version.id}/": [f"models/lora/{version.id}/checkpoints/state.pt"],
+    }
+    batches = []
+
+    class _S3:
+        def list_objects(self, prefix):
+            return [{"key": k, "size": 1, "etag": "e"} for k in listed.get(prefix, [])]
+
+        def delete_many(self, keys, progress_callback=None):
+            batches.append(list(keys))
+            progress_callback(len(keys), len(keys))
+            return []
+
+    queued = []
+    monkeypatch.setattr(
+        persons_mod, "enqueue", lambda *args: queued.append(args) or type("R", (), {"id": "t1"})()
+    )
+    response = client.delete(f"/v1/persons/{person.id}")
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+    assert queued == [("cpu.purge_person", person.id, job_id)]
+    assert client.get(f"/v1/persons/{person.id}").status_code == 404
+    assert batches == []  # nothing deleted in the request
+
+    monkeypatch.setattr(cpu_tasks, "SessionLocal", lambda: db)
+    monkeypatch.setattr(db, "close", lambda: None)  # the task closes its session
+    monkeypatch.setattr(cpu_tasks, "get_s3_service", lambda: _S3())
+    cpu_tasks.purge_person_task.run(person.id, job_id)
+
+    assert len(batches) == 1
+    assert set(batches[0]) == {
+        f"uploads/{person.id}/a.jpg",
+        f"uploads/{person.id}/orphan.jpg",
+        f"datasets/processed/{person.id}/processed_1.jpg",
+        f"datasets/processed/{person.id}/manifests/run_1.json",
+        f"models/lora/{version.id}/checkpoints/state.pt",
+        "outputs/g_0.png",
+        "outputs/g_1.png",
+        "outputs/thumbnails/g_0.png",
+        "outputs/thumbnails/g_1.png",
+    }
+    job = db.query(models.Job).filter(models.Job.id == job_id).one()
+    assert job.status == "finished" and job.person_id == person.id
+    events = client.get(f"/v1/jobs/{job_id}/events").json()
+    assert {e["message"] for e in events} == {"purge_started", "objects_deleted", "purge_finished"}
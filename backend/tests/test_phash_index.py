@@ -0,0 +1,35 @@
+"""
+Test the Hamming-radius phash index.
+"""
+import random
+
+from app.services.phash_index import PhashIndex, hamming
+
+
+def test_find_matches_brute_force_within_radius():
+    """BK-tree lookups agree with a linear scan for the closest hash within the radius."""
+    rng = random.Random(0)
+    stored = [rng.getrandbits(64) for _ in range(500)]
+    index = PhashIndex(radius=10)
+    for i, value in enumerate(stored):
+        index.add(f"{value:016x}", i)
+
+    for _ in range(200):
+        base = stored[rng.randrange(len(stored))] if rng.random() < 0.5 else rng.getrandbits(64)
+        query = base ^ sum(1 << rng.randrange(64) for _ in range(rng.randrange(12)))
+        expected = min((hamming(query, v) for v in stored), default=None)
+        match = index.find(f"{query:016x}")
+        if expected is not None and expected <= 10:
+            assert match is not None and match[1] == expected
+            assert hamming(query, stored[match[0]]) == expected
+        else:
+            assert match is None
+
+
+def test_radius_zero_is_exact_match():
+    """Radius 0 behaves like the old exact-string dedup."""
+    index = PhashIndex()
+    index.add("ffff0000ffff0000", "a")
+    assert index.find("ffff0000ffff0000") == ("a", 0)
+    assert index.find("ffff0000ffff0001") is None
+    assert index.find("ffff0000ffff0001", radius=1) == ("a", 1)
@@ -0,0 +1,40 @@
+"""
+Test the per-process pipeline cache.
+"""
+from app.services.inference.pipeline_cache import PipelineCache
+
+
+def test_pipeline_cache_hit_miss_and_lru_eviction():
+    """Warm entries are reused; the least recently used one is evicted over budget."""
+    cache = PipelineCache(max_bytes=100)
+    loads = []
+
+    def loader(name):
+        def _load():
+            loads.append(name)
+            return name
+        return _load
+
+    assert cache.get_or_load("a", loader("a"), sizeof=lambda _: 40) == "a"
+    assert cache.get_or_load("b", loader("b"), sizeof=lambda _: 40) == "b"
+    assert cache.get_or_load("a", loader("a"), sizeof=lambda _: 40) == "a"
+    assert loads == ["a", "b"]
+
+    # "b" is least recently used and must make room for "c".
+    cache.get_or_load("c", loader("c"), sizeof=lambda _: 40)
+    assert cache.keys() == ["a", "c"]
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 3
+    assert stats["evictions"] == 1
+    assert stats["total_bytes"] == 80
+
+
+def test_pipeline_cache_disabled_with_zero_budget():
+    """A zero budget bypasses caching entirely."""
+    cache = PipelineCache(max_bytes=0)
+    cache.get_or_load("a", lambda: object())
+    cache.get_or_load("a", lambda: object())
+    assert cache.keys() == []
+    assert cache.stats()["misses"] == 2
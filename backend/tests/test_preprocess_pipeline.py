@@ -0,0 +1,126 @@
+"""
+Test the pipelined photo preprocessing.
+"""
+import io
+import random
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from app.services.preprocess import run_preprocess_pipeline
+
+
+def _jpeg(seed, size=(64, 48)) -> bytes:
+    noise = random.Random(seed).randbytes(16 * 16 * 3)
+    img = Image.frombytes("RGB", (16, 16), noise).resize(size, Image.Resampling.BILINEAR)
+    buf = io.BytesIO()
+    img.save(buf, "JPEG")
+    return buf.getvalue()
+
+
+class _FakeS3:
+    def __init__(self, objects: dict):
+        self.objects = objects
+        self.uploads = {}
+
+    def download_file(self, s3_key: str, local_path: str):
+        Path(local_path).write_bytes(self.objects[s3_key])
+
+    def upload_file(self, local_path: str, s3_key: str, content_type: str = None):
+        self.uploads[s3_key] = Path(local_path).read_bytes()
+
+
+@pytest.mark.parametrize("cpu_workers", [1, 2])
+def test_pipeline_dedups_in_photo_order_and_rejects_bad_files(tmp_path, cpu_workers):
+    """The first copy of a duplicate survives; broken files are rejected; accepted ones uploaded."""
+    s3 = _FakeS3({
+        "raw/1.jpg": _jpeg(1),
+        "raw/2.jpg": b"not an image",
+        "raw/3.jpg": _jpeg(2, size=(2048, 1024)),
+        "raw/4.jpg": _jpeg(1),
+    })
+    photos = [(1, "raw/1.jpg"), (2, "raw/2.jpg"), (3, "raw/3.jpg"), (4, "raw/4.jpg")]
+
+    outcomes = run_preprocess_pipeline(
+        photos, work_dir=tmp_path, output_prefix="datasets/processed/7/", s3=s3, io_concurrency=4, cpu_workers=cpu_workers
+    )
+
+    assert {pid: o.status for pid, o in outcomes.items()} == {
+        1: "processed",
+        2: "rejected",
+        3: "processed",
+        4: "duplicate",
+    }
+    assert outcomes[4].duplicate_of == 1
+    assert sorted(s3.uploads) == ["datasets/processed/7/processed_1.jpg", "datasets/processed/7/processed_3.jpg"]
+    resized = Image.open(io.BytesIO(s3.uploads["datasets/processed/7/processed_3.jpg"]))
+    assert max(resized.size) == 1024
+
+
+def test_pipeline_dedups_near_matches_against_previous_runs(tmp_path):
+    """Photos within the Hamming radius of a previously processed photo are duplicates."""
+    import imagehash
+
+    previous = imagehash.phash(Image.open(io.BytesIO(_jpeg(1))))
+    near = int(str(previous), 16) ^ 0b101  # two bits away
+    s3 = _FakeS3({"raw/5.jpg": _jpeg(1), "raw/6.jpg": _jpeg(2)})
+
+    outcomes = run_preprocess_pipeline(
+        [(5, "raw/5.jpg"), (6, "raw/6.jpg")],
+        work_dir=tmp_path,
+        output_prefix="datasets/processed/7/",
+        s3=s3,
+        cpu_workers=1,
+        dedup_radius=2,
+        known_hashes=[(1, f"{near:016x}")],
+    )
+
+    assert outcomes[5].status == "duplicate"
+    assert (outcomes[5].duplicate_of, outcomes[5].distance) == (1, 2)
+    assert outcomes[6].status == "processed"
+
+
+def test_open_downscaled_uses_draft_and_rejects_truncated_jpegs(tmp_path):
+    """Large JPEGs decode at most max_size px; a truncated file fails the single decode pass."""
+    from app.services.preprocess import open_downscaled
+
+    big = tmp_path / "big.jpg"
+    big.write_bytes(_jpeg(3, size=(4000, 3000)))
+    img = open_downscaled(str(big), max_size=1024)
+    assert img.size == (1024, 768)
+    assert img.mode == "RGB"
+
+    truncated = tmp_path / "truncated.jpg"
+    truncated.write_bytes(big.read_bytes()[:5000])
+    with pytest.raises(OSError):
+        open_downscaled(str(truncated))
+
+
+def test_quality_stage_crops_faces_and_rejects_blurry_frames(tmp_path):
+    """Photos are cropped square around the face; frames below the sharpness floor are rejected."""
+    from PIL import ImageFilter
+
+    sample = Path(__file__).resolve().parents[2] / "_debug" / "train" / "processed_11.jpg"
+    if not sample.exists():
+        pytest.skip("sample photo not available")
+    blurry = io.BytesIO()
+    Image.open(io.BytesIO(_jpeg(4, size=(800, 600)))).filter(ImageFilter.GaussianBlur(6)).save(blurry, "JPEG")
+    s3 = _FakeS3({"raw/1.jpg": sample.read_bytes(), "raw/2.jpg": blurry.getvalue()})
+
+    outcomes = run_preprocess_pipeline(
+        [(1, "raw/1.jpg"), (2, "raw/2.jpg")],
+        work_dir=tmp_path,
+        output_prefix="datasets/processed/7/",
+        s3=s3,
+        cpu_workers=1,
+        face_crop=True,
+        min_sharpness=15.0,
+    )
+
+    assert outcomes[1].status == "processed"
+    assert outcomes[1].face_count >= 1
+    assert outcomes[1].width == outcomes[1].height
+    assert outcomes[2].status == "rejected"
+    assert outcomes[2].sharpness < 15.0
+    assert "blurry" in outcomes[2].error
@@ -0,0 +1,91 @@
+"""
+Test the concurrent batch transfer helpers of S3Service.
+"""
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+import app.services.s3 as s3_mod
+
+
+class _FakeClient:
+    def __init__(self):
+        self.objects = {}
+        self.configs = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def head_bucket(self, Bucket):
+        return {}
+
+    def _enter(self, config):
+        with self._lock:
+            self.configs.append(config)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(0.02)
+        with self._lock:
+            self.active -= 1
+
+    def download_file(self, bucket, key, local_path, Config=None):
+        self._enter(Config)
+        if key not in self.objects:
+            raise FileNotFoundError(key)
+        Path(local_path).write_bytes(self.objects[key])
+
+    def upload_file(self, local_path, bucket, key, ExtraArgs=None, Config=None):
+        self._enter(Config)
+        self.objects[key] = Path(local_path).read_bytes()
+
+
+@pytest.fixture
+def service(monkeypatch):
+    client = _FakeClient()
+    monkeypatch.setattr(s3_mod.boto3, "client", lambda *a, **kw: client)
+    monkeypatch.setattr(s3_mod.settings, "S3_BATCH_CONCURRENCY", 4)
+    return s3_mod.S3Service()
+
+
+def test_upload_and_download_many_run_concurrently(service, tmp_path):
+    """Files fan out over the shared pool, use the multipart config and land in nested dirs."""
+    sources = []
+    for i in range(8):
+        p = tmp_path / f"src_{i}.bin"
+        p.write_bytes(bytes([i]) * 10)
+        sources.append((str(p), f"models/x/part_{i}.bin", None))
+
+    assert service.upload_many(sources) == [key for _, key, _ in sources]
+    out = tmp_path / "out"
+    paths = service.download_many((key, out / "nested" / Path(key).name) for _, key, _ in sources)
+
+    assert [Path(p).read_bytes() for p in paths] == [bytes([i]) * 10 for i in range(8)]
+    assert 1 < service.client.max_active <= 4
+    assert all(c is service.transfer_config for c in service.client.configs)
+
+
+def test_download_many_raises_after_all_transfers_finish(service, tmp_path):
+    """One missing object fails the batch, but the other downloads still complete."""
+    service.client.objects = {"a": b"1", "c": b"3"}
+    with pytest.raises(FileNotFoundError):
+        service.download_many([("a", tmp_path / "a"), ("b", tmp_path / "b"), ("c", tmp_path / "c")])
+    assert (tmp_path / "a").read_bytes() == b"1"
+    assert (tmp_path / "c").read_bytes() == b"3"
+
+
+def test_delete_many_batches_keys_and_reports_partial_failures(service):
+    """2500 keys take three DeleteObjects calls; per-key errors are returned, not raised."""
+    calls = []
+
+    def delete_objects(Bucket, Delete):
+        keys = [o["Key"] for o in Delete["Objects"]]
+        calls.append(keys)
+        return {"Errors": [{"Key": k, "Code": "AccessDenied", "Message": "denied"} for k in keys if k == "k_1500"]}
+
+    service.client.delete_objects = delete_objects
+    failures = service.delete_many([f"k_{i}" for i in range(2500)] + ["k_0", ""])
+
+    assert [len(c) for c in calls] == [1000, 1000, 500]
+    assert failures == [{"key": "k_1500", "code": "AccessDenied", "message": "denied"}]
@@ -0,0 +1,17 @@
+"""
+Test per-step peak RSS measurement used by training.
+"""
+from app.services.trainer.train import peak_rss_mb
+
+
+def test_peak_rss_reset_reports_following_window_only():
+    """A transient allocation shows up in its window and is gone after the next reset."""
+    peak_rss_mb(reset=True)
+    blob = bytearray(256 * 1024 * 1024)
+    blob[:: 4096] = b"x" * len(blob[:: 4096])  # touch every page
+    with_blob = peak_rss_mb()
+    del blob
+    peak_rss_mb(reset=True)
+    after = peak_rss_mb()
+    assert with_blob > 0
+    assert after < with_blob - 100
@@ -0,0 +1,86 @@
+"""
+Test GPU worker warm-up and the readiness file.
+"""
+import json
+from types import SimpleNamespace
+
+from app.db import models
+from app.workers.gpu import warmup
+
+
+def test_warm_up_groups_hot_versions_by_pipeline(db, monkeypatch, tmp_path):
+    """Each (base model, channels_last) pipeline is loaded once, with its versions' adapters."""
+    import app.services.artifact_cache as artifact_cache
+    import app.services.inference.generate as generate
+
+    person = models.PersonProfile(name="P", consent_confirmed=True, subject_is_adult=True)
+    db.add(person)
+    db.commit()
+    model = models.Model(person_id=person.id, name="m")
+    db.add(model)
+    db.commit()
+    done = models.ModelVersion(
+        model_id=model.id, base_model_name="sd15", trigger_token="sks person",
+        status="completed", artifact_s3_prefix="models/lora/1/", train_config_json={"channels_last": True},
+    )
+    pending = models.ModelVersion(model_id=model.id, base_model_name="sd15", trigger_token="sks person")
+    db.add_all([done, pending])
+    db.commit()
+
+    monkeypatch.setattr(warmup, "SessionLocal", lambda: db)
+    monkeypatch.setattr(db, "close", lambda: None)
+    fetched = []
+    monkeypatch.setattr(
+        artifact_cache, "get_lora_artifact_cache",
+        lambda: SimpleNamespace(fetch=lambda prefix: fetched.append(prefix) or tmp_path / "lora"),
+    )
+    loaded = []
+    monkeypatch.setattr(
+        generate, "preload_pipeline",
+        lambda name, channels_last=False, adapters=(): loaded.append((name, channels_last, list(adapters))),
+    )
+
+    summary = warmup.warm_up(["sd15"], [done.id, pending.id])
+    assert fetched == ["models/lora/1/lora_dir/"]
+    assert loaded == [("sd15", False, []), ("sd15", True, [(done.id, str(tmp_path / "lora"))])]
+    assert summary["model_versions"] == [done.id]
+
+
+def test_ready_file_written_when_warm_and_removed_on_shutdown(monkeypatch, tmp_path):
+    """The readiness file appears on worker_ready only if warm-up succeeded."""
+    ready = tmp_path / "run" / "worker.ready"
+    monkeypatch.setattr(warmup.settings, "WORKER_READY_FILE", str(ready))
+    monkeypatch.setattr(warmup, "_summary", {"base_models": ["sd15"], "model_versions": [], "seconds": 1.0})
+
+    monkeypatch.setattr(warmup, "_warm_ok", False)
+    warmup._on_worker_ready(sender=SimpleNamespace(hostname="gpu-1"))
+    assert not ready.exists()
+
+    monkeypatch.setattr(warmup, "_warm_ok", True)
+    warmup._on_worker_ready(sender=SimpleNamespace(hostname="gpu-1"))
+    payload = json.loads(ready.read_text())
+    assert payload["hostname"] == "gpu-1" and payload["preloaded"]["base_models"] == ["sd15"]
+
+    warmup._on_worker_shutdown()
+    assert not ready.exists()
+
+
+def test_prefork_ready_file_waits_for_all_children(monkeypatch, tmp_path):
+    """Under prefork the ready file needs a success marker from every child; a failure blocks it."""
+    ready = tmp_path / "worker.ready"
+    children = warmup._children_dir(ready)
+    children.mkdir()
+    monkeypatch.setattr(warmup, "CHILD_POLL_SECONDS", 0.01)
+
+    (children / "11.json").write_text(json.dumps({"pid": 11, "ok": True, "preloaded": {"base_models": ["sd15"]}}))
+    assert warmup.wait_for_children(ready, expected=2, timeout=0.05) is False
+    assert not ready.exists()
+
+    (children / "12.json").write_text(json.dumps({"pid": 12, "ok": False, "preloaded": {"error": "boom"}}))
+    assert warmup.wait_for_children(ready, expected=2, timeout=1) is False
+    assert not ready.exists()
+
+    (children / "12.json").write_text(json.dumps({"pid": 12, "ok": True, "preloaded": {"base_models": ["sd15"]}}))
+    assert warmup.wait_for_children(ready, expected=2, timeout=1, hostname="gpu-1") is True
+    payload = json.loads(ready.read_text())
+    assert payload["hostname"] == "gpu-1" and sorted(payload["preloaded"]) == ["11", "12"]
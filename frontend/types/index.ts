@@ -12,6 +12,9 @@ export interface Photo {
   content_type: string
   size_bytes: number
   status: string
+  sharpness?: number
+  face_count?: number
+  rejection_reason?: string
   created_at: string
 }
 
@@ -23,6 +26,7 @@ export interface PreprocessRun {
   images_rejected: number
   images_duplicates: number
   output_s3_prefix?: string
+  manifest_s3_key?: string
   error_message?: string
   started_at?: string
   finished_at?: string
@@ -59,9 +63,15 @@ export interface Generation {
   width: number
   height: number
   seed?: number
+  num_images: number
+  seeds?: number[]
+  precision?: "fp32" | "bf16-autocast"
+  channels_last?: boolean
   status: string
   output_url?: string
   thumbnail_url?: string
+  output_urls: string[]
+  thumbnail_urls: string[]
   error_message?: string
   created_at: string
 }